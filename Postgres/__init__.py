@@ -1,50 +1,22 @@
-import json
 import logging
 import os
 
-from minio import Minio, S3Error
+from minio import S3Error
 
-
-def start_client(
-    MINIO_URL=None,
-    ACCESS_KEY=None,
-    SECRET_KEY=None,
-) -> Minio:
-    # Valeurs par défaut si variables d'environnement manquantes
-    if MINIO_URL is None:
-        MINIO_URL = os.environ.get("MINIO_API", "localhost:9000")
-    if ACCESS_KEY is None:
-        ACCESS_KEY = os.environ.get("MINIO_ROOT_USER", "minioadmin")
-    if SECRET_KEY is None:
-        SECRET_KEY = os.environ.get("MINIO_ROOT_PASSWORD", "minioadmin")
-
-    if not MINIO_URL or not ACCESS_KEY or not SECRET_KEY:
-        raise ValueError("Les variables d'environnement MINIO_API, MINIO_ROOT_USER et MINIO_ROOT_PASSWORD doivent être définies ou avoir des valeurs par défaut")
-
-    client = Minio(
-        MINIO_URL, access_key=ACCESS_KEY, secret_key=SECRET_KEY, secure=False
-    )
-    return client
-
-def make_buckets(bucket_list: list = ["webscraping", "traitement"]):
-    client = start_client()
-    for bucket_name in bucket_list:
-        if not client.bucket_exists(bucket_name):
-            client.make_bucket(bucket_name)
-            print(f"Bucket '{bucket_name}' créé.")
-        else:
-            print(f"Bucket '{bucket_name}' déjà existant.")
+from storage import get_client, make_buckets
+from storage.codec import get_records, upload_file
 
 
 def save_to_minio(
     file_path,
     bucket_name="webscraping",
-    content_type="application/json",
+    codec=None,
 ):
+    # Objet compressé (STORAGE_CODEC par défaut, voir storage.codec)
     try:
-        client = start_client()
+        client = get_client()
         object_name = os.path.basename(file_path)
-        client.fput_object(bucket_name, object_name, file_path, content_type)
+        object_name, _ = upload_file(client, bucket_name, object_name, file_path, codec=codec)
         print(f" Uploaded the file : {object_name}")
     except S3Error as err:
         print(f" Erreur : {object_name} → {err}")
@@ -52,7 +24,7 @@ def save_to_minio(
 
 def read_from_minio(file_path, object_name, bucket_name="webscraping"):
     try:
-        client = start_client()
+        client = get_client()
         json_file = client.fget_object(bucket_name, object_name, file_path)
         return json_file
     except Exception as e:
@@ -63,7 +35,7 @@ def read_from_minio(file_path, object_name, bucket_name="webscraping"):
 
 def read_all_from_bucket(bucket_name="traitement"):
     try:
-        client = start_client()
+        client = get_client()
         all_data = []
         objects = client.list_objects(bucket_name)
         
@@ -74,27 +46,14 @@ def read_all_from_bucket(bucket_name="traitement"):
                 continue
 
             logging.info(f"Lecture de l'objet : {object_name}")
-            response = client.get_object(bucket_name, object_name)
-            data_bytes = response.read()
-            response.close()
-            response.release_conn()
+            # JSON ou JSON Lines, décompressé selon l'encodage de l'objet
+            data = get_records(client, bucket_name, object_name)
 
-            if not data_bytes:
+            if not data:
                 logging.warning(f"Objet {object_name} vide, ignoré.")
                 continue
 
-            data_str = data_bytes.decode("utf-8")
-
-            try:
-                data = json.loads(data_str)
-            except json.JSONDecodeError as jde:
-                logging.warning(f"Erreur JSON dans {object_name}: {jde}")
-                continue
-            
-            if isinstance(data, list):
-                all_data.extend(data)
-            else:
-                all_data.append(data)
+            all_data.extend(data)
         
         return all_data
 
@@ -121,19 +80,21 @@ def scraping_upload(scraping_dir="/app/data_extraction/scraping_output"):
 
 
 
-def read_all_from_bucket_memory(bucket_name="webscraping") -> list:
+def read_all_from_bucket_memory(bucket_name="webscraping", source=None) -> list:
     """
     Récupère tous les fichiers JSON du bucket MinIO en mémoire,
     parse leur contenu et retourne une liste contenant toutes les offres.
 
     Args:
         bucket_name (str): nom du bucket MinIO.
+        source (str, optional): si donnée, seuls les objets dont le nom la contient
+            sont lus (pipeline par source).
 
     Returns:
         list: liste des objets JSON extraits.
     """
     try:
-        client = start_client()
+        client = get_client()
     except Exception as e:
         logging.error(f"Couldn't start client connection to Minio: {e}")
         return []
@@ -147,20 +108,13 @@ def read_all_from_bucket_memory(bucket_name="webscraping") -> list:
             if not object_name:
                 logging.warning("Objet sans nom, ignoré.")
                 continue
+            if source and source not in object_name:
+                continue
 
-            response = client.get_object(bucket_name, object_name)
-            # Lire le flux en mémoire
-            content = response.read()
-            response.close()
-            response.release_conn()
-
-            # Parser le JSON
-            data = json.loads(content.decode('utf-8'))
-
-            if isinstance(data, list):
-                all_data.extend(data)
-            else:
-                all_data.append(data)
+            # Lire le flux en mémoire et parser le JSON (ou JSON Lines), décompressé
+            # selon l'encodage de l'objet (extension .zst/.gz ou métadonnée)
+            data = get_records(client, bucket_name, object_name)
+            all_data.extend(data)
 
             logging.info(f"Chargé {object_name} depuis le bucket {bucket_name} en mémoire.")
 
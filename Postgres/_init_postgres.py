@@ -3,8 +3,10 @@ from psycopg2 import sql
 from datetime import datetime
 import json
 import logging
+import time
 
 from __init__ import *
+from monitoring import POSTGRES_ROWS, POSTGRES_ROWS_PER_SECOND, push_metrics
 
 # Configuration du log
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -217,6 +219,7 @@ def load_offers(offers):
     """
     inserted, skipped, errors = 0, 0, 0
     conn = None
+    start = time.perf_counter()
 
     try:
         conn = connect()
@@ -249,18 +252,27 @@ def load_offers(offers):
             close(conn)
 
     logging.info(f"✅ Chargement terminé — {inserted} insérées, {skipped} ignorées, {errors} erreurs.")
+    seconds = time.perf_counter() - start
+    POSTGRES_ROWS.labels("inserted").inc(inserted)
+    POSTGRES_ROWS.labels("skipped").inc(skipped)
+    POSTGRES_ROWS.labels("error").inc(errors)
+    POSTGRES_ROWS_PER_SECOND.labels("pipeline_loader").set(
+        (inserted + skipped) / seconds if seconds else 0
+    )
+    push_metrics("pipeline_loader")
 
 
 
-def load_offers_from_minio(bucket_name="traitement"):
+def load_offers_from_minio(bucket_name="traitement", source=None):
     """
     Charge toutes les offres JSON depuis un bucket MinIO (en mémoire),
     puis les insère dans PostgreSQL via load_offers.
+    Si source est donnée, seuls les fichiers de cette source sont chargés.
     """
     logging.info(f"📦 Connexion à MinIO et lecture du bucket : {bucket_name}")
 
     try:
-        offers = read_all_from_bucket_memory(bucket_name=bucket_name)
+        offers = read_all_from_bucket_memory(bucket_name=bucket_name, source=source)
 
         if not offers:
             logging.warning("⚠️ Aucune offre trouvée dans le bucket MinIO.")
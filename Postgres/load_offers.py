@@ -1,5 +1,7 @@
+import os
 
 from _init_postgres import load_offers_from_minio
 
 if __name__ == "__main__":
-    load_offers_from_minio("traitement")
+    # SOURCE : défini par les pipelines par source, vide pour tout le bucket
+    load_offers_from_minio("traitement", source=os.getenv("SOURCE") or None)
@@ -13,8 +13,10 @@ def root():
 
 
 @app.post("/run-scraping")
-def run_scraping():
-    task = scraping_workflow.delay()
+def run_scraping(full: bool = False, per_source: bool | None = None):
+    # full=true : parcours complet des pages au lieu du mode incrémental
+    # per_source=true : chaque site suit sa propre chaîne jusqu'à Postgres
+    task = scraping_workflow.delay(full=full or None, per_source=per_source)
     return {"message": "Scraping lancé", "task_id": task.id}
 
 
@@ -1,5 +1,12 @@
+import os
+
 broker_url = "redis://redis:6379/0"
 result_backend = "redis://redis:6379/0"
 worker_send_task_events = True  # to use flower event monitoring
 events_logfile = "celery.log"
 events_pidfile = "celery.pid"
+
+# Les scrapers du chord sont des tâches longues : chaque processus ne réserve qu'une
+# tâche à la fois, et il y a au moins un processus par site pour les lancer ensemble
+worker_prefetch_multiplier = 1
+worker_concurrency = int(os.environ.get("CELERY_WORKER_CONCURRENCY", 4))
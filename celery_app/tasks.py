@@ -1,13 +1,25 @@
 import os
+import time
 
 import docker
-from celery import Celery, chain, shared_task
+from celery import Celery, chain, chord, group, shared_task
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+)
 from docker import errors as dock_errors
 from docker.types import LogConfig
 from dotenv import load_dotenv
 
-from data_extraction.Websites import MarocAnn, Rekrute, bayt, emploi
+from data_extraction.Websites.browser_profile import page_load_strategy
+from data_extraction.Websites.driver_pool import close_driver_pool, get_driver_pool
+from data_extraction.Websites.http_fetch import fetch_mode
+from data_extraction.Websites.offer_store import OUTPUT_FILES, file_manifest
+from data_extraction.Websites.runner import SCRAPER_MODULES, run_site
 from database import scraping_upload
+from monitoring import PIPELINE_TASK_SECONDS, push_metrics
 
 # from skillner.skillner_logic import skillner_extract_and_upload
 
@@ -15,62 +27,134 @@ celery_app = Celery("celery_app")
 celery_app.config_from_object("celery_app.celeryconfig")
 
 
-# 🚀 Tâches de scraping
+# 🌡️ Pool de WebDrivers : préchauffé avec chaque processus worker si un site est en
+# mode "selenium" (sinon Chrome n'est démarré qu'au premier emprunt), fermé à son arrêt
 
 
-@shared_task(name="rekrute", bind=True, max_retries=3, default_retry_delay=5)
-def rekrute_task(self):
+@worker_process_init.connect
+def warm_driver_pool(**kwargs):
+    # Un pool par stratégie de chargement (profil léger ou complet) des sites concernés
+    strategies = {
+        page_load_strategy(site)
+        for site in SCRAPER_MODULES
+        if fetch_mode(site) == "selenium"
+    }
     try:
-        print("Appel du script rekrute")
-        return Rekrute.main()
+        for strategy in strategies:
+            get_driver_pool(strategy).warm()
+            print(f"Pool de WebDrivers prêt ({strategy})")
     except Exception as e:
-        print(f"Exception lors de l'execution du script rekrute: {e}")
-        raise self.retry(exc=e)
+        print(f"Impossible de préchauffer le pool de WebDrivers : {e}")
+
+
+@worker_process_shutdown.connect
+def shutdown_driver_pool(**kwargs):
+    close_driver_pool()
+
+
+# 📈 Durée de chaque tâche ; les métriques du worker sont poussées après chaque tâche
+_task_starts = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, **kwargs):
+    start = _task_starts.pop(task_id, None)
+    if start is not None:
+        PIPELINE_TASK_SECONDS.labels(task.name).observe(time.perf_counter() - start)
+    push_metrics("celery")
+
+
+# 🚀 Tâches de scraping
+
+
+def run_scraper(task, site, full=None):
+    """Exécute le scraper d'un site avec le runner et renvoie son résultat.
+
+    Les offres restent dans le fichier : seul un manifeste compact (clé de l'objet,
+    nombre d'offres, taille, SHA-256) passe par le backend de résultats Redis.
+    Après le dernier essai, le marqueur d'échec du runner est renvoyé au lieu de
+    lever l'exception : un site en échec ne bloque ni les autres ni le callback du chord.
+    """
+    print(f"Appel du script {site}")
+    result = run_site(site, full)
+    if result["status"] == "failed":
+        print(f"Exception lors de l'execution du script {site}: {result['error']}")
+        if task.request.retries < task.max_retries:
+            raise task.retry(exc=RuntimeError(result["error"]))
+    return result
+
+
+@shared_task(name="rekrute", bind=True, max_retries=3, default_retry_delay=5)
+def rekrute_task(self, full=None):
+    return run_scraper(self, "Rekrute", full)
 
 
 @shared_task(name="bayt", bind=True, max_retries=3, default_retry_delay=5)
-def bayt_task(self):
-    try:
-        print("Appel du script bayt")
-        return bayt.main()
-    except Exception as e:
-        print(f"Exception lors de l'execution du script bayt: {e}")
-        raise self.retry(exc=e)
+def bayt_task(self, full=None):
+    return run_scraper(self, "Bayt", full)
 
 
 @shared_task(name="marocannonce", bind=True, max_retries=3, default_retry_delay=5)
-def marocann_task(self):
-    try:
-        print("Appel du script maroc annonces")
-        return MarocAnn.main()
-    except Exception as e:
-        print(f"Exception lors de l'execution du script marocann: {e}")
-        raise self.retry(exc=e)
+def marocann_task(self, full=None):
+    return run_scraper(self, "Maroc_annonces", full)
 
 
 @shared_task(name="emploi", bind=True, max_retries=3, default_retry_delay=5)
-def emploi_task(self):
-    try:
-        print("Appel du script emploi")
-        return emploi.main()
-    except Exception as e:
-        print(f"Exception lors de l'execution du script emploi: {e}")
-        raise self.retry(exc=e)
+def emploi_task(self, full=None):
+    return run_scraper(self, "emploi.ma", full)
 
 
 @shared_task(name="scrape_upload")
-def scrape_upload():
+def scrape_upload(results=None, source=None):
+    # results : manifestes des scrapers (callback du chord) ou manifeste d'un seul
+    # scraper (pipeline par source) ; seuls les fichiers listés sont envoyés
+    # source : n'envoie que le fichier de cette source (pipeline par source)
+    if isinstance(results, dict):
+        results = [results]
+    manifests = {}
+    for result in results or []:
+        if result.get("status") == "failed":
+            print(f"Scraping en échec pour {result['site']} : {result['error']}")
+        else:
+            print(
+                f"Scraping terminé pour {result['site']} : "
+                f"{result['new_records']} nouvelles offres, {result['records']} dans {result['key']}"
+            )
+            manifests[result["key"]] = result
     try:
         print("Upload des résultats du scraping")
-        scraping_upload()
-        return "Upload terminé"
+        keys = list(manifests) if results is not None else None
+        uploaded = scraping_upload(source=source, keys=keys)
+        objects = [manifests.get(key) or file_manifest(key) for key in uploaded]
+        return {"bucket": "webscraping", "objects": objects}
     except Exception as e:
         print(f"Exception lors de l'upload : {e}")
-        return "Erreur pendant l'upload"
+        return {"bucket": "webscraping", "objects": [], "error": str(e)}
+
+
+def pipeline_source(site):
+    """Clé d'une source dans les noms de fichiers et d'objets MinIO (ex. offres_emploi_bayt)."""
+    return os.path.splitext(OUTPUT_FILES[site])[0]
+
+
+def container_name(name, source=None):
+    """Nom du conteneur d'une étape, propre à la source pour les lancer en parallèle."""
+    return f"{name}_{source}" if source else name
 
 
 @shared_task(name="skillner_ner")
-def skillner_ner():
+def skillner_ner(upload=None, source=None):
+    # upload : manifeste de scrape_upload, seuls les objets envoyés sont analysés
+    object_keys = None
+    if upload is not None:
+        object_keys = [manifest["key"] for manifest in upload.get("objects", [])]
+        if not object_keys:
+            return "Aucun objet à analyser"
     client = docker.from_env()
     load_dotenv(".docker.env")
     try:
@@ -80,15 +164,15 @@ def skillner_ner():
         # Build image from Dockerfile
         print(f"Skillner image couldn't be found, building new one: {e}")
         skillner_image, build_logs = client.images.build(
-            path="/app/skillner",
-            dockerfile="Dockerfile.skillner",
+            path="/app",
+            dockerfile="skillner/Dockerfile.skillner",
             tag="job_analytics_app-skillner",
         )
     try:
         # Run the container
         container = client.containers.run(
             image=skillner_image,
-            name="skillner_container_temp",
+            name=container_name("skillner_container_temp", source),
             command="python skillner_logic.py",
             volumes={
                 "/var/run/docker.sock": {"bind": "/var/run/docker.sock", "mode": "rw"}
@@ -98,6 +182,9 @@ def skillner_ner():
                 "MINIO_API": os.getenv("MINIO_API"),
                 "MINIO_ROOT_USER": os.getenv("MINIO_ROOT_USER"),
                 "MINIO_ROOT_PASSWORD": os.getenv("MINIO_ROOT_PASSWORD"),
+                "SOURCE": source or "",
+                "OBJECT_KEYS": ",".join(object_keys or []),
+                "PUSHGATEWAY_URL": os.getenv("PUSHGATEWAY_URL", ""),
             },
             log_config=LogConfig(
                 type=LogConfig.types.JSON, config={"max-size": "10m", "max-file": "3"}
@@ -117,7 +204,7 @@ def skillner_ner():
 
 
 @shared_task(name="spark_cleaning")
-def spark_cleaning():
+def spark_cleaning(source=None):
     client = docker.from_env()
     load_dotenv(".docker.env")
     try:
@@ -127,15 +214,15 @@ def spark_cleaning():
         # Build image from Dockerfile
         print(f"Spark image couldn't be found, building new one: {e}")
         spark_image, build_logs = client.images.build(
-            path="/app/spark_pipeline",
-            dockerfile="Dockerfile.spark",
+            path="/app",
+            dockerfile="spark_pipeline/Dockerfile.spark",
             tag="job_analytics_app-spark_transform",
         )
     try:
         # Run the container
         container = client.containers.run(
             image=spark_image,
-            name="spark_transform_temp",
+            name=container_name("spark_transform_temp", source),
             command="spark-submit /opt/transform_job.py",
             volumes={
                 "/var/run/docker.sock": {"bind": "/var/run/docker.sock", "mode": "rw"},
@@ -145,6 +232,8 @@ def spark_cleaning():
                 "MINIO_API": os.getenv("MINIO_API"),
                 "MINIO_ROOT_USER": os.getenv("MINIO_ROOT_USER"),
                 "MINIO_ROOT_PASSWORD": os.getenv("MINIO_ROOT_PASSWORD"),
+                "SOURCE": source or "",
+                "PUSHGATEWAY_URL": os.getenv("PUSHGATEWAY_URL", ""),
             },
             log_config=LogConfig(
                 type=LogConfig.types.JSON, config={"max-size": "10m", "max-file": "3"}
@@ -165,7 +254,7 @@ def spark_cleaning():
 
 
 @shared_task(name="pipeline_loader")
-def pipeline_loader():
+def pipeline_loader(source=None):
     client = docker.from_env()
     load_dotenv(".docker.env")
     try:
@@ -175,15 +264,15 @@ def pipeline_loader():
         # Build image from Dockerfile
         print(f"pipeline_loader image couldn't be found, building new one: {e}")
         pipeline_loader_image, build_logs = client.images.build(
-            path="/app/postgres",
-            dockerfile="Dockerfile.pipeline",
+            path="/app",
+            dockerfile="Postgres/Dockerfile.pipeline",
             tag="job_analytics_app-pipeline_loader",
         )
     try:
         # Run the container
         container = client.containers.run(
             image=pipeline_loader_image,
-            name="pipeline_loader_transform_temp",
+            name=container_name("pipeline_loader_transform_temp", source),
             command="python load_offers.py",
             volumes={
                 "/var/run/docker.sock": {"bind": "/var/run/docker.sock", "mode": "rw"},
@@ -198,6 +287,8 @@ def pipeline_loader():
                 "POSTGRES_DB": os.getenv("POSTGRES_DB"),
                 "DB_HOST": os.getenv("DB_HOST"),
                 "DB_PORT": os.getenv("DB_PORT"),
+                "SOURCE": source or "",
+                "PUSHGATEWAY_URL": os.getenv("PUSHGATEWAY_URL", ""),
             },
             log_config=LogConfig(
                 type=LogConfig.types.JSON, config={"max-size": "10m", "max-file": "3"}
@@ -218,16 +309,55 @@ def pipeline_loader():
 
 
 @shared_task(name="scraping_workflow")
-def scraping_workflow():
-    scraping_tasks = chain(emploi_task.si() | rekrute_task.si() | marocann_task.si())
+def scraping_workflow(full=None, per_source=None):
+    # full=True : parcours complet de toutes les pages (rattrapage périodique)
+    # per_source=True (ou PIPELINE_MODE=per_source) : une chaîne indépendante par site
+    if per_source is None:
+        per_source = os.getenv("PIPELINE_MODE") == "per_source"
+    if per_source:
+        return source_pipelines(full)
+    # Les scrapers tournent en parallèle sur des workers séparés ; l'upload, callback
+    # du chord, démarre quand tous les sites ont terminé (ou échoué)
+    scraping_tasks = group(
+        emploi_task.si(full=full),
+        rekrute_task.si(full=full),
+        marocann_task.si(full=full),
+        bayt_task.si(full=full),
+    )
     workflow = chain(
-        scraping_tasks
-        | scrape_upload.si()
-        | skillner_ner.si()
+        chord(scraping_tasks, scrape_upload.s())
+        | skillner_ner.s()
         | spark_cleaning.si()
         | pipeline_loader.si()
     )()
-    return workflow
+    return workflow.id
+
+
+def source_pipelines(full=None):
+    """Lance une chaîne scraping → upload → NER → nettoyage → chargement par site.
+
+    Chaque étape ne traite que les fichiers de sa source : un site rapide arrive dans
+    Postgres sans attendre la fin des sites plus lents.
+    """
+    scrapers = [
+        (emploi_task, "emploi.ma"),
+        (rekrute_task, "Rekrute"),
+        (marocann_task, "Maroc_annonces"),
+        (bayt_task, "Bayt"),
+    ]
+    pipelines = []
+    for scraper_task, site in scrapers:
+        source = pipeline_source(site)
+        pipelines.append(
+            chain(
+                scraper_task.si(full=full)
+                | scrape_upload.s(source=source)
+                | skillner_ner.s(source=source)
+                | spark_cleaning.si(source=source)
+                | pipeline_loader.si(source=source)
+            )
+        )
+    return group(pipelines)().id
 
 
 ##celery for enrechissement_process
@@ -263,6 +393,7 @@ def enrichment_process():
                 "MINIO_API": os.getenv("MINIO_API"),
                 "MINIO_ROOT_USER": os.getenv("MINIO_ROOT_USER"),
                 "MINIO_ROOT_PASSWORD": os.getenv("MINIO_ROOT_PASSWORD"),
+                "PUSHGATEWAY_URL": os.getenv("PUSHGATEWAY_URL", ""),
                 "PYTHONPATH": "/app",
             },
             log_config=LogConfig(
@@ -6,6 +6,8 @@ from datetime import datetime
 
 import pandas as pd
 
+from data_extraction.Websites.offer_store import iter_jsonl
+
 # Répertoires possibles pour scraping_output/
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CANDIDATE_DIRS = [
@@ -28,22 +30,30 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
 def infer_source_from_filename(fname):
-    """Déduit la source d'un fichier JSON à partir de son nom."""
-    m = re.match(r"offres_emploi_(.+)\.json", fname, re.IGNORECASE)
-    return m.group(1).capitalize() if m else fname.replace(".json", "")
+    """Déduit la source d'un fichier JSON ou JSON Lines à partir de son nom."""
+    m = re.match(r"offres_emploi_(.+)\.jsonl?$", fname, re.IGNORECASE)
+    return m.group(1).capitalize() if m else os.path.splitext(fname)[0]
+
+
+def load_offers(path):
+    """Offres d'un fichier .json (tableau) ou .jsonl, ce dernier lu en flux (iter_jsonl)."""
+    if path.lower().endswith(".jsonl"):
+        return iter_jsonl(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 
 def load_and_annotate():
     """Charge et annote les offres d'emploi à partir de fichiers JSON dans un répertoire.
 
-    Récupère tous les fichiers JSON du répertoire SCRAPING_DIR, ajoute une annotation "via" à chaque offre, et les regroupe.
+    Récupère tous les fichiers JSON et JSON Lines du répertoire SCRAPING_DIR, ajoute une annotation "via" à chaque offre, et les regroupe.
 
     Returns:
         list: Liste de toutes les offres chargées et annotées.
     """
     all_offers = []
     json_files = sorted(
-        f for f in os.listdir(SCRAPING_DIR) if f.lower().endswith(".json")
+        f for f in os.listdir(SCRAPING_DIR) if f.lower().endswith((".json", ".jsonl"))
     )
     if not json_files:
         print(f"[WARN] Aucun JSON dans {SCRAPING_DIR}")
@@ -53,17 +63,17 @@ def load_and_annotate():
         full = os.path.join(SCRAPING_DIR, fname)
         via = infer_source_from_filename(fname)
         try:
-            with open(full, "r", encoding="utf-8") as f:
-                offers = json.load(f)
+            offers = load_offers(full)
         except Exception as e:
             print(f"[ERROR] Impossible de charger {fname}: {e}")
             continue
 
-        if isinstance(offers, list):
+        if isinstance(offers, list) or fname.lower().endswith(".jsonl"):
+            before = len(all_offers)
             for off in offers:
                 off["via"] = via
-            all_offers.extend(offers)
-            print(f"[OK] {len(offers)} offres depuis {fname} (via={via})")
+                all_offers.append(off)
+            print(f"[OK] {len(all_offers) - before} offres depuis {fname} (via={via})")
         else:
             print(f"[WARN] Contenu non-list dans {fname}")
 
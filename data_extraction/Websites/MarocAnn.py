@@ -1,5 +1,6 @@
 import re
 
+import requests
 from selenium import webdriver
 from selenium.common.exceptions import (
     NoSuchElementException,
@@ -7,19 +8,35 @@ from selenium.common.exceptions import (
     WebDriverException,
 )
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
 from data_extraction.Websites import (
-    check_duplicate,
-    init_driver,
-    load_json,
-    save_json,
     setup_logger,
-    validate_json,
+    validate_batch,
 )
+from data_extraction.Websites.checkpoints import Checkpoint
+from data_extraction.Websites.http_fetch import (
+    LazyDriver,
+    fetch,
+    fetch_details,
+    fetch_mode,
+    parse_mode,
+    parse_snapshot,
+)
+from data_extraction.Websites.offer_store import OUTPUT_FILES, iter_offers
+from data_extraction.Websites.parsers import (
+    parse_marocann_details,
+    parse_marocann_listing,
+)
+from data_extraction.Websites.url_index import get_url_index
+from data_extraction.Websites.waits import WAIT_STATS, wait_present
+from data_extraction.Websites.watermarks import IncrementalCrawl, parse_full_flag
 
 logger = setup_logger("maroc_ann.log")
+SOURCE = "Maroc_annonces"
+OUTPUT_FILE = OUTPUT_FILES[SOURCE]
+LISTING_URL = (
+    "https://www.marocannonces.com/maroc/offres-emploi-b309.html?kw=data+&pge={}"
+)
 
 
 def extract_offers(driver: webdriver.Chrome):
@@ -27,6 +44,8 @@ def extract_offers(driver: webdriver.Chrome):
     Extrait les offres d'emploi affichées sur la page actuelle de MarocAnnonces.
 
     Récupère les informations de base des offres, comme le titre, l'URL et la région.
+    En mode "snapshot" (SCRAPER_MAROC_ANNONCES_PARSE_MODE), le DOM est lu en un seul
+    appel et analysé avec parse_marocann_listing.
 
     Args:
         driver (webdriver.Chrome): Instance du WebDriver Selenium pour la navigation.
@@ -34,6 +53,11 @@ def extract_offers(driver: webdriver.Chrome):
     Returns:
         list: Liste de dictionnaires contenant les informations de base des offres.
     """
+    if parse_mode(SOURCE) == "snapshot":
+        offers = parse_snapshot(driver, parse_marocann_listing)
+        logger.info(f"{len(offers)} offres trouvées.")
+        return offers
+
     offers = []
     try:
         holders = driver.find_elements(
@@ -63,6 +87,22 @@ def extract_offers(driver: webdriver.Chrome):
     return offers
 
 
+def extract_offers_http(page_url):
+    """Version HTTP de extract_offers : télécharge et analyse la page sans navigateur.
+
+    Returns:
+        list: Les offres de la page (vide en fin de pagination), ou None si la page n'a
+        pas pu être téléchargée ou analysée (le scraper repasse alors par Selenium).
+    """
+    try:
+        offers = parse_marocann_listing(fetch(page_url), base_url=page_url)
+    except requests.RequestException as e:
+        logger.warning(f"Échec du mode HTTP pour {page_url}, repli Selenium : {e}")
+        return None
+    logger.info(f"{len(offers)} offres trouvées.")
+    return offers
+
+
 def parse_details_text(text):
     """
     Analyse et structure le texte brut d'une offre d'emploi pour extraire ses détails.
@@ -147,9 +187,7 @@ def extract_offer_details(driver, offer_url):
         driver.set_page_load_timeout(60)
         driver.get(offer_url)
 
-        container = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.used-cars"))
-        )
+        container = wait_present(driver, By.CSS_SELECTOR, "div.used-cars")
         return parse_details_text(container.text.strip())
     except TimeoutException:
         logger.exception(f"Timeout pour l'URL {offer_url}")
@@ -160,6 +198,15 @@ def extract_offer_details(driver, offer_url):
     return {}
 
 
+def offer_details_from_html(page_html, base_url=""):
+    """Version HTML de extract_offer_details, pour une page téléchargée sans navigateur.
+
+    Raises:
+        PageParseError: Si la page ne contient pas le bloc de l'offre.
+    """
+    return parse_details_text(parse_marocann_details(page_html))
+
+
 def change_page(driver, base_url, page_num):
     """Navigue vers une page spécifique des résultats sur MarocAnnonces.
 
@@ -171,78 +218,135 @@ def change_page(driver, base_url, page_num):
         page_num (int): Numéro de la page à charger.
 
     Returns:
-        bool: True si la page est chargée avec succès, False sinon.
+        bool: True si la page est chargée avec succès, False s'il n'y a plus de page.
+
+    Raises:
+        Exception: Toute autre erreur de chargement, pour que le parcours ne soit pas
+            enregistré comme terminé.
     """
 
     try:
         driver.get(base_url.format(page_num))
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.holder"))
-        )
+        wait_present(driver, By.CSS_SELECTOR, "div.holder")
         logger.info(f"Page {page_num} chargée.")
         return True
     except TimeoutException:
         logger.info("Plus de page à parcourir")
-        False
+        return False
     except Exception as e:
         logger.exception(f"Erreur chargement page {page_num}: {e}")
-        return False
+        raise
+
 
+def add_offer_details(offers, mode, lazy_driver, url_index):
+    """Complète les offres d'une page de listing avec leurs pages de détail.
 
-def main(logger=setup_logger("maroc_ann.log")):
+    En mode "http", les pages de détail sont téléchargées en parallèle ; celles qui
+    échouent sont chargées avec Selenium.
+
+    Returns:
+        list: Les offres complétées, sans celles dont la date de publication est déjà connue.
+    """
+    prefetched = {}
+    if mode == "http":
+        prefetched = fetch_details(
+            [offer["job_url"] for offer in offers],
+            offer_details_from_html,
+            SOURCE,
+            logger,
+        )
+
+    new_data = []
+    for offer in offers:
+        url = offer["job_url"]
+        details = prefetched.get(url)
+        if details is None:
+            logger.info(f"Détails en cours pour : {url}")
+            details = extract_offer_details(lazy_driver.get(), url)
+        offer.update(details)
+
+        pub_date = offer.get("publication_date")
+        if pub_date and url_index.has_publication_date(SOURCE, pub_date):
+            logger.info(f"Offre déjà existante (date: {pub_date}), ignorée.")
+            continue
+
+        new_data.append(offer)
+    return new_data
+
+
+def main(logger=setup_logger("maroc_ann.log"), full=None):
     """Exécute l'extraction des offres d'emploi sur MarocAnnonces.
 
     Orchestre l'initialisation du WebDriver, la navigation sur MarocAnnonces, l'extraction des offres, et leur sauvegarde.
+    En mode "http" (SCRAPER_MAROC_ANNONCES_FETCH_MODE), les pages de listing sont
+    téléchargées sans navigateur, avec repli sur Selenium en cas d'échec, et les pages
+    de détail sont récupérées en parallèle (SCRAPER_MAROC_ANNONCES_DETAIL_CONCURRENCY).
+    En mode incrémental, la pagination s'arrête à la première page sans nouvelle offre.
+    Les détails sont récupérés et les offres écrites page par page (checkpoints) : une
+    exécution interrompue reprend après la dernière page terminée.
 
     Args:
         logger (logging.Logger, optional): Instance du logger pour enregistrer les événements. Par défaut utilise setup_logger("maroc_ann.log").
+        full (bool, optional): Parcourt toutes les pages (rattrapage). Par défaut SCRAPER_MAROC_ANNONCES_FULL.
 
     Returns:
         list: Liste des nouvelles offres d'emploi extraites.
     """
-    driver = init_driver()
-    old_data = load_json("offres_marocannonces.json")
-    all_offers, new_data = [], []
+    WAIT_STATS.reset()
+    mode = fetch_mode(SOURCE)
+    lazy_driver = LazyDriver(SOURCE, logger=logger)
+    if mode == "selenium":
+        lazy_driver.get()
+    url_index = get_url_index()
+    url_index.bootstrap(SOURCE, lambda: iter_offers(OUTPUT_FILE))
+    crawl = IncrementalCrawl(SOURCE, full, logger)
+    checkpoint = Checkpoint(SOURCE, OUTPUT_FILE, crawl, logger)
+    new_data = []
 
     try:
-        base_url = "https://www.marocannonces.com/maroc/offres-emploi-b309.html?kw=data+&pge={}"
         page = 1
 
-        while change_page(driver, base_url, page):
-            offers = extract_offers(driver)
+        while True:
+            if checkpoint.is_done(page):
+                page += 1
+                continue
+            offers = None
+            if mode == "http":
+                offers = extract_offers_http(LISTING_URL.format(page))
+            if offers is None:
+                driver = lazy_driver.get()
+                if not change_page(driver, LISTING_URL, page):
+                    break
+                offers = extract_offers(driver)
             if not offers:
                 logger.info("Fin de la pagination.")
                 break
-            all_offers.extend(offers)
+            new_offers = [
+                offer
+                for offer in offers
+                if offer.get("job_url") and not url_index.seen(offer["job_url"])
+            ]
+            page_data = add_offer_details(new_offers, mode, lazy_driver, url_index)
+            new_data.extend(page_data)
+            logger.info(
+                f"Page {page} traitée : {len(offers)} offres, "
+                f"{len(page_data)} nouvelles"
+            )
+            more_pages = crawl.page_done(new_offers)
+            checkpoint.page_done(page, page_data)
             page += 1
+            if not more_pages:
+                break
 
-        logger.info(f"{len(all_offers)} offres collectées (sans détails)")
-
-        for offer in all_offers:
-            url = offer.get("job_url")
-            if not url or check_duplicate(old_data, url):
-                continue
-
-            logger.info(f"Détails en cours pour : {url}")
-            offer.update(extract_offer_details(driver, url))
-
-            pub_date = offer.get("publication_date")
-            if pub_date and any(
-                pub_date == o.get("publication_date") for o in old_data
-            ):
-                logger.info(f"Offre déjà existante (date: {pub_date}), ignorée.")
-                continue
-
-            try:
-                validate_json(offer)
-                new_data.append(offer)
-            except Exception as e:
-                logger.exception(f"Offre invalide : {url} - {e}")
+        crawl.save()
+        checkpoint.clear()
 
     finally:
-        if driver:
-            driver.quit()
-        save_json(new_data, "offres_marocannonces.json")
+        lazy_driver.quit()
+        WAIT_STATS.report(logger)
+        for index, message in validate_batch(new_data):
+            logger.error(f"Offre invalide : {new_data[index]['job_url']} - {message}")
+        checkpoint.flush(new_data)
         logger.info(
             f"Scraping terminé avec {len(new_data)} nouvelles offres collectées."
         )
@@ -251,4 +355,4 @@ def main(logger=setup_logger("maroc_ann.log")):
 
 
 if __name__ == "__main__":
-    main()
+    main(full=parse_full_flag())
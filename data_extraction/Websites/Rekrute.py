@@ -1,21 +1,46 @@
 import time
 
+import requests
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
 from data_extraction.Websites import (
-    check_duplicate,
-    init_driver,
-    load_json,
-    save_json,
     setup_logger,
-    validate_json,
+    site_setting,
+    validate_batch,
 )
+from data_extraction.Websites.checkpoints import Checkpoint
+from data_extraction.Websites.http_fetch import (
+    LazyDriver,
+    fetch,
+    fetch_mode,
+    parse_mode,
+    parse_snapshot,
+)
+from data_extraction.Websites.offer_store import OUTPUT_FILES, iter_offers
+from data_extraction.Websites.parsers import (
+    PageParseError,
+    parse_rekrute_amount_link,
+    parse_rekrute_listing,
+    parse_rekrute_page_urls,
+)
+from data_extraction.Websites.sharding import crawl_shards, page_shards
+from data_extraction.Websites.url_index import get_url_index
+from data_extraction.Websites.waits import (
+    WAIT_STATS,
+    find_optional,
+    optional_text,
+    wait_present,
+)
+from data_extraction.Websites.watermarks import IncrementalCrawl, parse_full_flag
 
 logger = setup_logger("Rekrute.log")
+SOURCE = "Rekrute"
+OUTPUT_FILE = OUTPUT_FILES[SOURCE]
+BASE_URL = "https://www.rekrute.com"
+# Page de résultats de la recherche "DATA", utilisée par le mode HTTP
+SEARCH_URL = "https://www.rekrute.com/offres.html?s=1&p=1&o=1&query=DATA&keyword=DATA"
 
 
 # --- Fonction d'extraction des offres sur la page courante ---
@@ -23,6 +48,9 @@ def extract_offers(driver):
     """Extrait les offres d'emploi affichées sur la page actuelle de Rekrute.
 
     Récupère les informations détaillées des offres, comme le titre, l'URL, la description, et les compétences.
+    En mode "snapshot" (SCRAPER_REKRUTE_PARSE_MODE), le DOM est lu en un seul appel et
+    analysé avec parse_rekrute_listing ; la lecture élément par élément ne sert plus
+    qu'en repli.
 
     Args:
         driver (webdriver.Chrome): Instance du WebDriver Selenium pour la navigation.
@@ -31,10 +59,13 @@ def extract_offers(driver):
         list: Liste de dictionnaires contenant les informations des offres.
     """
 
-    try:
-        data = load_json("offres_emploi_rekrute.json")
-    except FileNotFoundError:
-        data = []
+    if parse_mode(SOURCE) == "snapshot":
+        try:
+            return filter_new_offers(parse_snapshot(driver, parse_rekrute_listing))
+        except PageParseError as e:
+            logger.warning(f"Analyse du DOM impossible, lecture par élément : {e}")
+
+    url_index = get_url_index()
     offers_list = []
 
     holders = driver.find_elements(By.CSS_SELECTOR, "div.holder")
@@ -48,64 +79,38 @@ def extract_offers(driver):
             info_divs = []
 
         titre = ""
+        job_url = ""
         try:
             parent_div = holder.find_element(By.XPATH, "./ancestor::div[1]")
 
             titre = parent_div.find_element(By.CSS_SELECTOR, "a.titreJob")
             job_url = titre.get_attribute("href")
-            if check_duplicate(data, job_url):
+            if url_index.seen(job_url):
                 continue
 
             titre = titre.text.strip()
 
-        # 1. Récupérer les prerequis du poste
         except NoSuchElementException:
             titre = ""
 
+        # 1. Récupérer les prerequis du poste
         competences = ""
         if len(info_divs) >= 1:
-            try:
-                field = holder.find_element(By.CSS_SELECTOR, "i.fa.fa-search")
-
-                parent_div = field.find_element(By.XPATH, "./ancestor::div[1]")
-
-                competences = parent_div.find_element(By.TAG_NAME, "span").text.strip()
-            except NoSuchElementException:
-                competences = ""
+            competences = icon_field_text(holder, "fa-search")
         # 2. Récupérer la description de la societe
         companie = ""
         if len(info_divs) >= 2:
-            try:
-                field = holder.find_element(By.CSS_SELECTOR, "i.fa.fa-industry")
-
-                parent_div = field.find_element(By.XPATH, "./ancestor::div[1]")
-
-                companie = parent_div.find_element(By.TAG_NAME, "span").text.strip()
-
-            except NoSuchElementException:
-                companie = ""
+            companie = icon_field_text(holder, "fa-industry")
 
         # 3. Récupérer la description de la mission
         description = ""
         if len(info_divs) >= 2:
-            try:
-                field = holder.find_element(By.CSS_SELECTOR, "i.fa.fa-binoculars")
-
-                parent_div = field.find_element(By.XPATH, "./ancestor::div[1]")
-
-                description = parent_div.find_element(By.TAG_NAME, "span").text.strip()
-            except NoSuchElementException:
-                description = ""
+            description = icon_field_text(holder, "fa-binoculars")
         # 4. Récupérer les dates de publication et le nombre de postes (<em class="date">)
         pub_start = ""
-        try:
-            date_elem = holder.find_element(By.CSS_SELECTOR, "em.date")
-
-            spans = date_elem.find_elements(By.TAG_NAME, "span")
-            pub_start = spans[0].text.strip() if len(spans) > 0 else ""
-
-        except NoSuchElementException:
-            pass
+        date_elem = find_optional(holder, By.CSS_SELECTOR, "em.date")
+        if date_elem is not None:
+            pub_start = optional_text(date_elem, By.TAG_NAME, "span")
 
         # 5. Récupérer les détails complémentaires (dernière div.info contenant une liste <li>)
         secteur = secteur = niveau_experience = niveau_etudes = contrat = ""
@@ -141,19 +146,83 @@ def extract_offers(driver):
             "via": "Rekrute",
             "job_url": job_url,
         }
-        try:
-            validate_json(offer)
-            if not check_duplicate(data, offer["job_url"]):
-                offers_list.append(offer)
+        offers_list.append(offer)
+
+    log_validation_errors(offers_list)
+    return offers_list
 
-        except Exception as e:
-            logger.exception(f"Erreur de validation JSON : {e}")
 
-            continue
+def log_validation_errors(offers):
+    """Valide les offres d'une page en une passe et journalise les invalides."""
+    for index, message in validate_batch(offers):
+        logger.error(
+            f"Erreur de validation JSON ({offers[index]['job_url']}) : {message}"
+        )
 
+
+def icon_field_text(holder, icon):
+    """Texte du <span> du bloc contenant l'icône Font Awesome donnée, "" si absent.
+
+    La recherche ne bloque jamais : un champ manquant ne coûte pas d'attente implicite.
+    """
+    field = find_optional(holder, By.CSS_SELECTOR, f"i.fa.{icon}")
+    if field is None:
+        return ""
+    parent_div = find_optional(field, By.XPATH, "./ancestor::div[1]")
+    if parent_div is None:
+        return ""
+    return optional_text(parent_div, By.TAG_NAME, "span")
+
+
+def absolute_url(page_url):
+    """Complète une URL relative de Rekrute avec le domaine."""
+    if page_url and not page_url.startswith("http"):
+        return BASE_URL + page_url
+    return page_url
+
+
+def filter_new_offers(offers):
+    """Retire les offres déjà connues de l'index et valide les autres."""
+    url_index = get_url_index()
+    offers_list = [offer for offer in offers if not url_index.seen(offer["job_url"])]
+    log_validation_errors(offers_list)
     return offers_list
 
 
+def extract_offers_http(page_url):
+    """Version HTTP de extract_offers : télécharge et analyse la page sans navigateur.
+
+    Returns:
+        list: Les nouvelles offres de la page, ou None si la page n'a pas pu être
+        téléchargée ou analysée (le scraper repasse alors par Selenium).
+    """
+    page_url = absolute_url(page_url)
+    try:
+        offers = parse_rekrute_listing(fetch(page_url), base_url=page_url)
+    except (requests.RequestException, PageParseError) as e:
+        logger.warning(f"Échec du mode HTTP pour {page_url}, repli Selenium : {e}")
+        return None
+    return filter_new_offers(offers)
+
+
+def get_pages_url_http():
+    """Version HTTP de get_pages_url.
+
+    Returns:
+        list: URLs des pages de résultats, ou None si la pagination n'a pas pu être
+        récupérée sans navigateur.
+    """
+    try:
+        search_url = site_setting(SOURCE, "SEARCH_URL", SEARCH_URL)
+        amount_link = parse_rekrute_amount_link(fetch(search_url), base_url=search_url)
+        page_urls = parse_rekrute_page_urls(fetch(absolute_url(amount_link)))
+    except (requests.RequestException, PageParseError) as e:
+        logger.warning(f"Pagination HTTP indisponible, repli Selenium : {e}")
+        return None
+    logger.info(f"Nombre total de pages :{len(page_urls)}")
+    return page_urls
+
+
 def access_rekrute(driver):
     """Accède à la page de recherche de Rekrute et soumet une recherche pour 'DATA'.
 
@@ -165,9 +234,7 @@ def access_rekrute(driver):
     driver.get(base_url)
 
     # Attendre que la barre de recherche soit disponible, puis saisir "DATA"
-    search_input = WebDriverWait(driver, 15).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "#keywordSearch"))
-    )
+    search_input = wait_present(driver, By.CSS_SELECTOR, "#keywordSearch")
     search_input.clear()
     search_input.send_keys("DATA" + Keys.RETURN)
 
@@ -179,10 +246,8 @@ def get_pages_url(driver):
     """
     try:
         # Sélecteur adapté pour la nouvelle structure
-        pagination = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.slide-block div.pagination")
-            )
+        pagination = wait_present(
+            driver, By.CSS_SELECTOR, "div.slide-block div.pagination"
         )
         amount_of_offers = pagination.find_element(
             By.CSS_SELECTOR, "ul.amount"
@@ -192,10 +257,8 @@ def get_pages_url(driver):
             "href"
         )
         driver.get(page_link)
-        pagination = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.slide-block div.pagination select")
-            )
+        pagination = wait_present(
+            driver, By.CSS_SELECTOR, "div.slide-block div.pagination select"
         )
         page_options = pagination.find_elements(By.TAG_NAME, "option")
         total_pages = len(page_options)
@@ -218,53 +281,96 @@ def change_page(driver, page_url):
     if page_url:
         # Si l'URL est relative, on complète avec le domaine
         if not page_url.startswith("http"):
-            page_url = "https://www.rekrute.com" + page_url
+            page_url = absolute_url(page_url)
             logger.info(f"accessing the page url: {page_url}")
         logger.info(f"Navigation vers la page : {page_url}")
         driver.get(page_url)
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.holder"))
-        )
+        wait_present(driver, By.CSS_SELECTOR, "div.holder")
 
 
-def main(logger=setup_logger("Rekrute.log")):
+def scrape_page(lazy_driver, page_url):
+    """Extrait les nouvelles offres d'une page de résultats, en HTTP si possible.
+
+    Le WebDriver n'est emprunté (lazy_driver.get()) que pour le repli Selenium.
+    """
+    offers = extract_offers_http(page_url) if fetch_mode(SOURCE) == "http" else None
+    if offers is None:
+        driver = lazy_driver.get()
+        change_page(driver, page_url)
+        offers = extract_offers(driver)
+    return offers
+
+
+def main(logger=setup_logger("Rekrute.log"), full=None):
     """Exécute l'extraction des offres d'emploi sur Rekrute.
 
     Orchestre l'initialisation du WebDriver, la navigation sur Rekrute, l'extraction des offres, et leur sauvegarde.
+    En mode "http" (SCRAPER_REKRUTE_FETCH_MODE), les pages sont téléchargées sans navigateur
+    et le WebDriver n'est démarré que si une page ne peut pas être analysée.
+    En mode incrémental, la pagination s'arrête à la première page sans nouvelle offre ;
+    un parcours complet peut être réparti sur plusieurs WebDrivers (SCRAPER_REKRUTE_PAGE_SHARDS).
+    Les offres sont écrites page par page (checkpoints) : une exécution interrompue
+    reprend après la dernière page terminée.
+    Une erreur est journalisée puis propagée, après l'écriture des offres déjà extraites.
 
     Args:
         logger (logging.Logger, optional): Instance du logger pour enregistrer les événements. Par défaut utilise setup_logger("Rekrute.log").
+        full (bool, optional): Parcourt toutes les pages (rattrapage). Par défaut SCRAPER_REKRUTE_FULL.
 
     Returns:
         list: Liste des offres d'emploi extraites.
     """
-    driver = init_driver()
+    mode = fetch_mode(SOURCE)
+    lazy_driver = LazyDriver(SOURCE, logger=logger)
+    if mode == "selenium":
+        lazy_driver.get()
     start_time = time.time()
     logger.info("Début de l'extraction des offres d'emploi sur Rekrute")
+    WAIT_STATS.reset()
+    url_index = get_url_index()
+    url_index.bootstrap(SOURCE, lambda: iter_offers(OUTPUT_FILE))
+    crawl = IncrementalCrawl(SOURCE, full, logger)
+    checkpoint = Checkpoint(SOURCE, OUTPUT_FILE, crawl, logger)
+    data = []  # Liste qui contiendra toutes les offres
     try:
-        # --- Initialisation du driver Chrome ---
-
-        data = []  # Liste qui contiendra toutes les offres
-        access_rekrute(driver)
-        logger.info("Accès à la page de recherche réussi.")
-        page_urls = get_pages_url(driver)
-        for page_number in range(1, len(page_urls) + 1):
-            change_page(driver, page_urls[page_number - 1])
-            data.extend(extract_offers(driver))
+        page_urls = get_pages_url_http() if mode == "http" else None
+        if page_urls is None:
+            driver = lazy_driver.get()
+            access_rekrute(driver)
+            logger.info("Accès à la page de recherche réussi.")
+            page_urls = get_pages_url(driver)
+        if page_shards(SOURCE) > 1 and not crawl.incremental:
+            lazy_driver.quit()  # Les workers empruntent leurs propres drivers
+            data = crawl_shards(
+                page_urls, scrape_page, SOURCE, logger, checkpoint=checkpoint
+            )
+            crawl.page_done(data, pages=len(page_urls))
+            page_urls = []
+        for page_number, page_url in enumerate(page_urls, start=1):
+            if checkpoint.is_done(page_url):
+                continue
+            offers = scrape_page(lazy_driver, page_url)
+            data.extend(offers)
             logger.info(
                 f"Page {page_number} traitée, total offres cumulées :{len(data)}"
             )
-        # Boucle pour parcourir toutes les pages
+            more_pages = crawl.page_done(offers)
+            checkpoint.page_done(page_url, offers)
+            if not more_pages:
+                break
+        crawl.save()
+        checkpoint.clear()
     except Exception as e:
         logger.exception(f"Erreur lors de l'extraction :{e}")
+        raise
     finally:
-        if driver:
-            driver.quit()
-        save_json(data, filename="offres_emploi_rekrute.json")
+        lazy_driver.quit()
+        WAIT_STATS.report(logger)
+        checkpoint.flush(data)
         logger.info(f"Nouvelles offres extraites : {len(data)}")
         logger.info(f"Extraction terminée en {time.time() - start_time} secondes.")
     return data
 
 
 if __name__ == "__main__":
-    main()
+    main(full=parse_full_flag())
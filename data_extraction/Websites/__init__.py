@@ -1,23 +1,77 @@
 import json
 import logging  # noqa
 import os  # noqa
+import re
+import threading
+from contextlib import contextmanager
 
 import undetected_chromedriver as uc
-from jsonschema import ValidationError, validate
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
 from selenium.webdriver.chrome.options import Options
 
+from data_extraction.Websites.stages import VALIDATION, stage
+from monitoring import VALIDATION_FAILURES
+
 current_path = os.path.abspath(__file__)
 current_dir = os.path.dirname(current_path)
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import fastjsonschema
+except ImportError:  # Dépendance optionnelle : validation par jsonschema
+    fastjsonschema = None
+
+SCHEMA_PATH = os.path.join(current_dir, "Job_schema.json")
+
+# Hôte de chaque source (replay, limiteur de débit)
+SITE_HOSTS = {
+    "Rekrute": "www.rekrute.com",
+    "Bayt": "www.bayt.com",
+    "emploi.ma": "www.emploi.ma",
+    "Maroc_annonces": "www.marocannonces.com",
+}
+
+_patch_lock = threading.Lock()
+_driver_patched = False
+
+
+def patch_chromedriver(chrome_driver_path):
+    """Patche le binaire chromedriver avec undetected_chromedriver, une fois par processus.
+
+    Les appels suivants à init_driver ne relancent pas uc.Patcher.
+    """
+    global _driver_patched
+    with _patch_lock:
+        if _driver_patched:
+            return
+        try:
+            uc_patcher = uc.Patcher(
+                executable_path=os.path.join(chrome_driver_path, "chromedriver")
+            )
+            if not uc_patcher.is_binary_patched():
+                uc_patcher.patch_exe()
+                print("chromedriver binary has now been patched")
+            else:
+                print("chromedriver doesnt need patching")
+            _driver_patched = True
+        except Exception as e:
+            print(f"Exception during patching {e}")
+
 
-def init_driver():
+def init_driver(page_load_strategy="eager"):
     """
     Initialise une instance de WebDriver Selenium pour la navigation web.
 
     Configure un WebDriver en utilisant les variables d'environnement pour les chemins du navigateur et du driver.
 
     Args:
-        Aucun
+        page_load_strategy (str, optional): Stratégie de chargement des pages ("eager" pour
+            le profil léger, "normal" pour le profil complet, voir browser_profile.py).
 
     Returns:
         uc.Chrome: Une instance de WebDriver configurée et prête à l'usage.
@@ -47,17 +101,10 @@ def init_driver():
         "--disable-dev-shm-usage"
     )  # évite les erreurs liées à /dev/shm
     chrome_options.add_argument("--disable-gpu")
-    try:
-        uc_patcher = uc.Patcher(
-            executable_path=os.path.join(chrome_driver_path, "chromedriver")
-        )
-        if not uc_patcher.is_binary_patched():
-            uc_patcher.patch_exe()
-            print("chromedriver binary has now been patched")
-        else:
-            print("chromedriver doesnt need patching")
-    except Exception as e:
-        print(f"Exception during patching {e}")
+    # "eager" : les scrapers attendent explicitement leurs éléments, inutile d'attendre
+    # les ressources secondaires ; choisie par site avec le profil (browser_profile.py)
+    chrome_options.page_load_strategy = page_load_strategy
+    patch_chromedriver(chrome_driver_path)
 
     patched_chrome_driver_path = os.path.join(
         chrome_driver_path, "undetected_chromedriver"
@@ -71,9 +118,9 @@ def init_driver():
     except FileNotFoundError:
         driver = uc.Chrome(browser_executable_path=chrome_path, options=chrome_options)
         print(f"The patched executable wasnt found in: {patched_chrome_driver_path}")
-    driver.implicitly_wait(
-        10
-    )  # Time before the program exits in case of exception in seconds, will not wait if the program runs normally
+    # Pas d'attente implicite : un champ optionnel absent échoue immédiatement, les
+    # conditions de page prête sont attendues explicitement (voir waits.py)
+    driver.implicitly_wait(0)
 
     return driver
 
@@ -149,101 +196,122 @@ def highlight(
         )
 
 
-def load_json(filename="default.json", encoding="utf-8"):
-    """Charge les données JSON d'un fichier ou crée un nouveau fichier s'il n'existe pas."""
-    current_path = os.path.abspath(__file__)
-    current_dir = os.path.dirname(current_path)  # Websites directory
-    parent_dir = os.path.dirname(current_dir)  # Data extraction directory
-    filename = os.path.join(parent_dir, "scraping_output", filename)
-    try:
-        data = json.load(open(filename, "r", encoding=encoding))
-    except FileNotFoundError:
-        logging.info("Json file not found creating new one")
-        data = []
-        with open(filename, "w", encoding="utf-8") as js_file:
-            json.dump(data, js_file, ensure_ascii=False, indent=4)
-    return data
-
+class CompiledValidator:
+    """Validateur d'un schéma JSON, chargé et compilé une seule fois.
 
-def save_json(data: list, filename="default.json", output_directory="scraping_output"):
-    """
-    Sauvegarde une liste de données JSON dans un fichier, en fusionnant avec les données existantes.
-
-    Args:
-        data (list): La liste des données d'offres à sauvegarder.
-        filename (str, optional): Nom du fichier JSON de sortie.
-        output_directory (str, optional): Répertoire pour sauvegarder le fichier.
+    Si fastjsonschema est installé, le schéma est compilé en une fonction Python
+    générée ; sinon le validateur jsonschema correspondant au schéma est réutilisé
+    pour toutes les offres. Comme jsonschema.validate, les "format" ne sont pas vérifiés.
     """
 
-    current_path = os.path.abspath(__file__)
-    current_dir = os.path.dirname(current_path)
-    parent_dir = os.path.dirname(current_dir)
-
-    output_path = os.path.join(parent_dir, output_directory)
-    os.makedirs(output_path, exist_ok=True)
-
-    os.chdir(output_path)
-
-    existing_data = []
-    if os.path.exists(filename):
-        try:
-            with open(filename, "r", encoding="utf-8") as js_file:
-                existing_data = json.load(js_file)
-        except json.JSONDecodeError:
-            logging.warning(
-                f"{filename} exists but contains invalid JSON. Overwriting."
-            )
-
-    merged_data = existing_data + data
-    logging.info(f"Saving {len(merged_data)} jobs to {filename}, {len(data)} new jobs")
-
-    with open(filename, "w", encoding="utf-8") as js_file:
-        json.dump(merged_data, js_file, ensure_ascii=False, indent=4)
-
-    # ✅ Ensure file is writable by container user on future runs
-    try:
-        os.chmod(filename, 0o666)  # rw-rw-rw-
-    except PermissionError:
-        logging.warning(f"Could not change permissions on {filename}")
+    def __init__(self, schema_path=SCHEMA_PATH):
+        with open(schema_path) as f:
+            self.schema = json.load(f)
+        validator_class = validator_for(self.schema)
+        validator_class.check_schema(self.schema)
+        self.validator = validator_class(self.schema)
+        self._compiled = None
+        self.backend = "jsonschema"
+        if fastjsonschema is not None:
+            self._compiled = fastjsonschema.compile(self.schema, use_formats=False)
+            self.backend = "fastjsonschema"
+
+    def error(self, record):
+        """Message d'erreur de validation d'un enregistrement, ou None s'il est valide."""
+        if self._compiled is not None:
+            try:
+                self._compiled(record)
+                return None
+            except fastjsonschema.JsonSchemaValueException as e:
+                return e.message
+        error = best_match(self.validator.iter_errors(record))
+        return error.message if error is not None else None
+
+
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def get_validator(schema_path=SCHEMA_PATH):
+    """Renvoie le validateur compilé d'un schéma, créé au premier appel."""
+    with _validators_lock:
+        if schema_path not in _validators:
+            _validators[schema_path] = CompiledValidator(schema_path)
+        return _validators[schema_path]
+
+
+def validate_batch(records, schema_path=SCHEMA_PATH):
+    """Valide une liste d'offres en une passe avec le validateur compilé.
 
+    Args:
+        records (list): Les offres à valider.
+        schema_path (str, optional): Chemin vers le fichier de schéma.
 
-def validate_json(
-    data,
-    schema_path=os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "Job_schema.json"
-    ),
-):
+    Returns:
+        list: Couples (indice de l'offre, message d'erreur) des offres invalides.
     """
-    Valide des données JSON par rapport à un schéma spécifié.
-
-     Vérifie si les données d'entrée respectent le schéma chargé à partir d'un fichier.
-
-     Args:
-         data: Les données JSON à valider.
-         schema_path (str, optional): Chemin vers le fichier de schéma. Par défaut "Job_schema.json" dans le répertoire du script.
-
-     Returns:
-         None
+    validator = get_validator(schema_path)
+    errors = []
+    with stage(VALIDATION):
+        for index, record in enumerate(records):
+            message = validator.error(record)
+            if message is not None:
+                errors.append((index, message))
+                VALIDATION_FAILURES.labels(record.get("via") or "inconnue").inc()
+    return errors
+
+
+def state_path(filename):
+    """Retourne le chemin d'un fichier d'état persistant des scrapers (index, etc.).
+
+    Le dossier est défini par la variable d'environnement SCRAPER_STATE_DIR, par défaut
+    le dossier "state" à côté de ce module. Il est créé s'il n'existe pas.
     """
+    state_dir = os.environ.get("SCRAPER_STATE_DIR") or os.path.join(
+        current_dir, "state"
+    )
+    os.makedirs(state_dir, exist_ok=True)
+    return os.path.join(state_dir, filename)
 
-    with open(schema_path) as f:
-        schema = json.load(f)
-    try:
-        validate(data, schema)
-    except ValidationError as e:
-        logging.error(f"Validation error: {e.message}")
-        return e
+
+def site_key(site):
+    """Nom d'un site tel qu'utilisé dans les variables d'environnement (ex. EMPLOI_MA)."""
+    return re.sub(r"\W", "_", site).upper()
 
 
-def check_duplicate(data, job_url):
-    """Vérifie si une URL d'offre existe déjà dans les données pour éviter les doublons."""
+def site_setting(site, name, default=None):
+    """Lit un paramètre de scraping propre à un site depuis les variables d'environnement.
 
-    # Check if the job URL already exists in the data
-    for job in data[:][:]:
-        if job.get("job_url") == job_url:
-            logging.warning(f"Duplicate found: {job_url}")
-            return True
-    return False
+    Cherche SCRAPER_<SITE>_<NAME> (ex. SCRAPER_REKRUTE_FETCH_MODE), puis le réglage
+    global SCRAPER_<NAME>, et renvoie la valeur par défaut sinon.
+    """
+    for variable in (f"SCRAPER_{site_key(site)}_{name}", f"SCRAPER_{name}"):
+        value = os.environ.get(variable)
+        if value:
+            return value
+    return default
+
+
+def write_json_atomic(path, data, indent=None):
+    """Écrit un fichier JSON de façon atomique (fichier temporaire puis os.replace)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as js_file:
+        json.dump(data, js_file, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def file_lock(path):
+    """Verrou inter-processus (POSIX) autour de la réécriture d'un fichier d'état."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 # Set up a logger
@@ -2,7 +2,6 @@ import datetime
 import re
 import time
 
-from jsonschema import ValidationError
 from selenium import webdriver
 from selenium.common.exceptions import (
     ElementClickInterceptedException,
@@ -12,19 +11,39 @@ from selenium.common.exceptions import (
 )
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
 from data_extraction.Websites import (
-    check_duplicate,
-    init_driver,
-    load_json,
-    save_json,
     setup_logger,
-    validate_json,
+    validate_batch,
 )
+from data_extraction.Websites.browser_profile import lean_enabled
+from data_extraction.Websites.checkpoints import Checkpoint
+from data_extraction.Websites.http_fetch import (
+    LazyDriver,
+    fetch_details,
+    fetch_mode,
+    parse_mode,
+    parse_snapshot,
+)
+from data_extraction.Websites.offer_store import OUTPUT_FILES, iter_offers
+from data_extraction.Websites.parsers import PageParseError, parse_bayt_details
+from data_extraction.Websites.sharding import crawl_shards, page_shards
+from data_extraction.Websites.url_index import get_url_index
+from data_extraction.Websites.waits import (
+    WAIT_STATS,
+    optional_text,
+    wait_all_present,
+    wait_optional,
+    wait_present,
+)
+from data_extraction.Websites.watermarks import IncrementalCrawl, parse_full_flag
 
 logger = setup_logger("bayt.log")
+SOURCE = "Bayt"
+OUTPUT_FILE = OUTPUT_FILES[SOURCE]
+POPUP_SELECTOR = (
+    "body > div.cky-consent-container.cky-box-bottom-left > div > button > img"
+)
 
 
 def extract_date_from_text(text: str):
@@ -123,9 +142,7 @@ def access_bayt(driver: webdriver.Chrome):
     base_url = "https://www.bayt.com/en/morocco/"
     driver.get(base_url)
     # Attendre que la barre de recherche soit disponible, puis saisir "DATA"
-    search_input = WebDriverWait(driver, 15).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "input#text_search"))
-    )
+    search_input = wait_present(driver, By.CSS_SELECTOR, "input#text_search")
     search_input.clear()
     while driver.current_url == base_url:
         search_input.send_keys("DATA" + Keys.RETURN)
@@ -136,6 +153,9 @@ def extract_job_info(driver: webdriver.Chrome):
     Extrait les informations des offres d'emploi depuis une page de résultats Bayt.com.
 
     Récupère les URLs des offres, extrait leurs détails, et valide les données extraites.
+    En mode "http" (SCRAPER_BAYT_FETCH_MODE), les pages de détail sont téléchargées en
+    parallèle sans navigateur (SCRAPER_BAYT_DETAIL_CONCURRENCY) ; seules celles qui
+    échouent sont ouvertes avec le WebDriver.
 
     Args:
         driver (webdriver.Chrome): Instance du WebDriver Selenium pour la navigation.
@@ -143,58 +163,82 @@ def extract_job_info(driver: webdriver.Chrome):
     Returns:
         list: Liste des offres d'emploi sous forme de dictionnaires.
     """
-    try:
-        data = load_json("offres_emploi_bayt.json")
-    except FileNotFoundError:
-        data = []
-    job_urls = WebDriverWait(driver, 15).until(
-        EC.presence_of_all_elements_located(
-            (By.CSS_SELECTOR, "div.row.is-compact.is-m.no-wrap > h2 > a")
-        )
+    url_index = get_url_index()
+    job_urls = wait_all_present(
+        driver, By.CSS_SELECTOR, "div.row.is-compact.is-m.no-wrap > h2 > a"
     )
     job_urls = [job_url.get_attribute("href") for job_url in job_urls]
     offers = []
     # results_inner_card > ul > li.has-pointer-d.is-active > div.row.is-compact.is-m.no-wrap > h2 > a
     logger.info(f"Found {len(job_urls)} job offers.")
-    for i in range(len(job_urls)):
+    job_urls = [job_url for job_url in job_urls if not url_index.seen(job_url)]
+    prefetched = {}
+    if fetch_mode(SOURCE) == "http":
+        prefetched = fetch_details(job_urls, job_details_from_html, SOURCE, logger)
+    for job_url in job_urls:
         try:
-            job_url = job_urls[i]
-            if check_duplicate(data, job_url):
-                continue
-            driver.get(job_url)
-            try:
-                pop_up = WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located(
-                        (
-                            By.CSS_SELECTOR,
-                            "body > div.cky-consent-container.cky-box-bottom-left > div > button > img",
-                        )
-                    )
-                )
-                pop_up.click()
-                logger.info("Popup found and clicked.")
-            except (ElementClickInterceptedException, ElementNotInteractableException):
-                logger.info("No popup found — continuing without action.")
-
-            offer = extract_job_details(driver)
+            offer = prefetched.get(job_url)
+            if offer is None:
+                offer = extract_job_details_driver(driver, job_url)
             offer["job_url"] = job_url
-
-            try:
-                validate_json(offer)
-                offers.append(offer)
-            except ValidationError as e:
-                logger.exception(f"Erreur lors de validation JSON : {e}")
-                continue
-
+            offers.append(offer)
         except (
             ElementClickInterceptedException,
             ElementNotInteractableException,
             NoSuchElementException,
+            TimeoutException,
         ):
             logger.exception("An error occurred while extracting the job details")
+
+    for index, message in validate_batch(offers):
+        logger.error(f"JSON validation error ({offers[index]['job_url']}): {message}")
     return offers
 
 
+def extract_job_details_driver(driver: webdriver.Chrome, job_url: str):
+    """Ouvre une offre avec le WebDriver, ferme la popup de cookies et extrait ses détails."""
+    driver.get(job_url)
+    # The consent popup may never show up: short optional wait instead of 15s,
+    # skipped entirely when the lean profile already blocks the CookieYes widget
+    pop_up = None
+    if not lean_enabled(SOURCE):
+        pop_up = wait_optional(driver, By.CSS_SELECTOR, POPUP_SELECTOR)
+    if pop_up is None:
+        logger.info("No popup found — continuing without action.")
+    else:
+        try:
+            pop_up.click()
+            logger.info("Popup found and clicked.")
+        except (ElementClickInterceptedException, ElementNotInteractableException):
+            logger.info("Popup could not be clicked — continuing without action.")
+    if parse_mode(SOURCE) == "snapshot":
+        try:
+            return parse_snapshot(driver, job_details_from_html)
+        except PageParseError as e:
+            logger.warning(f"Snapshot parsing failed, reading elements one by one: {e}")
+    return extract_job_details(driver)
+
+
+def job_details_from_html(page_html: str, base_url: str = ""):
+    """Version HTML de extract_job_details, pour une page téléchargée sans navigateur.
+
+    Raises:
+        PageParseError: Si la page n'a pas la structure d'une offre Bayt.
+    """
+    fields = parse_bayt_details(page_html)
+    offer = {
+        "titre": fields["titre"],
+        "publication_date": extract_date_from_text(fields["posted"])
+        if fields["posted"]
+        else "",
+        "companie": fields["companie"],
+        "via": "Bayt",
+    }
+    if fields["details"]:
+        offer |= text_segmentation(fields["details"])
+    return offer
+
+
 def extract_job_details(driver: webdriver.Chrome):
     """Extrait les détails d'une offre d'emploi spécifique depuis sa page.
 
@@ -206,40 +250,20 @@ def extract_job_details(driver: webdriver.Chrome):
     Returns:
         dict: Dictionnaire contenant les détails de l'offre (ex. {"titre": ..., "publication_date": ..., "companie": ...}).
     """
+    titre = optional_text(driver, By.CSS_SELECTOR, 'h1[id="job_title"]')
     try:
-        titre = driver.find_element(By.CSS_SELECTOR, 'h1[id="job_title"]').text.strip()
-
-    except NoSuchElementException:
-        titre = ""
-    try:
-        publication_date = (
-            WebDriverWait(driver, 15)
-            .until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, 'span[id="jb-posted-date"]')
-                )
-            )
-            .text
-        )
+        publication_date = wait_present(
+            driver, By.CSS_SELECTOR, 'span[id="jb-posted-date"]'
+        ).text
         publication_date = extract_date_from_text(publication_date)
-    except NoSuchElementException:
+    except TimeoutException:
         publication_date = ""
-    try:
-        companie = driver.find_element(
-            By.CSS_SELECTOR, 'a[class="t-default t-bold"]>span'
-        ).text.strip()
-
-    except NoSuchElementException:
-        companie = ""
-
-    try:
-        job_details = driver.find_element(
-            By.CSS_SELECTOR, 'div[class="t-break"]'
-        ).text.strip()
-        job_details = text_segmentation(job_details)
+    companie = optional_text(
+        driver, By.CSS_SELECTOR, 'a[class="t-default t-bold"]>span'
+    )
 
-    except NoSuchElementException:
-        job_details = ""
+    job_details = optional_text(driver, By.CSS_SELECTOR, 'div[class="t-break"]')
+    job_details = text_segmentation(job_details) if job_details else {}
     offer = {
         "titre": titre,
         "publication_date": publication_date,
@@ -263,10 +287,8 @@ def find_number_of_pages(driver: webdriver.Chrome):
         int: Nombre total de pages, ou None si introuvable.
     """
     try:
-        num_of_pages = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "ul.pagination li.pagination-last-d a")
-            )
+        num_of_pages = wait_present(
+            driver, By.CSS_SELECTOR, "ul.pagination li.pagination-last-d a"
         )
         num_of_pages = num_of_pages.get_attribute("href").split("page=")[1]
         logger.info(f"Number of pages found :  {num_of_pages}")
@@ -310,50 +332,93 @@ def change_page(
         return False
 
 
-def main(logger=setup_logger("bayt.log")):
+def scrape_page(lazy_driver, main_page, page, max_pages):
+    """Charge une page de résultats et extrait ses nouvelles offres (pagination répartie)."""
+    driver = lazy_driver.get()
+    if not change_page(driver, main_page, page, max_pages):
+        return []
+    return extract_job_info(driver)
+
+
+def main(logger=setup_logger("bayt.log"), full=None):
     """Exécute l'extraction des offres d'emploi sur Bayt.com.
 
     Orchestre l'initialisation du WebDriver, la navigation sur Bayt.com, l'extraction des offres, et leur sauvegarde.
+    En mode incrémental, la pagination s'arrête à la première page sans nouvelle offre ;
+    un parcours complet peut être réparti sur plusieurs WebDrivers (SCRAPER_BAYT_PAGE_SHARDS).
+    Les offres sont écrites page par page (checkpoints) : une exécution interrompue
+    reprend après la dernière page terminée.
+    Une erreur est journalisée puis propagée, après l'écriture des offres déjà extraites.
 
     Args:
         logger (logging.Logger, optional): Instance du logger pour enregistrer les événements. Par défaut utilise setup_logger("bayt.log").
+        full (bool, optional): Parcourt toutes les pages (rattrapage). Par défaut SCRAPER_BAYT_FULL.
 
     Returns:
         list: Liste des offres d'emploi extraites.
     """
-    driver = init_driver()
+    WAIT_STATS.reset()
+    lazy_driver = LazyDriver(SOURCE, logger=logger)
+    driver = lazy_driver.get()
     start_time = time.time()
     logger.info("Début de l'extraction des offres d'emploi sur Bayt.com")
+    url_index = get_url_index()
+    url_index.bootstrap(SOURCE, lambda: iter_offers(OUTPUT_FILE))
+    crawl = IncrementalCrawl(SOURCE, full, logger)
+    checkpoint = Checkpoint(SOURCE, OUTPUT_FILE, crawl, logger)
+    data = []
     # Initialiser le driver
     try:
-        data = []
         # Accéder à la page de base
         access_bayt(driver)
         main_page = driver.current_url
         print(f"The main page url is {main_page}")
         logger.info("accessed search page")
-        # trouver le nombre de pages
-        max_pages = find_number_of_pages(driver)
-        current_page = 1
-        while change_page(driver, main_page, current_page, max_pages):
-            # Accéder aux offres d'emploi
-            logger.info(f"Going to page with url: {driver.current_url}")
-            data.extend(extract_job_info(driver))
-            logger.info(
-                f"Page number {current_page} done, cumulated offers: {len(data)}"
+        # trouver le nombre de pages ; sans pagination, les résultats tiennent sur une page
+        max_pages = find_number_of_pages(driver) or 1
+        if page_shards(SOURCE) > 1 and not crawl.incremental:
+            lazy_driver.quit()  # Each worker leases its own driver
+            data = crawl_shards(
+                list(range(1, max_pages + 1)),
+                lambda worker_driver, page: scrape_page(
+                    worker_driver, main_page, page, max_pages
+                ),
+                SOURCE,
+                logger,
+                checkpoint=checkpoint,
             )
-            current_page += 1
+            crawl.page_done(data, pages=max_pages)
+        else:
+            current_page = 1
+            while checkpoint.is_done(current_page):
+                current_page += 1
+            while change_page(driver, main_page, current_page, max_pages):
+                # Accéder aux offres d'emploi
+                logger.info(f"Going to page with url: {driver.current_url}")
+                offers = extract_job_info(driver)
+                data.extend(offers)
+                logger.info(
+                    f"Page number {current_page} done, cumulated offers: {len(data)}"
+                )
+                more_pages = crawl.page_done(offers)
+                checkpoint.page_done(current_page, offers)
+                if not more_pages:
+                    break
+                current_page += 1
         logger.info("All pages done.")
+        crawl.save()
+        checkpoint.clear()
     except Exception as e:
         logger.exception(f"An error occurred during extraction:{e}")
+        raise
     finally:
-        if driver:
-            driver.quit()
-        save_json(data, filename="offres_emploi_bayt.json")
+        lazy_driver.quit()
+        WAIT_STATS.report(logger)
+        checkpoint.flush(data)
         logger.info(f"Nouvelles offres extraites : {len(data)}")
         logger.info(f"Extraction terminée en {time.time() - start_time} secondes.")
     return data
 
 
 if __name__ == "__main__":
-    main()
+    main(full=parse_full_flag())
@@ -0,0 +1,163 @@
+"""Profil de navigateur "léger" : blocage des ressources inutiles au scraping.
+
+Les pages chargées par Selenium n'ont besoin que du HTML : images, médias, polices,
+publicités, traqueurs et widget de consentement (CookieYes sur Bayt) sont bloqués via
+CDP (Network.setBlockedURLs), et les drivers sont créés avec la stratégie de
+chargement "eager" (sans attendre les ressources secondaires). Le blocage est appliqué
+à chaque emprunt d'un driver au pool ; la stratégie étant fixée au démarrage de
+Chrome, chaque stratégie a son propre pool de drivers. Le profil peut donc être activé
+ou non par site avec SCRAPER_<SITE>_LEAN_PROFILE : désactivé, les pages sont chargées
+sans blocage et avec la stratégie "normal", comme dans un navigateur ordinaire.
+
+Pour chaque exécution, le nombre d'octets transférés et le temps de chargement des
+pages sont mesurés (Navigation/Resource Timing) et comparés aux dernières mesures
+faites avec le profil complet, enregistrées dans le dossier d'état des scrapers avec
+la stratégie de chargement utilisée.
+
+Variables d'environnement :
+    SCRAPER_<SITE>_LEAN_PROFILE: "0" désactive le profil léger du site (défaut "1").
+    SCRAPER_<SITE>_PAGE_LOAD_STRATEGY: Stratégie de chargement du profil léger
+        (défaut "eager") ; le profil complet utilise toujours "normal".
+"""
+
+import json
+import logging
+
+from data_extraction.Websites import (
+    file_lock,
+    site_key,
+    site_setting,
+    state_path,
+    write_json_atomic,
+)
+
+BASELINE_FILENAME = "page_load_baseline.json"
+LEAN_PAGE_LOAD_STRATEGY = "eager"
+FULL_PAGE_LOAD_STRATEGY = "normal"
+
+BLOCKED_URL_PATTERNS = [
+    # Images, médias et polices
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.bmp", "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.woff", "*.woff2", "*.ttf",
+    "*.otf", "*.eot",
+    # Publicité, mesure d'audience et consentement
+    "*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*googletagservices.com*",
+    "*adservice.google.*", "*facebook.net*", "*connect.facebook.com*",
+    "*hotjar.com*", "*criteo.com*", "*taboola.com*", "*outbrain.com*",
+    "*cookieyes.com*", "*clarity.ms*", "*tiktok.com*", "*linkedin.com/px*",
+]  # fmt: skip
+
+# Octets transférés et durée de chargement (DOMContentLoaded) de la page courante
+PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+let bytes = nav ? nav.transferSize : 0;
+for (const entry of performance.getEntriesByType('resource')) {
+    bytes += entry.transferSize || 0;
+}
+return {
+    bytes: bytes,
+    load_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : 0,
+};
+"""
+
+
+def lean_enabled(site):
+    """Indique si le profil léger est activé pour un site (SCRAPER_<SITE>_LEAN_PROFILE)."""
+    value = str(site_setting(site, "LEAN_PROFILE", "1")).lower()
+    return value not in ("0", "false", "no", "off")
+
+
+def page_load_strategy(site):
+    """Stratégie de chargement des drivers d'un site : "eager" avec le profil léger."""
+    if site is None:
+        return LEAN_PAGE_LOAD_STRATEGY
+    if not lean_enabled(site):
+        return FULL_PAGE_LOAD_STRATEGY
+    return site_setting(site, "PAGE_LOAD_STRATEGY", LEAN_PAGE_LOAD_STRATEGY)
+
+
+class ProfileRun:
+    """Mesures de chargement des pages d'un site pendant une exécution."""
+
+    def __init__(self, site, lean, strategy=None):
+        self.site = site
+        self.lean = lean
+        self.strategy = strategy or page_load_strategy(site)
+        self.pages = 0
+        self.bytes = 0
+        self.load_ms = 0.0
+
+    @property
+    def profile(self):
+        return "lean" if self.lean else "full"
+
+    def record(self, driver):
+        """Ajoute les mesures de la page courante du driver."""
+        try:
+            metrics = driver.execute_script(PAGE_METRICS_SCRIPT) or {}
+        except Exception as e:
+            logging.debug(f"Mesure de chargement impossible : {e}")
+            return
+        self.pages += 1
+        self.bytes += int(metrics.get("bytes") or 0)
+        self.load_ms += float(metrics.get("load_ms") or 0)
+
+    def report(self, logger=logging):
+        """Enregistre les moyennes de l'exécution et écrit le gain du profil léger."""
+        if not self.pages:
+            return
+        avg_bytes = self.bytes / self.pages
+        avg_ms = self.load_ms / self.pages
+        logger.info(
+            f"Profil {self.profile} ({self.strategy}) : {self.pages} pages, "
+            f"{self.bytes / 1e6:.2f} Mo, {avg_ms:.0f} ms de chargement moyen"
+        )
+        path = state_path(BASELINE_FILENAME)
+        with file_lock(path):
+            try:
+                with open(path, "r", encoding="utf-8") as js_file:
+                    baselines = json.load(js_file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                baselines = {}
+            site_baselines = baselines.setdefault(self.site, {})
+            site_baselines[self.profile] = {
+                "pages": self.pages,
+                "page_load_strategy": self.strategy,
+                "avg_bytes": avg_bytes,
+                "avg_load_ms": avg_ms,
+            }
+            write_json_atomic(path, baselines, indent=4)
+
+        full = site_baselines.get("full")
+        if self.lean and full:
+            saved_bytes = (full["avg_bytes"] - avg_bytes) * self.pages
+            saved_ms = (full["avg_load_ms"] - avg_ms) * self.pages
+            logger.info(
+                f"Gain du profil léger par rapport au profil complet : "
+                f"{saved_bytes / 1e6:.2f} Mo et {saved_ms / 1000:.1f} s de chargement"
+            )
+        elif self.lean:
+            logger.info(
+                f"Aucune mesure de référence du profil complet pour {self.site} : "
+                f"exécuter une fois avec SCRAPER_{site_key(self.site)}_LEAN_PROFILE=0"
+            )
+
+
+def apply_profile(driver, site):
+    """Active ou désactive le blocage des ressources pour le site sur ce driver.
+
+    Returns:
+        ProfileRun: Collecteur des mesures de chargement pour l'exécution.
+    """
+    lean = lean_enabled(site)
+    strategy = page_load_strategy(site)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS if lean else []}
+        )
+    except Exception as e:
+        logging.warning(f"Blocage des ressources indisponible : {e}")
+        lean = False
+    return ProfileRun(site, lean, strategy)
@@ -0,0 +1,218 @@
+"""Points de reprise page par page des exécutions de scraping.
+
+Après chaque page traitée, ses offres sont ajoutées au fichier de sortie et la page
+est marquée comme faite dans un fichier d'état propre au site. Les offres déjà écrites
+(job_url et date) sont ajoutées à un fichier JSON Lines à côté de ce fichier d'état
+plutôt que réécrites avec lui à chaque page : le coût d'une page ne croît pas avec le
+nombre de pages déjà faites. Si l'exécution est
+interrompue (conteneur tué, OOM, exception), la tentative suivante (retry Celery ou
+exécution planifiée) reprend ce point : les pages déjà faites sont sautées et l'état
+du parcours incrémental est restauré. Le point de reprise est effacé quand la
+pagination aboutit.
+
+L'index des URLs n'est mis à jour qu'en fin d'exécution (flush), comme avant : les
+offres d'une page ne filtrent donc pas celles des pages suivantes de la même
+exécution. Les offres déjà écrites par les tentatives précédentes sont ajoutées à
+l'index à ce moment-là.
+
+Avant d'être écrites, les offres reçoivent leur canonical_id (near_duplicates) : les
+doublons d'offres d'autres sources ou d'autres URLs sont écrits mais étiquetés.
+
+Variables d'environnement :
+    SCRAPER_<SITE>_CHECKPOINT_MAX_AGE: Âge maximal (secondes) d'un point de reprise
+        pour qu'il soit repris (défaut 21600, soit 6 heures).
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from data_extraction.Websites import (
+    site_key,
+    site_setting,
+    state_path,
+    write_json_atomic,
+)
+from data_extraction.Websites.near_duplicates import get_near_duplicate_index
+from data_extraction.Websites.offer_store import append_offers, iter_offers
+from data_extraction.Websites.url_index import canonicalize_url, get_url_index
+
+DEFAULT_MAX_AGE = 6 * 3600
+
+
+def checkpoint_path(site):
+    """Fichier du point de reprise d'un site dans le dossier d'état."""
+    return state_path(f"checkpoint_{site_key(site).lower()}.json")
+
+
+def flushed_path(site):
+    """Fichier JSON Lines des offres déjà écrites par le point de reprise d'un site."""
+    return state_path(f"checkpoint_{site_key(site).lower()}.flushed.jsonl")
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as js_file:
+            return json.load(js_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _load_flushed(path):
+    entries = []
+    try:
+        with open(path, "rb") as jsonl_file:
+            for line in jsonl_file:
+                if not line.endswith(b"\n"):  # Ligne interrompue par un arrêt brutal
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning(f"{path} : ligne invalide ignorée")
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _flushed_entry(offer):
+    return {
+        "job_url": offer.get("job_url"),
+        "publication_date": offer.get("publication_date"),
+    }
+
+
+class Checkpoint:
+    """Point de reprise d'une exécution : pages faites et offres déjà écrites.
+
+    Args:
+        site (str): Nom de la source (valeur du champ "via").
+        output_file (str): Fichier de sortie de la source (offer_store).
+        crawl (watermarks.IncrementalCrawl): Parcours de l'exécution, restauré à la reprise.
+        logger (logging.Logger, optional): Logger du scraper.
+    """
+
+    def __init__(self, site, output_file, crawl, logger=logging):
+        self.site = site
+        self.output_file = output_file
+        self.crawl = crawl
+        self.logger = logger
+        self.path = checkpoint_path(site)
+        self.flushed_path = flushed_path(site)
+        self._lock = threading.Lock()
+        self.pages_done = set()
+        self.flushed = []
+        self._flushed_urls = set()
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.near_duplicates = get_near_duplicate_index()
+        self.near_duplicates.bootstrap(site, lambda: iter_offers(output_file))
+        self.resumed = self._resume(_load(self.path))
+
+    def _resume(self, state):
+        # "flushed" : offres écrites par les points de reprise de l'ancien format
+        flushed = (state or {}).get("flushed", []) + _load_flushed(self.flushed_path)
+        if state is None and not flushed:
+            return False
+        try:
+            updated = datetime.fromisoformat(state["updated"])
+            age = (datetime.now() - updated).total_seconds()
+        except (KeyError, TypeError, ValueError):  # TypeError : état jamais écrit
+            age = None
+        max_age = int(site_setting(self.site, "CHECKPOINT_MAX_AGE", DEFAULT_MAX_AGE))
+        if (
+            age is None
+            or age > max_age
+            or state.get("incremental") != self.crawl.incremental
+        ):
+            # Point de reprise périmé : ses offres sont déjà dans le fichier de sortie
+            self.logger.info(f"Point de reprise de {self.site} périmé, ignoré")
+            url_index = get_url_index()
+            url_index.update(self.site, flushed)
+            url_index.save()
+            self.clear()
+            return False
+        self.started = state.get("started", self.started)
+        self.pages_done = set(state.get("pages_done", []))
+        self.flushed = flushed
+        self._flushed_urls = {canonicalize_url(e["job_url"]) for e in flushed}
+        self.crawl.restore(state.get("crawl", {}))
+        self.logger.info(
+            f"Reprise de {self.site} : {len(self.pages_done)} pages déjà faites, "
+            f"{len(flushed)} offres déjà enregistrées"
+        )
+        return True
+
+    def _write(self):
+        write_json_atomic(
+            self.path,
+            {
+                "started": self.started,
+                "updated": datetime.now().isoformat(timespec="seconds"),
+                "incremental": self.crawl.incremental,
+                "pages_done": sorted(self.pages_done),
+                "crawl": self.crawl.state(),
+            },
+        )
+
+    def is_done(self, page):
+        """Indique si une page (URL ou numéro) a été faite par une tentative précédente."""
+        return str(page) in self.pages_done
+
+    def page_done(self, page, offers):
+        """Écrit les offres d'une page terminée et enregistre le point de reprise."""
+        with self._lock:
+            offers = self._unflushed(offers)
+            if offers:
+                self.near_duplicates.tag(offers, self.site)
+                append_offers(offers, self.output_file)
+                entries = [_flushed_entry(offer) for offer in offers]
+                with open(self.flushed_path, "a", encoding="utf-8") as f:
+                    f.writelines(
+                        json.dumps(entry, ensure_ascii=False) + "\n"
+                        for entry in entries
+                    )
+                self.flushed.extend(entries)
+                self._flushed_urls.update(self._key(offer) for offer in offers)
+            self.pages_done.add(str(page))
+            self._write()
+
+    @staticmethod
+    def _key(offer):
+        return canonicalize_url(offer.get("job_url"))
+
+    def _unflushed(self, offers):
+        """Offres pas encore écrites (celles sans job_url le sont toujours)."""
+        return [
+            offer
+            for offer in offers
+            if not self._key(offer) or self._key(offer) not in self._flushed_urls
+        ]
+
+    def flush(self, offers):
+        """Fin d'exécution : écrit les offres restantes et met à jour l'index des URLs.
+
+        Args:
+            offers (list): Toutes les nouvelles offres de cette tentative ; celles déjà
+                écrites par page_done ne sont pas réécrites.
+        """
+        with self._lock:
+            offers_left = self._unflushed(offers)
+            self.near_duplicates.tag(offers_left, self.site)
+            append_offers(offers_left, self.output_file)
+            url_index = get_url_index()
+            url_index.update(self.site, self.flushed)
+            url_index.update(self.site, offers)
+            url_index.save()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Efface le point de reprise (pagination terminée)."""
+        self._remove(self.path)
+        self._remove(self.flushed_path)
@@ -0,0 +1,229 @@
+"""Pool de WebDrivers Chrome réutilisés entre les exécutions des scrapers.
+
+Le démarrage de Chrome domine la durée des exécutions incrémentales courtes : le pool
+garde jusqu'à N instances chaudes par processus (worker Celery), les prête via le
+gestionnaire de contexte lease(), réinitialise cookies et stockage entre deux prêts,
+et recycle un driver après un nombre de pages configurable ou s'il ne répond plus.
+
+Variables d'environnement :
+    SCRAPER_DRIVER_POOL_SIZE: Nombre maximal de drivers par processus (défaut 1).
+    SCRAPER_DRIVER_MAX_PAGES: Pages chargées avant recyclage d'un driver (défaut 200).
+"""
+
+import atexit
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from data_extraction.Websites import init_driver
+from data_extraction.Websites.browser_profile import LEAN_PAGE_LOAD_STRATEGY
+from data_extraction.Websites.html_archive import archive_page, archive_site
+from data_extraction.Websites.rate_limit import get_limiter, site_for_url
+from data_extraction.Websites.replay import record_dir, record_page, replay_url
+from data_extraction.Websites.stages import NAVIGATION, stage
+from monitoring import PAGE_LOAD_SECONDS, PAGES_FETCHED
+
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_PAGES = 200
+
+
+class PooledDriver:
+    """Enveloppe d'un WebDriver qui compte les pages chargées avec get().
+
+    Tous les autres attributs sont délégués au WebDriver, l'objet s'utilise donc
+    comme un webdriver.Chrome dans les scrapers. Si un collecteur de mesures est
+    attaché (profile, cf. browser_profile.ProfileRun), chaque page chargée y est ajoutée.
+    En mode rejeu ou enregistrement (replay), l'URL est réécrite ou la page sauvegardée ;
+    la page est archivée si l'archive HTML du site est activée (html_archive).
+    Chaque chargement attend un jeton du limiteur de débit du domaine (rate_limit).
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.profile = None
+
+    def get(self, url):
+        self.pages += 1
+        limiter = get_limiter(url)
+        start = time.perf_counter()
+        with stage(NAVIGATION):
+            limiter.acquire()
+            try:
+                result = self.driver.get(replay_url(url))
+            except TimeoutException:
+                limiter.failure()
+                raise
+        limiter.success()
+        site = site_for_url(url)
+        PAGES_FETCHED.labels(site, "selenium").inc()
+        PAGE_LOAD_SECONDS.labels(site, "selenium").observe(time.perf_counter() - start)
+        if record_dir() or archive_site(url):
+            page_html = self.driver.page_source
+            record_page(url, page_html)
+            archive_page(url, page_html)
+        if self.profile is not None:
+            self.profile.record(self.driver)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+class DriverPool:
+    """Pool de WebDrivers chauds, sûr entre threads.
+
+    Args:
+        size (int): Nombre maximal de drivers ouverts simultanément.
+        max_pages (int): Nombre de pages après lequel un driver est recyclé.
+        factory (callable): Fonction créant un nouveau WebDriver.
+        page_load_strategy (str): Stratégie de chargement des drivers créés par
+            init_driver (voir browser_profile.page_load_strategy).
+    """
+
+    def __init__(
+        self,
+        size=DEFAULT_POOL_SIZE,
+        max_pages=DEFAULT_MAX_PAGES,
+        factory=None,
+        page_load_strategy=LEAN_PAGE_LOAD_STRATEGY,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.page_load_strategy = page_load_strategy
+        self._factory = factory or functools.partial(init_driver, page_load_strategy)
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+
+    def _create(self):
+        logging.info("Démarrage d'un nouveau WebDriver pour le pool")
+        return PooledDriver(self._factory())
+
+    def _acquire(self):
+        with self._condition:
+            while not self._idle and self._open >= self.size:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+        try:
+            return self._create()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+    def _discard(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logging.warning(f"Erreur lors de la fermeture du WebDriver : {e}")
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    def _reset(self, pooled):
+        """Remet le driver dans un état neutre ; renvoie False s'il ne répond plus."""
+        try:
+            pooled.driver.current_url  # Vérifie que Chrome répond toujours
+            try:
+                pooled.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except (AttributeError, WebDriverException):
+                pooled.driver.delete_all_cookies()
+            pooled.driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); }"
+                " catch (e) {}"
+            )
+            pooled.driver.get("about:blank")
+            return True
+        except Exception as e:  # Chrome mort : erreurs WebDriver ou urllib3
+            logging.warning(f"WebDriver hors service, recyclage : {e}")
+            return False
+
+    def _release(self, pooled, crashed=False):
+        pooled.profile = None
+        if crashed or pooled.pages >= self.max_pages or not self._reset(pooled):
+            logging.info(f"Recyclage du WebDriver après {pooled.pages} pages")
+            self._discard(pooled)
+            return
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self):
+        """Prête un WebDriver du pool le temps du bloc with.
+
+        Le driver est rendu au pool à la sortie du bloc, après réinitialisation de ses
+        cookies et de son stockage. Il est fermé si une WebDriverException non gérée
+        s'est propagée ou s'il a dépassé max_pages.
+        """
+        pooled = self._acquire()
+        crashed = False
+        try:
+            yield pooled
+        except WebDriverException:
+            crashed = True
+            raise
+        finally:
+            self._release(pooled, crashed)
+
+    def warm(self, count=None):
+        """Démarre à l'avance des drivers jusqu'à count (par défaut la taille du pool)."""
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._condition:
+                if self._open >= count:
+                    return
+                self._open += 1
+            try:
+                pooled = self._create()
+            except Exception:
+                with self._condition:
+                    self._open -= 1
+                raise
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def close(self):
+        """Ferme tous les drivers inactifs du pool."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+
+# Pools du processus, par stratégie de chargement (fixée au démarrage de Chrome)
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool(page_load_strategy=LEAN_PAGE_LOAD_STRATEGY):
+    """Renvoie le pool de WebDrivers du processus pour une stratégie de chargement."""
+    with _pool_lock:
+        if page_load_strategy not in _pools:
+            _pools[page_load_strategy] = DriverPool(
+                size=int(os.environ.get("SCRAPER_DRIVER_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                max_pages=int(
+                    os.environ.get("SCRAPER_DRIVER_MAX_PAGES", DEFAULT_MAX_PAGES)
+                ),
+                page_load_strategy=page_load_strategy,
+            )
+        return _pools[page_load_strategy]
+
+
+@atexit.register
+def close_driver_pool():
+    """Ferme les drivers des pools du processus courant (sortie ou arrêt du worker)."""
+    with _pool_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
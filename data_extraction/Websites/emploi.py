@@ -1,21 +1,43 @@
 import re
 
+import requests
 from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
 from data_extraction.Websites import (
-    check_duplicate,
-    init_driver,
-    load_json,
-    save_json,
     setup_logger,
-    validate_json,
+    validate_batch,
 )
+from data_extraction.Websites.checkpoints import Checkpoint
+from data_extraction.Websites.http_fetch import (
+    LazyDriver,
+    fetch,
+    fetch_mode,
+    parse_mode,
+    parse_snapshot,
+)
+from data_extraction.Websites.offer_store import OUTPUT_FILES, iter_offers
+from data_extraction.Websites.parsers import (
+    EMPLOI_DETAIL_LABELS,
+    PageParseError,
+    parse_emploi_listing,
+    parse_emploi_number_pages,
+)
+from data_extraction.Websites.sharding import crawl_shards, page_shards
+from data_extraction.Websites.url_index import get_url_index
+from data_extraction.Websites.waits import (
+    WAIT_STATS,
+    find_optional,
+    optional_text,
+    wait_all_present,
+)
+from data_extraction.Websites.watermarks import IncrementalCrawl, parse_full_flag
 
 logger = setup_logger("emploi.log")
+SOURCE = "emploi.ma"
+OUTPUT_FILE = OUTPUT_FILES[SOURCE]
+SEARCH_URL = "https://www.emploi.ma/recherche-jobs-maroc/data?f%5B0%5D=im_field_offre_metiers%3A31"
 # Liste pour stocker les nouvelles données scrappées
 new_jobs = []
 
@@ -23,9 +45,7 @@ new_jobs = []
 def access_emploi(driver: webdriver.Chrome):
     """Accède à la page de recherche d'emploi.ma avec un mot-clé prédéfini."""
     # Accès à l'URL initiale pour soumettre la recherche "DATA AI ML"
-    driver.get(
-        "https://www.emploi.ma/recherche-jobs-maroc/data?f%5B0%5D=im_field_offre_metiers%3A31"
-    )
+    driver.get(SEARCH_URL)
 
 
 def get_number_pages(driver: webdriver.Chrome):
@@ -41,10 +61,8 @@ def get_number_pages(driver: webdriver.Chrome):
         int: Nombre total de pages, ou 1 si introuvable.
     """
     try:
-        pages = WebDriverWait(driver, 15).until(
-            EC.presence_of_all_elements_located(
-                (By.CSS_SELECTOR, "li[class='pager-item active pagination-numbers']")
-            )
+        pages = wait_all_present(
+            driver, By.CSS_SELECTOR, "li[class='pager-item active pagination-numbers']"
         )
         max_pages = int(pages[-1].text.strip())
         return max_pages
@@ -53,221 +71,292 @@ def get_number_pages(driver: webdriver.Chrome):
         return 1
 
 
-def main(logger=setup_logger("emploi.log")):
+def get_number_pages_http():
+    """Version HTTP de get_number_pages.
+
+    Returns:
+        int: Nombre total de pages, ou None si la pagination n'a pas pu être récupérée
+        sans navigateur.
+    """
+    try:
+        return parse_emploi_number_pages(fetch(SEARCH_URL))
+    except (requests.RequestException, PageParseError, ValueError) as e:
+        logger.warning(f"Pagination HTTP indisponible, repli Selenium : {e}")
+        return None
+
+
+def next_page_url(url, page):
+    """Construit l'URL de la page de résultats demandée à partir de l'URL courante."""
+    # Si l'URL contient déjà un paramètre "page"
+    if re.search(r"page=\d+", url):
+        new_url = re.sub(r"page=\d+", f"page={page}", url)
+        new_url += "?f%5B0%5D=im_field_offre_metiers%3A31"
+    else:
+        sep = (
+            "&" if "?" in url else "?"
+        )  # gère les cas où d'autres paramètres existent déjà
+        new_url = f"{url}{sep}page={page}"
+    return new_url
+
+
+def extract_offers(driver: webdriver.Chrome, page: int):
+    """
+    Extrait les nouvelles offres des cartes affichées sur la page courante d'emploi.ma.
+
+    En mode "snapshot" (SCRAPER_EMPLOI_MA_PARSE_MODE), une fois les cartes chargées, le
+    DOM est lu en un seul appel et analysé avec parse_emploi_listing ; la lecture carte
+    par carte ne sert plus qu'en repli.
+
+    Args:
+        driver (webdriver.Chrome): Instance du WebDriver Selenium pour la navigation.
+        page (int): Numéro de la page courante (pour les logs).
+
+    Returns:
+        list: Liste des nouvelles offres de la page, ou None si aucune carte n'a été
+        trouvée (fin de la pagination).
+    """
+    url_index = get_url_index()
+    jobs = []
+    # Attendre que les cartes d'offres soient chargées
+    try:
+        cards = wait_all_present(driver, By.CSS_SELECTOR, "div.card.card-job")
+    except TimeoutException:
+        logger.error(
+            f"Aucune carte trouvée sur la page {page} ou temps d'attente dépassé."
+        )
+        return None
+    logger.info(f"Nombre de cartes trouvées sur la page {page} : {len(cards)}")
+
+    # Si aucune carte n'est présente, sortir de la boucle
+    if not cards:
+        logger.warning("Aucune offre trouvée sur cette page, fin de la pagination.")
+        return None
+
+    if parse_mode(SOURCE) == "snapshot":
+        try:
+            return filter_new_jobs(parse_snapshot(driver, parse_emploi_listing))
+        except PageParseError as e:
+            logger.warning(f"Analyse du DOM impossible, lecture par carte : {e}")
+
+    for index, card in enumerate(cards, start=1):
+        # Récupérer l'URL de l'offre
+        try:
+            job_url = (
+                card.get_attribute("data-href").strip()
+                if card.get_attribute("data-href")
+                else ""
+            )
+            if url_index.seen(job_url):
+                continue
+
+        except Exception as e:
+            logger.error(
+                f"[Carte {index} - page {page}] Erreur lors de la récupération de l'URL : {e}"
+            )
+            job_url = ""
+        # Récupérer le titre de l'offre
+        try:
+            titre = (
+                card.find_element(By.CSS_SELECTOR, "h3")
+                .find_element(By.CSS_SELECTOR, "a")
+                .text.strip()
+            )
+        except NoSuchElementException:
+            logger.error(f"[Carte {index} - page {page}] Titre non trouvé.")
+            titre = ""
+
+        # Récupérer le nom de l'entreprise
+        companie = optional_text(card, By.CSS_SELECTOR, "a.card-job-company")
+        if not companie:
+            logger.error(
+                f"[Carte {index} - page {page}] Nom de l'entreprise non trouvé."
+            )
+
+        # Récupérer la description
+        description = optional_text(card, By.CSS_SELECTOR, "div.card-job-description p")
+        if not description:
+            logger.error(f"[Carte {index} - page {page}] Description non trouvée.")
+
+        # Informations complémentaires (niveau d'études, expérience, contrat, région, compétences)
+        details = dict.fromkeys(
+            ("niveau_etudes", "niveau_experience", "contrat", "region", "competences"),
+            "",
+        )
+        ul = find_optional(card, By.CSS_SELECTOR, "div.card-job-detail ul")
+        if ul is not None:
+            for li in ul.find_elements(By.TAG_NAME, "li"):
+                txt = li.text.strip()
+                for label, key in EMPLOI_DETAIL_LABELS.items():
+                    if label in txt:
+                        details[key] = optional_text(li, By.TAG_NAME, "strong")
+                        break
+        else:
+            logger.error(
+                f"[Carte {index} - page {page}] Section des détails complémentaires non trouvée."
+            )
+
+        # Récupérer la date de publication
+        time_elem = find_optional(card, By.CSS_SELECTOR, "time")
+        pub_date = (
+            (time_elem.get_attribute("datetime") or "").strip()
+            if time_elem is not None
+            else ""
+        )
+        if time_elem is None:
+            logger.error(
+                f"[Carte {index} - page {page}] Date de publication non trouvée."
+            )
+
+        # Création du dictionnaire de l'offre
+        job = {
+            "job_url": job_url,
+            "titre": titre,
+            "companie": companie,
+            "description": description,
+            "niveau_etudes": details["niveau_etudes"],
+            "niveau_experience": details["niveau_experience"],
+            "contrat": details["contrat"],
+            "region": details["region"],
+            "competences": details["competences"],
+            "publication_date": pub_date,
+            "via": "emploi.ma",
+        }
+
+        jobs.append(job)
+
+    log_validation_errors(jobs)
+    return jobs
+
+
+def log_validation_errors(jobs):
+    """Valide les offres d'une page en une passe et journalise les invalides."""
+    for index, message in validate_batch(jobs):
+        logger.error(
+            f"Erreur lors de la validation JSON ({jobs[index]['job_url']}) : {message}"
+        )
+
+
+def extract_offers_http(page: int):
+    """Version HTTP de extract_offers : télécharge et analyse la page sans navigateur.
+
+    Returns:
+        list: Les nouvelles offres de la page, ou None si la page n'a pas pu être
+        téléchargée ou analysée (le scraper repasse alors par Selenium).
+    """
+    page_url = f"{SEARCH_URL}&page={page}"
+    try:
+        cards = parse_emploi_listing(fetch(page_url), base_url=page_url)
+    except (requests.RequestException, PageParseError) as e:
+        logger.warning(f"Échec du mode HTTP pour {page_url}, repli Selenium : {e}")
+        return None
+    logger.info(f"Nombre de cartes trouvées sur la page {page} : {len(cards)}")
+    return filter_new_jobs(cards)
+
+
+def filter_new_jobs(cards):
+    """Retire les offres déjà connues de l'index et valide les autres."""
+    url_index = get_url_index()
+    jobs = [job for job in cards if not url_index.seen(job["job_url"])]
+    log_validation_errors(jobs)
+    return jobs
+
+
+def scrape_page(lazy_driver, page):
+    """Extrait les nouvelles offres d'une page de résultats, en HTTP si possible.
+
+    Le WebDriver n'est emprunté (lazy_driver.get()) que pour le repli Selenium.
+
+    Returns:
+        list: Les nouvelles offres de la page, ou None si la page n'a pas pu être chargée.
+    """
+    jobs = extract_offers_http(page) if fetch_mode(SOURCE) == "http" else None
+    if jobs is None:
+        driver = lazy_driver.get()
+        if "emploi.ma" not in driver.current_url:
+            access_emploi(driver)
+        new_url = next_page_url(driver.current_url, page)
+        driver.get(new_url)
+        logger.info(f"Scraping de la page {page + 1} : {new_url}")
+        jobs = extract_offers(driver, page)
+    return jobs
+
+
+def main(logger=setup_logger("emploi.log"), full=None):
     """Exécute l'extraction des offres d'emploi sur emploi.ma.
 
     Orchestre l'initialisation du WebDriver, la navigation sur emploi.ma, l'extraction des offres, et leur sauvegarde.
+    En mode "http" (SCRAPER_EMPLOI_MA_FETCH_MODE), les pages sont téléchargées sans navigateur
+    et le WebDriver n'est démarré que si une page ne peut pas être analysée.
+    En mode incrémental, la pagination s'arrête à la première page sans nouvelle offre ;
+    un parcours complet peut être réparti sur plusieurs WebDrivers (SCRAPER_EMPLOI_MA_PAGE_SHARDS).
+    Les offres sont écrites page par page (checkpoints) : une exécution interrompue
+    reprend après la dernière page terminée.
+    Une erreur est journalisée puis propagée, après l'écriture des offres déjà extraites.
 
     Args:
         logger (logging.Logger, optional): Instance du logger pour enregistrer les événements. Par défaut utilise setup_logger("emploi.log").
+        full (bool, optional): Parcourt toutes les pages (rattrapage). Par défaut SCRAPER_EMPLOI_MA_FULL.
 
     Returns:
         list: Liste des nouvelles offres d'emploi extraites.
     """
-    driver = init_driver()
+    WAIT_STATS.reset()
+    # Liste du module : vidée pour qu'un retry ne réécrive pas la tentative précédente
+    new_jobs.clear()
+    mode = fetch_mode(SOURCE)
+    lazy_driver = LazyDriver(SOURCE, logger=logger)
+    if mode == "selenium":
+        lazy_driver.get()
+    url_index = get_url_index()
+    url_index.bootstrap(SOURCE, lambda: iter_offers(OUTPUT_FILE))
+    crawl = IncrementalCrawl(SOURCE, full, logger)
+    checkpoint = Checkpoint(SOURCE, OUTPUT_FILE, crawl, logger)
     try:
-        access_emploi(driver)
-        max_pages = get_number_pages(driver)
+        max_pages = get_number_pages_http() if mode == "http" else None
+        if max_pages is None:
+            driver = lazy_driver.get()
+            access_emploi(driver)
+            max_pages = get_number_pages(driver)
         logger.info(f"Nombre de pages trouvées: {max_pages}")
         page = 0
+        if page_shards(SOURCE) > 1 and not crawl.incremental:
+            lazy_driver.quit()  # Les workers empruntent leurs propres drivers
+            pages = list(range(max_pages))
+            new_jobs.extend(
+                crawl_shards(pages, scrape_page, SOURCE, logger, checkpoint=checkpoint)
+            )
+            crawl.page_done(new_jobs, pages=max_pages)
+            page = max_pages
         # Boucle de pagination
-        data = load_json("offres_emploi_emploi.json")
         while page < max_pages:
-            # Récupère l'URL actuelle
-            url = driver.current_url
-
-            # Si l'URL contient déjà un paramètre "page"
-            if re.search(r"page=\d+", url):
-                new_url = re.sub(r"page=\d+", f"page={page}", url)
-                new_url += "?f%5B0%5D=im_field_offre_metiers%3A31"
-            else:
-                sep = (
-                    "&" if "?" in url else "?"
-                )  # gère les cas où d'autres paramètres existent déjà
-                new_url = f"{url}{sep}page={page}"
-
-            driver.get(new_url)
-            logger.info(f"Scraping de la page {page + 1} : {new_url}")
-
-            # Attendre que les cartes d'offres soient chargées
-            try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_all_elements_located(
-                        (By.CSS_SELECTOR, "div.card.card-job")
-                    )
-                )
-            except TimeoutException:
-                logger.error(
-                    f"Aucune carte trouvée sur la page {page} ou temps d'attente dépassé."
-                )
+            if checkpoint.is_done(page):
+                page += 1
+                continue
+            jobs = scrape_page(lazy_driver, page)
+            if jobs is None:
                 break
-
-            cards = WebDriverWait(driver, 15).until(
-                EC.presence_of_all_elements_located(
-                    (By.CSS_SELECTOR, "div.card.card-job")
-                )
-            )
-            logger.info(f"Nombre de cartes trouvées sur la page {page} : {len(cards)}")
-
-            # Si aucune carte n'est présente, sortir de la boucle
-            if not cards:
-                logger.warning(
-                    "Aucune offre trouvée sur cette page, fin de la pagination."
-                )
+            new_jobs.extend(jobs)
+            more_pages = crawl.page_done(jobs)
+            checkpoint.page_done(page, jobs)
+            if not more_pages:
                 break
 
-            for index, card in enumerate(cards, start=1):
-                # Récupérer l'URL de l'offre
-                try:
-                    job_url = (
-                        card.get_attribute("data-href").strip()
-                        if card.get_attribute("data-href")
-                        else ""
-                    )
-                    if check_duplicate(data, job_url):
-                        continue
-
-                except Exception as e:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Erreur lors de la récupération de l'URL : {e}"
-                    )
-                    job_url = ""
-                # Récupérer le titre de l'offre
-                try:
-                    titre = (
-                        card.find_element(By.CSS_SELECTOR, "h3")
-                        .find_element(By.CSS_SELECTOR, "a")
-                        .text.strip()
-                    )
-                except NoSuchElementException:
-                    logger.error(f"[Carte {index} - page {page}] Titre non trouvé.")
-                    titre = ""
-
-                # Récupérer le nom de l'entreprise
-                try:
-                    companie = card.find_element(
-                        By.CSS_SELECTOR, "a.card-job-company"
-                    ).text.strip()
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Nom de l'entreprise non trouvé."
-                    )
-                    companie = ""
-
-                # Récupérer la description
-                try:
-                    description = card.find_element(
-                        By.CSS_SELECTOR, "div.card-job-description p"
-                    ).text.strip()
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Description non trouvée."
-                    )
-                    description = ""
-
-                # Informations complémentaires (niveau d'études, expérience, contrat, région, compétences)
-                niveau_etudes = ""
-                niveau_experience = ""
-                contrat = ""
-                region = ""
-                competences = ""
-                try:
-                    ul = card.find_element(By.CSS_SELECTOR, "div.card-job-detail ul")
-                    li_elements = ul.find_elements(By.TAG_NAME, "li")
-                    for li in li_elements:
-                        txt = li.text.strip()
-                        if (
-                            "Niveau d´études requis" in txt
-                            or "Niveau d’études requis" in txt
-                        ):
-                            try:
-                                niveau_etudes = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                niveau_etudes = ""
-                        elif "Niveau d'expérience" in txt:
-                            try:
-                                niveau_experience = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                niveau_experience = ""
-                        elif "Contrat proposé" in txt:
-                            try:
-                                contrat = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                contrat = ""
-                        elif "Région de" in txt:
-                            try:
-                                region = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                region = ""
-                        elif "Compétences clés" in txt:
-                            try:
-                                competences = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                competences = ""
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Section des détails complémentaires non trouvée."
-                    )
-
-                # Récupérer la date de publication
-                try:
-                    pub_date = (
-                        card.find_element(By.CSS_SELECTOR, "time")
-                        .get_attribute("datetime")
-                        .strip()
-                    )
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Date de publication non trouvée."
-                    )
-                    pub_date = ""
-
-                # Création du dictionnaire de l'offre
-                job = {
-                    "job_url": job_url,
-                    "titre": titre,
-                    "companie": companie,
-                    "description": description,
-                    "niveau_etudes": niveau_etudes,
-                    "niveau_experience": niveau_experience,
-                    "contrat": contrat,
-                    "region": region,
-                    "competences": competences,
-                    "publication_date": pub_date,
-                    "via": "emploi.ma",
-                }
-
-                # Ajout de l'offre aux nouvelles offres et mémorisation de l'
-                try:
-                    validate_json(job)
-
-                    new_jobs.append(job)
-                except Exception:
-                    logger.error("Erreur lors de la validation JSON")
-
             # Passage à la page suivante
             page += 1
+        crawl.save()
+        checkpoint.clear()
         logger.info(f"Nombre total d'offres nouvellement extraites : {len(new_jobs)}")
 
     except Exception as e:
         logger.error(f"Erreur lors du scraping :{e}")
+        raise
     finally:
-        if driver:
-            driver.quit()
+        lazy_driver.quit()
+        WAIT_STATS.report(logger)
         logger.info("Extraction terminée !")
-        save_json(new_jobs, "offres_emploi_emploi.json")
+        checkpoint.flush(new_jobs)
     return new_jobs
 
 
 if __name__ == "__main__":
-    main()
+    main(full=parse_full_flag())
@@ -0,0 +1,232 @@
+"""Archive du HTML brut des pages chargées par les scrapers, dans MinIO.
+
+Quand l'archive est activée pour un site, chaque page téléchargée (http_fetch.fetch)
+ou chargée par Selenium (PooledDriver.get) est compressée en zstd et rangée sous
+l'empreinte SHA-256 de son contenu : une page inchangée d'une exécution à l'autre
+n'est stockée qu'une fois. Chaque chargement ajoute une ligne (URL, empreinte, date
+de téléchargement) à l'index de l'exécution. Pages et index sont d'abord écrits dans
+le dossier d'état, puis envoyés dans le bucket en fin d'exécution (flush_archive) ;
+une page déjà présente dans le bucket n'est pas renvoyée.
+
+Organisation du bucket :
+    pages/<sha256[:2]>/<sha256>.html.zst
+    index/<SITE>/<exécution>.jsonl  ({"url", "sha256", "fetched_at", "site", "bytes"})
+
+Le module reparse rejoue l'archive dans les parseurs des sites, sans navigateur.
+
+Variables d'environnement :
+    SCRAPER_<SITE>_HTML_ARCHIVE: "1" archive les pages du site (défaut "0").
+    SCRAPER_HTML_ARCHIVE_BUCKET: Bucket de l'archive (défaut html-archive).
+    SCRAPER_HTML_ARCHIVE_LEVEL: Niveau de compression zstd (défaut 10).
+
+Usage (envoi des pages laissées par une exécution interrompue) :
+    python -m data_extraction.Websites.html_archive
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from data_extraction.Websites import site_key, site_setting, state_path
+from data_extraction.Websites.rate_limit import site_for_domain
+from data_extraction.Websites.replay import replay_base
+from monitoring import MINIO_BYTES
+
+try:
+    import zstandard
+except ImportError:  # Dépendance optionnelle : archive désactivée
+    zstandard = None
+
+DEFAULT_BUCKET = "html-archive"
+DEFAULT_LEVEL = 10
+SPOOL_DIRNAME = "html_archive"
+UPLOAD_THREADS = 8
+
+_lock = threading.Lock()
+_local = threading.local()
+_run_id = None
+# Fichiers écrits par ce processus depuis le dernier envoi
+_spooled = set()
+# Empreintes déjà archivées par ce processus (pas de recompression)
+_archived = set()
+_warned = False
+
+
+def archive_bucket():
+    """Bucket MinIO de l'archive."""
+    return os.environ.get("SCRAPER_HTML_ARCHIVE_BUCKET") or DEFAULT_BUCKET
+
+
+def page_object(sha256):
+    """Nom de l'objet d'une page dans le bucket, d'après l'empreinte de son contenu."""
+    return f"pages/{sha256[:2]}/{sha256}.html.zst"
+
+
+def spool_path(object_name):
+    """Chemin local d'un objet en attente d'envoi, dans le dossier d'état."""
+    return os.path.join(state_path(SPOOL_DIRNAME), *object_name.split("/"))
+
+
+def archive_site(url):
+    """Source dont les pages d'une URL sont archivées, ou None (archive désactivée)."""
+    global _warned
+    host = urlsplit(url or "").netloc.lower()
+    if not host or host == urlsplit(replay_base() or "").netloc:
+        return None
+    site = site_for_domain(host)
+    value = str(site_setting(site, "HTML_ARCHIVE", "0")).lower()
+    if value not in ("1", "true", "yes", "on"):
+        return None
+    if zstandard is None:
+        if not _warned:
+            logging.warning("zstandard n'est pas installé, archive HTML désactivée")
+            _warned = True
+        return None
+    return site
+
+
+def _compressor():
+    compressor = getattr(_local, "compressor", None)
+    if compressor is None:
+        level = int(os.environ.get("SCRAPER_HTML_ARCHIVE_LEVEL", DEFAULT_LEVEL))
+        compressor = zstandard.ZstdCompressor(level=level)
+        _local.compressor = compressor
+    return compressor
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def archive_page(url, page_html):
+    """Archive le HTML d'une page chargée (sans effet si l'archive du site est désactivée)."""
+    global _run_id
+    site = archive_site(url) if page_html else None
+    if site is None:
+        return
+    content = page_html.encode("utf-8")
+    sha256 = hashlib.sha256(content).hexdigest()
+    if sha256 not in _archived:
+        name = page_object(sha256)
+        _write_atomic(spool_path(name), _compressor().compress(content))
+        with _lock:
+            _archived.add(sha256)
+            _spooled.add(name)
+    entry = {
+        "url": url,
+        "sha256": sha256,
+        "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        "site": site,
+        "bytes": len(content),
+    }
+    with _lock:
+        if _run_id is None:
+            _run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        name = f"index/{site_key(site)}/{_run_id}.jsonl"
+        path = spool_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        _spooled.add(name)
+
+
+def _upload(client, bucket, name):
+    """Envoie un fichier en attente puis le supprime ; une page déjà archivée est sautée."""
+    from minio.error import S3Error
+
+    path = spool_path(name)
+    if name.startswith("pages/"):
+        try:
+            client.stat_object(bucket, name)
+        except S3Error as e:
+            if e.code != "NoSuchKey":
+                raise
+        else:
+            os.remove(path)
+            return False
+    content_type = (
+        "application/x-ndjson" if name.endswith(".jsonl") else "application/zstd"
+    )
+    client.fput_object(bucket, name, path, content_type=content_type)
+    MINIO_BYTES.labels(bucket, "out").inc(os.path.getsize(path))
+    os.remove(path)
+    return True
+
+
+def flush_archive(names=None, logger=logging):
+    """Envoie dans le bucket les pages et index en attente, puis les supprime localement.
+
+    Les pages sont envoyées avant les index qui les référencent.
+
+    Args:
+        names (iterable, optional): Objets à envoyer, par défaut ceux écrits par ce
+            processus depuis le dernier envoi.
+
+    Returns:
+        int: Nombre d'objets envoyés (pages déjà présentes non comptées).
+    """
+    global _run_id
+    with _lock:
+        if names is None:
+            names = list(_spooled)
+            _spooled.clear()
+            _run_id = None  # Les pages suivantes vont dans un nouvel index
+    names = [name for name in names if os.path.exists(spool_path(name))]
+    if not names:
+        return 0
+    # Client MinIO chargé seulement si l'archive sert
+    from storage import get_client, make_buckets
+
+    client, bucket = get_client(), archive_bucket()
+    try:
+        make_buckets([bucket])
+        uploaded = 0
+        with ThreadPoolExecutor(max_workers=UPLOAD_THREADS) as executor:
+            for prefix in ("pages/", "index/"):
+                batch = [name for name in names if name.startswith(prefix)]
+                uploaded += sum(
+                    executor.map(lambda name: _upload(client, bucket, name), batch)
+                )
+    except Exception as e:
+        # Les fichiers non envoyés restent en attente pour le prochain envoi
+        logger.warning(f"Envoi de l'archive HTML impossible : {e}")
+        with _lock:
+            _spooled.update(name for name in names if os.path.exists(spool_path(name)))
+        return 0
+    logger.info(f"Archive HTML : {uploaded} objets envoyés dans {bucket}")
+    return uploaded
+
+
+atexit.register(flush_archive)
+
+
+def pending_objects():
+    """Tous les objets en attente dans le dossier d'état, y compris d'autres processus."""
+    root = state_path(SPOOL_DIRNAME)
+    names = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith(".tmp"):
+                path = os.path.join(directory, filename)
+                names.append(os.path.relpath(path, root).replace(os.sep, "/"))
+    return names
+
+
+def main():
+    """Envoie toutes les pages en attente (python -m ...html_archive)."""
+    flush_archive(pending_objects())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,149 @@
+"""Cache disque des réponses HTTP, avec requêtes conditionnelles.
+
+Une fois publiées, les pages de détail (Bayt, MarocAnnonces) ne changent presque
+plus : chaque réponse est conservée dans le dossier d'état, par URL, avec ses
+en-têtes ETag / Last-Modified, son corps compressé et la date du téléchargement.
+Tant que l'entrée a moins de TTL secondes, elle est servie sans requête ; au-delà,
+une requête conditionnelle (If-None-Match / If-Modified-Since) est envoyée et une
+réponse 304 est servie depuis le cache.
+
+Variables d'environnement :
+    SCRAPER_<SITE>_HTTP_CACHE: "0" désactive le cache du site (défaut "1").
+    SCRAPER_<SITE>_HTTP_CACHE_TTL: Durée de fraîcheur d'une entrée, en secondes
+        (défaut 86400 ; 0 revalide chaque page).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from data_extraction.Websites import site_key, site_setting, state_path
+
+CACHE_DIRNAME = "http_cache"
+DEFAULT_TTL = 24 * 3600
+
+
+def cache_enabled(site):
+    """Indique si le cache HTTP est actif pour un site (SCRAPER_<SITE>_HTTP_CACHE)."""
+    value = str(site_setting(site, "HTTP_CACHE", "1")).lower()
+    return value in ("1", "true", "yes", "on")
+
+
+def cache_ttl(site):
+    """Durée de fraîcheur des entrées d'un site, en secondes (SCRAPER_<SITE>_HTTP_CACHE_TTL)."""
+    try:
+        return max(0, int(site_setting(site, "HTTP_CACHE_TTL", DEFAULT_TTL)))
+    except ValueError:
+        logging.warning("HTTP_CACHE_TTL invalide, utilisation de la valeur par défaut")
+        return DEFAULT_TTL
+
+
+class ResponseCache:
+    """Cache des réponses d'un site, partagé entre les threads de téléchargement.
+
+    Args:
+        site (str): Nom de la source ; chaque site a son sous-dossier.
+        ttl (int, optional): Durée de fraîcheur en secondes, par défaut cache_ttl(site).
+        directory (str, optional): Dossier du cache, par défaut state/http_cache/<SITE>.
+    """
+
+    def __init__(self, site, ttl=None, directory=None):
+        self.site = site
+        self.ttl = cache_ttl(site) if ttl is None else ttl
+        self.directory = directory or os.path.join(
+            state_path(CACHE_DIRNAME), site_key(site)
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "bytes_saved": 0}
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json.gz")
+
+    def load(self, url):
+        """Entrée du cache pour une URL, ou None (absente ou illisible)."""
+        try:
+            with gzip.open(self._path(url), "rt", encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except (FileNotFoundError, OSError, EOFError, json.JSONDecodeError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Enregistre une réponse (écriture atomique) et renvoie l'entrée."""
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "body": body,
+        }
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as cache_file:
+            json.dump(entry, cache_file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return entry
+
+    def _count(self, name, body=None):
+        with self._lock:
+            self.stats[name] += 1
+            if body is not None:
+                self.stats["bytes_saved"] += len(body.encode("utf-8"))
+
+    def fetch(self, get, url, timeout):
+        """Renvoie le HTML d'une URL, depuis le cache quand c'est possible.
+
+        Args:
+            get (callable): get(url, headers, timeout) -> requests.Response, appelée
+                seulement si l'entrée est absente ou expirée.
+
+        Raises:
+            requests.RequestException: En cas d'erreur réseau ou de statut HTTP >= 400.
+        """
+        entry = self.load(url)
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+            self._count("hits", entry["body"])
+            return entry["body"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = get(url, headers, timeout)
+        if response.status_code == 304 and entry is not None:
+            self.store(
+                url, entry["body"], entry.get("etag"), entry.get("last_modified")
+            )
+            self._count("revalidated", entry["body"])
+            return entry["body"]
+        response.raise_for_status()
+        self.store(
+            url,
+            response.text,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        self._count("misses")
+        return response.text
+
+    def report(self, logger=logging):
+        """Écrit les statistiques du cache dans les logs du scraper."""
+        stats = self.stats
+        logger.info(
+            f"Cache HTTP {self.site} : {stats['hits']} hits, "
+            f"{stats['revalidated']} revalidées (304), {stats['misses']} misses, "
+            f"{stats['bytes_saved'] / 1024:.0f} Ko économisés"
+        )
+
+
+def response_cache(site):
+    """Cache des réponses d'un site, ou None si le cache est désactivé."""
+    return ResponseCache(site) if cache_enabled(site) else None
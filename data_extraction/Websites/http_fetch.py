@@ -0,0 +1,237 @@
+"""Téléchargement des pages en HTTP simple, sans navigateur.
+
+Les pages de listing de Rekrute, emploi.ma et MarocAnnonces sont rendues côté
+serveur : une session requests (keep-alive) suivie d'un parsing lxml suffit et
+évite de démarrer Chrome. Les scrapers ne recourent à Selenium (via LazyDriver)
+que lorsqu'une page ne peut pas être téléchargée ou analysée. Les pages de détail
+passent par le cache disque des réponses (http_cache), et chaque requête attend un
+jeton du limiteur de débit de son domaine (rate_limit). Les pages peuvent être
+archivées dans MinIO pour être ré-analysées plus tard (html_archive).
+"""
+
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from data_extraction.Websites import site_setting
+from data_extraction.Websites.browser_profile import apply_profile, page_load_strategy
+from data_extraction.Websites.driver_pool import get_driver_pool
+from data_extraction.Websites.html_archive import archive_page, flush_archive
+from data_extraction.Websites.http_cache import response_cache
+from data_extraction.Websites.parsers import PageParseError
+from data_extraction.Websites.rate_limit import (
+    get_limiter,
+    save_rate_limits,
+    site_for_url,
+)
+from data_extraction.Websites.replay import record_page, replay_url
+from data_extraction.Websites.stages import NAVIGATION, stage
+from monitoring import PAGE_LOAD_SECONDS, PAGES_FETCHED
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+}
+DEFAULT_TIMEOUT = 20
+DEFAULT_DETAIL_CONCURRENCY = 8
+
+_local = threading.local()
+
+
+def fetch_mode(site, default="http"):
+    """Mode de téléchargement d'un site : "http" ou "selenium".
+
+    Configurable par la variable d'environnement SCRAPER_<SITE>_FETCH_MODE.
+    """
+    mode = str(site_setting(site, "FETCH_MODE", default)).lower()
+    if mode not in ("http", "selenium"):
+        logging.warning(
+            f"Mode de téléchargement inconnu '{mode}', utilisation de Selenium"
+        )
+        return "selenium"
+    return mode
+
+
+def parse_mode(site, default="snapshot"):
+    """Mode d'analyse des pages chargées avec Selenium : "snapshot" ou "webdriver".
+
+    En mode "snapshot", le DOM est récupéré en un seul appel (driver.page_source) puis
+    analysé localement avec les parseurs lxml ; en mode "webdriver", chaque champ est lu
+    avec find_element. Configurable par SCRAPER_<SITE>_PARSE_MODE.
+    """
+    mode = str(site_setting(site, "PARSE_MODE", default)).lower()
+    if mode not in ("snapshot", "webdriver"):
+        logging.warning(f"Mode d'analyse inconnu '{mode}', utilisation de WebDriver")
+        return "webdriver"
+    return mode
+
+
+def parse_snapshot(driver, parser):
+    """Analyse le DOM courant du driver avec un parseur lxml, en un seul aller-retour."""
+    return parser(driver.page_source, base_url=driver.current_url)
+
+
+def get_session():
+    """Session HTTP du thread courant, réutilisée pour garder les connexions ouvertes."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=2)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _local.session = session
+    return session
+
+
+def limited_get(limiter, url, headers=None, timeout=DEFAULT_TIMEOUT):
+    """GET avec la session du thread, après avoir pris un jeton du limiteur de débit.
+
+    Le débit du limiteur est adapté à la réponse (429/5xx) ou à l'erreur réseau.
+    """
+    limiter.acquire()
+    try:
+        response = get_session().get(url, headers=headers, timeout=timeout)
+    except (requests.Timeout, requests.ConnectionError):
+        limiter.failure()
+        raise
+    limiter.observe(response)
+    return response
+
+
+def fetch(url, timeout=DEFAULT_TIMEOUT, cache=None):
+    """Télécharge une page et renvoie son HTML.
+
+    Avec un cache (http_cache.ResponseCache), une entrée fraîche est servie sans
+    requête et une entrée expirée est revalidée par une requête conditionnelle. En
+    mode rejeu ou enregistrement, la page est servie ou sauvegardée par replay ;
+    elle est archivée si l'archive HTML du site est activée.
+
+    Raises:
+        requests.RequestException: En cas d'erreur réseau ou de statut HTTP >= 400.
+    """
+    start = time.perf_counter()
+    with stage(NAVIGATION):
+        get = functools.partial(limited_get, get_limiter(url))
+        target = replay_url(url)
+        if cache is not None:
+            page_html = cache.fetch(get, target, timeout)
+        else:
+            response = get(target, timeout=timeout)
+            response.raise_for_status()
+            page_html = response.text
+    site = site_for_url(url)
+    PAGES_FETCHED.labels(site, "http").inc()
+    PAGE_LOAD_SECONDS.labels(site, "http").observe(time.perf_counter() - start)
+    record_page(url, page_html)
+    archive_page(url, page_html)
+    return page_html
+
+
+def detail_concurrency(site, default=DEFAULT_DETAIL_CONCURRENCY):
+    """Nombre maximal de pages de détail téléchargées en parallèle pour un site.
+
+    Configurable par la variable d'environnement SCRAPER_<SITE>_DETAIL_CONCURRENCY.
+    """
+    try:
+        return max(1, int(site_setting(site, "DETAIL_CONCURRENCY", default)))
+    except ValueError:
+        logging.warning(
+            "DETAIL_CONCURRENCY invalide, utilisation de la valeur par défaut"
+        )
+        return default
+
+
+def fetch_details(urls, parse_page, site, logger=logging):
+    """Télécharge et analyse des pages de détail en parallèle, sans navigateur.
+
+    Le nombre de requêtes simultanées est borné par detail_concurrency(site). Une page
+    qui ne peut pas être téléchargée ou analysée est simplement absente du résultat,
+    l'appelant la traite alors avec Selenium. Les pages passent par le cache des
+    réponses du site, sauf si SCRAPER_<SITE>_HTTP_CACHE vaut "0".
+
+    Args:
+        urls (list): URLs des pages de détail.
+        parse_page (callable): Fonction (html, base_url) -> résultat analysé.
+        site (str): Nom du site, pour la limite de concurrence.
+
+    Returns:
+        dict: Résultat de parse_page pour chaque URL traitée avec succès.
+    """
+    if not urls:
+        return {}
+
+    cache = response_cache(site)
+
+    def work(url):
+        return parse_page(fetch(url, cache=cache), base_url=url)
+
+    results = {}
+    workers = min(detail_concurrency(site), len(urls))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(work, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except (requests.RequestException, PageParseError) as e:
+                logger.warning(f"Détail indisponible en HTTP pour {url} : {e}")
+    logger.info(
+        f"{len(results)}/{len(urls)} pages de détail récupérées en HTTP "
+        f"({workers} en parallèle)"
+    )
+    if cache is not None:
+        cache.report(logger)
+    return results
+
+
+class LazyDriver:
+    """WebDriver emprunté au pool uniquement au premier besoin (repli Selenium du mode HTTP).
+
+    À l'emprunt, le profil de navigateur du site est appliqué (browser_profile) ;
+    quit() écrit les mesures de chargement, enregistre les débits atteints par les
+    limiteurs, envoie l'archive HTML (fin d'exécution d'un scraper) et rend le driver
+    au pool au lieu de fermer Chrome.
+    """
+
+    def __init__(self, site=None, pool=None, logger=logging):
+        self._site = site
+        self._pool = pool
+        self._logger = logger
+        self._lease = None
+        self._driver = None
+
+    @property
+    def started(self):
+        return self._driver is not None
+
+    def get(self):
+        """Renvoie le WebDriver, en l'empruntant au pool s'il ne l'est pas encore."""
+        if self._driver is None:
+            logging.info("Emprunt d'un WebDriver au pool")
+            pool = self._pool or get_driver_pool(page_load_strategy(self._site))
+            lease = pool.lease()
+            driver = lease.__enter__()
+            self._driver, self._lease = driver, lease
+            if self._site is not None:
+                driver.profile = apply_profile(driver, self._site)
+        return self._driver
+
+    def quit(self):
+        save_rate_limits()
+        flush_archive(logger=self._logger)
+        if self._lease is not None:
+            lease, driver = self._lease, self._driver
+            self._lease = self._driver = None
+            if driver.profile is not None:
+                driver.profile.report(self._logger)
+            lease.__exit__(None, None, None)
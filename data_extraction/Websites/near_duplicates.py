@@ -0,0 +1,387 @@
+"""Détection des offres quasi identiques entre sources (MinHash et LSH).
+
+Une même offre est souvent publiée sur Rekrute, emploi.ma et Bayt sous des URLs
+différentes : la déduplication par job_url (index des URLs, dropDuplicates de Spark)
+ne les repère pas. Chaque offre est réduite à une signature MinHash des mots et
+bigrammes de son titre et des 3-grammes de mots de sa description ; les signatures
+sont découpées en bandes (LSH) et indexées par bande, si bien qu'une nouvelle offre
+n'est comparée qu'aux offres partageant au moins une bande avec elle, et non à tout
+l'historique.
+
+La présentation de l'entreprise (champ companie, phrases reprises dans la
+description) est exclue de la signature : deux postes différents d'un même employeur
+la partagent. Une candidate n'est retenue que si son titre est presque identique
+(similarité des mots du titre, sans lieu ni mention H/F) et si les deux offres ne
+sont pas situées dans des villes différentes.
+
+Chaque offre reçoit un champ canonical_id : la job_url de la première offre de son
+groupe de doublons (sa propre job_url si elle est la première). Les étapes suivantes
+(NER, enrichissement, chargement) ne traitent que les offres dont canonical_id est
+absent ou égal à job_url (voir is_canonical).
+
+Les signatures sont enregistrées en ajout seul dans le dossier d'état
+(near_duplicates.v2.jsonl) ; chaque processus relit les lignes ajoutées par les autres
+avant de comparer un lot d'offres.
+
+Variables d'environnement :
+    SCRAPER_<SITE>_NEAR_DUP: "1" active l'étiquetage des offres du site (défaut "0").
+        Désactivé, l'étiquetage retire le canonical_id des offres qui le traversent :
+        python -m data_extraction.Websites.near_duplicates efface les anciennes
+        étiquettes des fichiers de sortie.
+    SCRAPER_NEAR_DUP_THRESHOLD: Similarité de Jaccard estimée à partir de laquelle deux
+        offres sont des doublons (défaut 0.8).
+    SCRAPER_NEAR_DUP_TITLE_THRESHOLD: Similarité minimale des mots des titres de deux
+        doublons (défaut 0.8).
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from data_extraction.Websites import file_lock, site_setting, state_path
+from data_extraction.Websites.offer_store import OUTPUT_FILES, compact, iter_offers
+from data_extraction.Websites.stages import DEDUP, stage
+from data_extraction.Websites.url_index import canonicalize_url
+from monitoring import DUPLICATES
+
+# v2 : signatures sans la présentation de l'entreprise, titre et lieu enregistrés
+INDEX_FILENAME = "near_duplicates.v2.jsonl"
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_TITLE_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+# Lieu ajouté au titre par certains sites (Rekrute : "Titre | Ville (Maroc)")
+_TITLE_LOCATION = re.compile(r"\s*\|\s*(?P<location>[^|]*)$")
+_GENDER_MARK = re.compile(r"\(?\b[hf]\s*/\s*[fh]\b\)?", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+|\n+")
+# Mots ignorés dans les lieux
+_LOCATION_STOPWORDS = {"maroc", "morocco", "region", "de", "la", "le", "et"}
+# 16 bandes de 8 lignes : deux offres deviennent candidates à partir d'une
+# similarité d'environ 0.7, vérifiée ensuite sur la signature complète
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Permutations fixes : les signatures enregistrées restent comparables d'une exécution à l'autre
+_generator = np.random.RandomState(1)
+_PERM_A = _generator.randint(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _generator.randint(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def is_canonical(offer):
+    """Indique si une offre est la copie canonique de son groupe de doublons."""
+    return offer.get("canonical_id") in (None, offer.get("job_url"))
+
+
+def normalize_text(text):
+    """Minuscules, sans accents ni ponctuation, espaces simples."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r"[\W_]+", " ", text.lower()).strip()
+
+
+def split_title(title):
+    """Titre sans lieu ni mention H/F, et lieu éventuellement ajouté au titre."""
+    title = str(title or "")
+    match = _TITLE_LOCATION.search(title)
+    location = match.group("location") if match else ""
+    if match:
+        title = title[: match.start()]
+    return normalize_text(_GENDER_MARK.sub(" ", title)), location
+
+
+def title_words(offer):
+    """Mots du titre normalisé d'une offre."""
+    return split_title(offer.get("titre"))[0].split()
+
+
+def location_words(offer):
+    """Mots du lieu d'une offre (lieu du titre, ville ou région)."""
+    location = (
+        split_title(offer.get("titre"))[1]
+        or offer.get("ville")
+        or offer.get("region")
+        or ""
+    )
+    return sorted(set(normalize_text(str(location)).split()) - _LOCATION_STOPWORDS)
+
+
+def job_description(offer):
+    """Description (ou introduction) sans les phrases de la présentation de l'entreprise."""
+    description = str(offer.get("description") or offer.get("intro") or "")
+    company = {
+        normalize_text(sentence)
+        for sentence in _SENTENCE_END.split(str(offer.get("companie") or ""))
+    }
+    return " ".join(
+        sentence
+        for sentence in _SENTENCE_END.split(description)
+        if normalize_text(sentence) not in company
+    )
+
+
+def _ngrams(words, size):
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def shingles(offer, size=SHINGLE_SIZE):
+    """Mots et bigrammes du titre, n-grammes de mots de la description.
+
+    Les éléments du titre sont préfixés pour ne pas se confondre avec ceux de la
+    description ; la description ne pèse que par ses n-grammes propres au poste.
+    """
+    title = title_words(offer)
+    grams = {f"t:{gram}" for gram in _ngrams(title, 1) | _ngrams(title, 2)}
+    return grams | _ngrams(normalize_text(job_description(offer)).split(), size)
+
+
+def word_similarity(first, second):
+    """Similarité de Jaccard de deux listes de mots."""
+    first, second = set(first), set(second)
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def near_dup_enabled(source):
+    """Indique si l'étiquetage des doublons est activé pour une source."""
+    value = str(site_setting(source, "NEAR_DUP", "0")).lower()
+    return value in ("1", "true", "yes", "on")
+
+
+def signature(offer):
+    """Signature MinHash (NUM_PERM entiers 32 bits) d'une offre, ou None sans texte."""
+    grams = shingles(offer)
+    if not grams:
+        return None
+    hashes = np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(gram.encode(), digest_size=4).digest(), "little"
+            )
+            for gram in grams
+        ],
+        dtype=np.uint64,
+    )
+    permuted = (
+        np.outer(_PERM_A, hashes) + _PERM_B[:, None]
+    ) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(first, second):
+    """Similarité de Jaccard estimée à partir de deux signatures."""
+    return float(np.mean(first == second))
+
+
+def _encode(sig):
+    return base64.b64encode(sig.tobytes()).decode("ascii")
+
+
+def _decode(value):
+    return np.frombuffer(base64.b64decode(value), dtype=np.uint32)
+
+
+class NearDuplicateIndex:
+    """Index LSH des signatures MinHash de toutes les offres collectées.
+
+    Args:
+        path (str): Fichier JSON Lines des signatures (une ligne par offre : id,
+            canonical_id, source, signature).
+        threshold (float, optional): Similarité minimale entre deux doublons.
+    """
+
+    def __init__(self, path, threshold=None):
+        self.path = path
+        self.threshold = threshold or float(
+            os.environ.get("SCRAPER_NEAR_DUP_THRESHOLD", DEFAULT_THRESHOLD)
+        )
+        self.title_threshold = float(
+            os.environ.get("SCRAPER_NEAR_DUP_TITLE_THRESHOLD", DEFAULT_TITLE_THRESHOLD)
+        )
+        self._entries = {}
+        self._signatures = {}
+        self._titles = {}
+        self._locations = {}
+        self._bands = [{} for _ in range(BANDS)]
+        self._sources = set()
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _refresh(self):
+        """Lit les lignes ajoutées depuis la dernière lecture (par ce processus ou un autre)."""
+        try:
+            with open(self.path, "rb") as jsonl_file:
+                jsonl_file.seek(self._offset)
+                for line in jsonl_file:
+                    if not line.endswith(b"\n"):  # Ligne en cours d'écriture
+                        break
+                    self._offset += len(line)
+                    try:
+                        self._insert(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, ValueError):
+                        logging.warning(f"{self.path} : signature invalide ignorée")
+        except FileNotFoundError:
+            pass
+
+    def _insert(self, entry):
+        key = entry["id"]
+        if key in self._entries:
+            return
+        self._entries[key] = entry["canonical_id"]
+        self._sources.add(entry["source"])
+        self._titles[key] = entry.get("title", "").split()
+        self._locations[key] = entry.get("location", [])
+        if entry.get("signature"):
+            sig = _decode(entry["signature"])
+            self._signatures[key] = sig
+            for band, bucket in zip(self._bands, self._band_keys(sig)):
+                band.setdefault(bucket, []).append(key)
+
+    @staticmethod
+    def _band_keys(sig):
+        return [sig[i * ROWS : (i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+    def _same_job(self, key, title, location):
+        """Titres presque identiques et lieux compatibles."""
+        if word_similarity(title, self._titles[key]) < self.title_threshold:
+            return False
+        other = self._locations[key]
+        return not (location and other and not set(location) & set(other))
+
+    def _best_match(self, sig, title, location):
+        candidates = {
+            key
+            for band, bucket in zip(self._bands, self._band_keys(sig))
+            for key in band.get(bucket, ())
+        }
+        best, best_score = None, self.threshold
+        for key in candidates:
+            if not self._same_job(key, title, location):
+                continue
+            score = similarity(sig, self._signatures[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def has_source(self, source):
+        """Indique si l'index contient déjà au moins une offre de cette source."""
+        return source in self._sources
+
+    @stage(DEDUP)
+    def tag(self, offers, source):
+        """Ajoute canonical_id à chaque offre et enregistre les nouvelles signatures.
+
+        Une offre déjà indexée garde son canonical_id ; une nouvelle offre reçoit celui
+        de l'offre indexée la plus semblable au-dessus du seuil, sinon sa propre job_url.
+        Les offres sans job_url ne sont pas étiquetées. Si l'étiquetage est désactivé
+        pour la source, le canonical_id des offres est retiré.
+
+        Returns:
+            int: Nombre d'offres reconnues comme doublons d'une autre offre.
+        """
+        if not near_dup_enabled(source):
+            for offer in offers:
+                offer.pop("canonical_id", None)
+            return 0
+        duplicates, lines = 0, []
+        with self._lock:
+            self._refresh()
+            for offer in offers:
+                key = canonicalize_url(offer.get("job_url"))
+                if not key:
+                    continue
+                if key not in self._entries:
+                    sig = signature(offer)
+                    title, location = title_words(offer), location_words(offer)
+                    match = (
+                        self._best_match(sig, title, location)
+                        if sig is not None
+                        else None
+                    )
+                    entry = {
+                        "id": key,
+                        "canonical_id": (
+                            self._entries[match] if match else offer["job_url"]
+                        ),
+                        "source": source,
+                        "title": " ".join(title),
+                        "location": location,
+                        "signature": _encode(sig) if sig is not None else None,
+                    }
+                    self._insert(entry)
+                    lines.append(json.dumps(entry) + "\n")
+                canonical_id = self._entries[key]
+                # Copie canonique revue sous une variante de son URL (paramètres de suivi)
+                if canonicalize_url(canonical_id) == key:
+                    canonical_id = offer["job_url"]
+                offer["canonical_id"] = canonical_id
+                if not is_canonical(offer):
+                    duplicates += 1
+            if lines:
+                with file_lock(self.path), open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+        if duplicates:
+            DUPLICATES.labels(source, "near").inc(duplicates)
+            logging.info(f"{duplicates} offres {source} en double d'une autre offre")
+        return duplicates
+
+    def bootstrap(self, source, load_offers):
+        """Indexe l'historique d'une source si elle n'y figure pas encore.
+
+        Args:
+            source (str): Nom de la source (valeur du champ "via").
+            load_offers (callable): Fonction renvoyant les offres déjà sauvegardées,
+                appelée uniquement si la source est absente de l'index.
+        """
+        if not near_dup_enabled(source) or self.has_source(source):
+            return
+        offers = list(load_offers())
+        self.tag(offers, source)
+        logging.info(
+            f"Index des doublons initialisé avec {len(offers)} offres {source}"
+        )
+
+
+def get_near_duplicate_index(path=None):
+    """Retourne l'index des doublons du processus, chargé depuis le disque au premier appel."""
+    path = os.path.abspath(path or state_path(INDEX_FILENAME))
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = NearDuplicateIndex(path)
+        return _indexes[path]
+
+
+def main():
+    """Étiquette tout l'historique des sources (python -m ...near_duplicates).
+
+    Les fichiers de sortie sont compactés et réécrits avec le canonical_id de chaque
+    offre, y compris celles collectées avant l'index des doublons.
+    """
+    index = get_near_duplicate_index()
+    for site, filename in OUTPUT_FILES.items():
+        index.bootstrap(site, lambda: iter_offers(filename))
+        compact(filename, tag=lambda offers, site=site: index.tag(offers, site))
+    logging.info(f"Index des doublons : {len(index)} offres")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
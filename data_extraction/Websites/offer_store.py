@@ -0,0 +1,240 @@
+"""Stockage des offres scrappées en JSON Lines (un objet JSON par ligne), en ajout seul.
+
+Chaque exécution n'écrit que ses nouvelles offres à la fin du fichier (O(nouvelles
+offres)) au lieu de relire et réécrire tout l'historique, et les lectures se font en
+flux, ligne par ligne. Les fichiers sont compactés périodiquement (doublons par
+job_url et lignes tronquées retirés), et les anciens fichiers .json (tableaux) sont
+convertis automatiquement au premier accès.
+
+Le compactage est déclenché par le nombre d'offres ajoutées depuis le précédent, et
+non par le nombre d'ajouts : les scrapers ajoutent leurs offres page par page
+(checkpoints), un compte d'appels compacterait plusieurs fois par exécution.
+
+Variables d'environnement :
+    SCRAPER_COMPACT_RECORDS: Nombre d'offres ajoutées entre deux compactages
+        (défaut 2000, 0 : jamais).
+    SCRAPER_OUTPUT_DIR: Dossier des fichiers de sortie (défaut scraping_output).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+from data_extraction.Websites import (
+    current_dir,
+    file_lock,
+    state_path,
+    write_json_atomic,
+)
+from data_extraction.Websites.stages import SAVE, stage
+from data_extraction.Websites.url_index import canonicalize_url
+
+OUTPUT_DIR = os.environ.get("SCRAPER_OUTPUT_DIR") or os.path.join(
+    os.path.dirname(current_dir), "scraping_output"
+)
+COMPACTION_STATE = "compaction.json"
+DEFAULT_COMPACT_RECORDS = 2000
+
+# Fichier de sortie de chaque source, dans OUTPUT_DIR
+OUTPUT_FILES = {
+    "Rekrute": "offres_emploi_rekrute.jsonl",
+    "Bayt": "offres_emploi_bayt.jsonl",
+    "emploi.ma": "offres_emploi_emploi.jsonl",
+    "Maroc_annonces": "offres_marocannonces.jsonl",
+}
+
+
+def output_path(filename):
+    """Chemin d'un fichier de sortie dans scraping_output (créé au besoin)."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    return os.path.join(OUTPUT_DIR, filename)
+
+
+def legacy_path(filename):
+    """Chemin de l'ancien fichier .json (tableau) correspondant à un fichier .jsonl."""
+    return output_path(os.path.splitext(filename)[0] + ".json")
+
+
+def _offers_lock(filename):
+    """Verrou d'un fichier de sortie, placé dans le dossier d'état (jamais envoyé)."""
+    return file_lock(state_path(filename))
+
+
+def iter_jsonl(path):
+    """Parcourt un fichier JSON Lines en flux ; les lignes invalides sont ignorées."""
+    try:
+        with open(path, "r", encoding="utf-8") as jsonl_file:
+            for line_number, line in enumerate(jsonl_file, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"{path}:{line_number} ligne JSON invalide ignorée")
+    except FileNotFoundError:
+        return
+
+
+def _append_lines(path, records):
+    """Ajoute des enregistrements en fin de fichier, en une écriture synchronisée."""
+    payload = "".join(
+        json.dumps(record, ensure_ascii=False) + "\n" for record in records
+    )
+    if not payload:
+        return
+    with open(path, "a", encoding="utf-8") as jsonl_file:
+        jsonl_file.write(payload)
+        jsonl_file.flush()
+        os.fsync(jsonl_file.fileno())
+    # Fichier modifiable par l'utilisateur du conteneur lors des prochaines exécutions
+    try:
+        os.chmod(path, 0o666)
+    except PermissionError:
+        logging.warning(f"Could not change permissions on {path}")
+
+
+def migrate_legacy_json(filename):
+    """Convertit l'ancien fichier .json (tableau) d'une source en lignes du .jsonl.
+
+    Le fichier converti est déplacé dans le dossier d'état (state/migrated) pour ne
+    plus être envoyé vers MinIO avec les sorties du scraping.
+
+    Returns:
+        int: Nombre d'offres converties (0 s'il n'y avait rien à migrer).
+    """
+    old_path = legacy_path(filename)
+    if not os.path.exists(old_path):
+        return 0
+    path = output_path(filename)
+    with _offers_lock(filename):
+        if not os.path.exists(old_path):  # Migré entre-temps par un autre processus
+            return 0
+        try:
+            with open(old_path, "r", encoding="utf-8") as js_file:
+                offers = json.load(js_file)
+        except json.JSONDecodeError:
+            logging.warning(f"{old_path} contient un JSON invalide, migration ignorée")
+            offers = []
+        if not isinstance(offers, list):
+            offers = [offers]
+        _append_lines(path, offers)
+        migrated_dir = state_path("migrated")
+        os.makedirs(migrated_dir, exist_ok=True)
+        shutil.move(old_path, os.path.join(migrated_dir, os.path.basename(old_path)))
+    logging.info(f"{len(offers)} offres migrées de {old_path} vers {path}")
+    return len(offers)
+
+
+def iter_offers(filename):
+    """Parcourt en flux les offres sauvegardées d'une source."""
+    migrate_legacy_json(filename)
+    yield from iter_jsonl(output_path(filename))
+
+
+def compact(filename, tag=None):
+    """Réécrit le fichier d'une source sans doublons (par job_url, dernier gardé).
+
+    Les lignes invalides (écriture interrompue) sont également retirées.
+
+    Args:
+        filename (str): Fichier de sortie de la source.
+        tag (callable, optional): Appelée avec la liste des offres conservées, qu'elle
+            peut compléter avant la réécriture (ex. canonical_id des doublons).
+
+    Returns:
+        tuple: (nombre de lignes avant, nombre d'offres après).
+    """
+    path = output_path(filename)
+    with _offers_lock(filename):
+        offers, total = {}, 0
+        for position, offer in enumerate(iter_jsonl(path)):
+            total += 1
+            key = canonicalize_url(offer.get("job_url")) or f"#{position}"
+            offers.pop(key, None)  # Conserve l'ordre de la dernière occurrence
+            offers[key] = offer
+        if tag is not None:
+            tag(list(offers.values()))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as jsonl_file:
+            for offer in offers.values():
+                jsonl_file.write(json.dumps(offer, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+        try:
+            os.chmod(path, 0o666)
+        except PermissionError:
+            logging.warning(f"Could not change permissions on {path}")
+    logging.info(f"{filename} compacté : {total} lignes -> {len(offers)} offres")
+    return total, len(offers)
+
+
+def _compaction_due(filename, records):
+    """Compte les offres ajoutées depuis le dernier compactage ; True s'il faut compacter."""
+    every = int(os.environ.get("SCRAPER_COMPACT_RECORDS", DEFAULT_COMPACT_RECORDS))
+    path = state_path(COMPACTION_STATE)
+    with file_lock(path):
+        try:
+            with open(path, "r", encoding="utf-8") as js_file:
+                counters = json.load(js_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            counters = {}
+        counters[filename] = counters.get(filename, 0) + records
+        due = every > 0 and counters[filename] >= every
+        if due:
+            counters[filename] = 0
+        write_json_atomic(path, counters, indent=4)
+    return due
+
+
+@stage(SAVE)
+def append_offers(offers, filename):
+    """Ajoute les nouvelles offres d'une exécution à la fin du fichier de la source.
+
+    Compacte le fichier toutes les SCRAPER_COMPACT_RECORDS offres ajoutées.
+    """
+    migrate_legacy_json(filename)
+    path = output_path(filename)
+    with _offers_lock(filename):
+        _append_lines(path, offers)
+    logging.info(f"Ajout de {len(offers)} nouvelles offres à {filename}")
+    if offers and _compaction_due(filename, len(offers)):
+        compact(filename)
+
+
+def file_manifest(filename):
+    """Manifeste d'un fichier de sortie, transmis entre tâches à la place des offres.
+
+    Returns:
+        dict: Clé de l'objet (nom du fichier), nombre d'offres, taille en octets et
+        empreinte SHA-256 du contenu.
+    """
+    digest = hashlib.sha256()
+    records = size = 0
+    try:
+        with _offers_lock(filename), open(output_path(filename), "rb") as jsonl_file:
+            for line in jsonl_file:
+                digest.update(line)
+                size += len(line)
+                if line.strip():
+                    records += 1
+    except FileNotFoundError:
+        pass
+    return {
+        "key": filename,
+        "records": records,
+        "bytes": size,
+        "sha256": digest.hexdigest(),
+    }
+
+
+def main():
+    """Migre et compacte tous les fichiers de sortie (python -m ...offer_store)."""
+    for filename in OUTPUT_FILES.values():
+        migrate_legacy_json(filename)
+        compact(filename)
+
+
+if __name__ == "__main__":
+    main()
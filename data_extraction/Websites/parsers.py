@@ -0,0 +1,390 @@
+"""Parseurs HTML (lxml) des pages de listing, sans navigateur.
+
+Chaque fonction prend le code HTML d'une page et renvoie les offres sous la même
+forme de dictionnaire que la version Selenium du scraper correspondant, ce qui permet
+de les utiliser avec une page téléchargée en HTTP.
+"""
+
+import re
+
+from lxml import html as lxml_html
+
+from data_extraction.Websites.stages import PARSING, stage
+
+# Balises rendues comme des blocs par le navigateur (retour à la ligne dans .text)
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "tr", "ul",
+}  # fmt: skip
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "head"}
+WHITESPACE = re.compile(r"\s+")
+
+
+class PageParseError(Exception):
+    """Levée lorsqu'une page ne contient pas la structure attendue."""
+
+
+def has_class(name):
+    """Condition XPath équivalente au sélecteur CSS ".name"."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def parse_html(page_html, base_url=None):
+    """Construit l'arbre lxml d'une page et rend ses liens absolus comme le navigateur."""
+    tree = lxml_html.fromstring(page_html)
+    if base_url:
+        tree.make_links_absolute(base_url, resolve_base_href=True)
+    return tree
+
+
+def _is_hidden(element):
+    style = (element.get("style") or "").replace(" ", "").lower()
+    return element.get("hidden") is not None or "display:none" in style
+
+
+def element_text(element):
+    """Texte visible d'un élément, au plus proche de WebElement.text de Selenium.
+
+    Les éléments de type bloc et les <br> produisent des retours à la ligne, les
+    espaces sont fusionnés à l'intérieur de chaque ligne et les lignes vides retirées.
+    """
+    if element is None:
+        return ""
+    chunks = []
+
+    def add(text):
+        # Les sauts de ligne du code source sont des espaces pour le navigateur
+        if text:
+            chunks.append(WHITESPACE.sub(" ", text))
+
+    def walk(node):
+        if not isinstance(node.tag, str):
+            # Commentaires et instructions : seul le texte qui suit compte
+            add(node.tail)
+            return
+        tag = node.tag.lower()
+        if tag in SKIPPED_TAGS or _is_hidden(node):
+            add(node.tail)
+            return
+        if tag == "br" or tag in BLOCK_TAGS:
+            chunks.append("\n")
+        add(node.text)
+        for child in node:
+            walk(child)
+        if tag in BLOCK_TAGS:
+            chunks.append("\n")
+        add(node.tail)
+
+    tail = element.tail
+    element.tail = None
+    try:
+        walk(element)
+    finally:
+        element.tail = tail
+    lines = (" ".join(line.split()) for line in "".join(chunks).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def first(elements):
+    """Premier élément d'une liste XPath, ou None."""
+    return elements[0] if elements else None
+
+
+def first_text(element, xpath):
+    """Texte du premier élément correspondant au XPath, ou "" s'il est absent."""
+    return element_text(first(element.xpath(xpath)))
+
+
+# --- Rekrute ---
+
+
+def _rekrute_icon_field(holder, icon):
+    """Texte du premier <span> du bloc contenant l'icône Font Awesome donnée."""
+    field = first(holder.xpath(f".//i[{has_class('fa')}][{has_class(icon)}]"))
+    if field is None:
+        return ""
+    parent_div = first(field.xpath("ancestor::div[1]"))
+    if parent_div is None:
+        return ""
+    return first_text(parent_div, ".//span")
+
+
+@stage(PARSING)
+def parse_rekrute_listing(page_html, base_url="https://www.rekrute.com/"):
+    """Extrait les offres d'une page de résultats Rekrute (cf. Rekrute.extract_offers).
+
+    Raises:
+        PageParseError: Si la page ne contient aucun conteneur d'offre.
+    """
+    tree = parse_html(page_html, base_url)
+    holders = tree.xpath(f"//div[{has_class('holder')}]")
+    if len(holders) < 2:
+        raise PageParseError("Aucune offre Rekrute trouvée dans la page")
+
+    offers = []
+    for holder in holders[1:]:  # Ignorer le premier conteneur qui est un filtre
+        info_divs = holder.xpath(f".//div[{has_class('info')}]")
+
+        titre, job_url = "", ""
+        parent_div = first(holder.xpath("ancestor::div[1]"))
+        if parent_div is not None:
+            link = first(parent_div.xpath(f".//a[{has_class('titreJob')}]"))
+            if link is not None:
+                job_url = link.get("href")
+                titre = element_text(link)
+
+        competences = ""
+        if len(info_divs) >= 1:
+            competences = _rekrute_icon_field(holder, "fa-search")
+        companie = description = ""
+        if len(info_divs) >= 2:
+            companie = _rekrute_icon_field(holder, "fa-industry")
+            description = _rekrute_icon_field(holder, "fa-binoculars")
+
+        pub_start = ""
+        date_elem = first(holder.xpath(f".//em[{has_class('date')}]"))
+        if date_elem is not None:
+            pub_start = first_text(date_elem, ".//span")
+
+        secteur = niveau_experience = niveau_etudes = contrat = ""
+        if len(info_divs) >= 3:
+            for li in info_divs[-1].xpath(".//li"):
+                txt = element_text(li)
+                if ":" not in txt:
+                    continue
+                value = txt.split(":", 1)[1].strip()
+                if "Secteur d'activité" in txt or "Fonction" in txt:
+                    secteur = value
+                elif "Expérience requise" in txt:
+                    niveau_experience = value
+                elif "Niveau d'étude demandé" in txt:
+                    niveau_etudes = value
+                elif "Type de contrat proposé" in txt:
+                    contrat = value
+
+        offers.append(
+            {
+                "titre": titre,
+                "publication_date": pub_start,
+                "competences": competences,
+                "companie": companie,
+                "description": description,
+                "secteur": secteur,
+                "niveau_experience": niveau_experience,
+                "niveau_etudes": niveau_etudes,
+                "contrat": contrat,
+                "via": "Rekrute",
+                "job_url": job_url,
+            }
+        )
+    return offers
+
+
+@stage(PARSING)
+def parse_rekrute_amount_link(page_html, base_url="https://www.rekrute.com/"):
+    """URL du lien "nombre d'offres par page" le plus élevé (cf. Rekrute.get_pages_url)."""
+    tree = parse_html(page_html, base_url)
+    links = tree.xpath(
+        f"//div[{has_class('slide-block')}]//div[{has_class('pagination')}]"
+        f"//ul[{has_class('amount')}]/li/a"
+    )
+    if not links:
+        raise PageParseError("Pagination Rekrute introuvable")
+    return links[-1].get("href")
+
+
+@stage(PARSING)
+def parse_rekrute_page_urls(page_html):
+    """Valeurs des options du sélecteur de pages Rekrute (URLs relatives)."""
+    tree = parse_html(page_html)
+    options = tree.xpath(
+        f"//div[{has_class('slide-block')}]//div[{has_class('pagination')}]"
+        "//select//option"
+    )
+    if not options:
+        raise PageParseError("Sélecteur de pages Rekrute introuvable")
+    return [option.get("value") for option in options]
+
+
+# --- emploi.ma ---
+
+EMPLOI_DETAIL_LABELS = {
+    "Niveau d´études requis": "niveau_etudes",
+    "Niveau d’études requis": "niveau_etudes",
+    "Niveau d'expérience": "niveau_experience",
+    "Contrat proposé": "contrat",
+    "Région de": "region",
+    "Compétences clés": "competences",
+}
+
+
+@stage(PARSING)
+def parse_emploi_listing(page_html, base_url="https://www.emploi.ma/"):
+    """Extrait les offres d'une page de résultats emploi.ma (cf. emploi.extract_offers).
+
+    Raises:
+        PageParseError: Si la page ne contient aucune carte d'offre.
+    """
+    tree = parse_html(page_html, base_url)
+    cards = tree.xpath(f"//div[{has_class('card')}][{has_class('card-job')}]")
+    if not cards:
+        raise PageParseError("Aucune carte emploi.ma trouvée dans la page")
+
+    jobs = []
+    for card in cards:
+        job_url = (card.get("data-href") or "").strip()
+        title = first(card.xpath(".//h3"))
+        titre = first_text(title, ".//a") if title is not None else ""
+        companie = first_text(card, f".//a[{has_class('card-job-company')}]")
+        description = first_text(
+            card, f".//div[{has_class('card-job-description')}]//p"
+        )
+
+        details = dict.fromkeys(
+            ("niveau_etudes", "niveau_experience", "contrat", "region", "competences"),
+            "",
+        )
+        ul = first(card.xpath(f".//div[{has_class('card-job-detail')}]//ul"))
+        if ul is not None:
+            for li in ul.xpath(".//li"):
+                txt = element_text(li)
+                for label, key in EMPLOI_DETAIL_LABELS.items():
+                    if label in txt:
+                        details[key] = first_text(li, ".//strong")
+                        break
+
+        time_elem = first(card.xpath(".//time"))
+        pub_date = (
+            (time_elem.get("datetime") or "").strip() if time_elem is not None else ""
+        )
+
+        jobs.append(
+            {
+                "job_url": job_url,
+                "titre": titre,
+                "companie": companie,
+                "description": description,
+                "niveau_etudes": details["niveau_etudes"],
+                "niveau_experience": details["niveau_experience"],
+                "contrat": details["contrat"],
+                "region": details["region"],
+                "competences": details["competences"],
+                "publication_date": pub_date,
+                "via": "emploi.ma",
+            }
+        )
+    return jobs
+
+
+@stage(PARSING)
+def parse_emploi_number_pages(page_html):
+    """Numéro de la dernière page de résultats emploi.ma (cf. emploi.get_number_pages)."""
+    tree = parse_html(page_html)
+    pages = tree.xpath("//li[@class='pager-item active pagination-numbers']")
+    if not pages:
+        raise PageParseError("Pagination emploi.ma introuvable")
+    return int(element_text(pages[-1]))
+
+
+# --- MarocAnnonces ---
+
+
+@stage(PARSING)
+def parse_marocann_listing(page_html, base_url="https://www.marocannonces.com/"):
+    """Extrait les offres d'une page de résultats MarocAnnonces (cf. MarocAnn.extract_offers).
+
+    Une page sans aucun conteneur d'offre marque la fin de la pagination et renvoie
+    une liste vide.
+    """
+    tree = parse_html(page_html, base_url)
+    holders = tree.xpath(
+        f"//div[{has_class('holder')}][ancestor::li[not({has_class('adslistingpos')})]]"
+    )
+    offers = []
+    for holder in holders:
+        parent = holder.getparent()
+        title = first(holder.xpath(".//h3"))
+        location = first(holder.xpath(f".//*[{has_class('location')}]"))
+        if parent is None or title is None or location is None:
+            continue
+        offers.append(
+            {
+                "titre": element_text(title),
+                "region": element_text(location),
+                "job_url": parent.get("href"),
+            }
+        )
+    return offers
+
+
+@stage(PARSING)
+def parse_marocann_details(page_html, base_url=None):
+    """Texte du bloc "div.used-cars" d'une offre MarocAnnonces (cf. MarocAnn.extract_offer_details).
+
+    Raises:
+        PageParseError: Si la page ne contient pas le bloc de l'offre.
+    """
+    tree = parse_html(page_html, base_url)
+    container = first(tree.xpath(f"//div[{has_class('used-cars')}]"))
+    if container is None:
+        raise PageParseError("Bloc de l'offre MarocAnnonces introuvable")
+    return element_text(container)
+
+
+# --- Bayt ---
+
+
+@stage(PARSING)
+def parse_bayt_details(page_html, base_url=None):
+    """Champs bruts d'une page d'offre Bayt (cf. bayt.extract_job_details).
+
+    Renvoie le titre, le texte de date relative ("3 days ago"), l'entreprise et le
+    texte complet de l'offre ; la conversion de la date et la segmentation du texte
+    restent à la charge du scraper.
+
+    Raises:
+        PageParseError: Si la page ne contient pas le titre de l'offre.
+    """
+    tree = parse_html(page_html, base_url)
+    title = first(tree.xpath("//h1[@id='job_title']"))
+    if title is None:
+        raise PageParseError("Titre de l'offre Bayt introuvable")
+    return {
+        "titre": element_text(title),
+        "posted": first_text(tree, "//span[@id='jb-posted-date']"),
+        "companie": first_text(tree, "//a[@class='t-default t-bold']/span"),
+        "details": first_text(tree, "//div[@class='t-break']"),
+    }
+
+
+# Parseurs par site : les sélecteurs de chaque site ne vivent que dans ce module
+LISTING_PARSERS = {
+    "Rekrute": parse_rekrute_listing,
+    "emploi.ma": parse_emploi_listing,
+    "Maroc_annonces": parse_marocann_listing,
+}
+DETAIL_PARSERS = {
+    "Bayt": parse_bayt_details,
+    "Maroc_annonces": parse_marocann_details,
+}
+
+
+def main(argv=None):
+    """Analyse une page HTML sauvegardée et affiche le résultat en JSON.
+
+    Usage : python -m data_extraction.Websites.parsers <listing|detail> <site> <fichier.html>
+    """
+    import json
+    import sys
+
+    kind, site, path = (argv or sys.argv[1:])[:3]
+    registry = LISTING_PARSERS if kind == "listing" else DETAIL_PARSERS
+    with open(path, encoding="utf-8") as html_file:
+        result = registry[site](html_file.read())
+    print(json.dumps(result, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Limiteur de débit adaptatif par domaine (seau à jetons, AIMD).
+
+Chaque domaine a un seau à jetons partagé par tous les threads du processus :
+téléchargements HTTP (http_fetch) et pages chargées par Selenium (PooledDriver.get)
+prennent un jeton avant chaque requête. Le débit augmente un peu après chaque succès
+(augmentation additive) et est divisé par deux après une réponse 429 ou 5xx, un
+timeout ou une erreur de connexion (diminution multiplicative) ; un en-tête
+Retry-After suspend le domaine le temps demandé. Le débit atteint est enregistré
+dans le dossier d'état et sert de point de départ à l'exécution suivante.
+
+Variables d'environnement :
+    SCRAPER_<SITE>_RATE_LIMIT: "0" désactive le limiteur du site (défaut "1").
+    SCRAPER_<SITE>_RATE: Débit initial en requêtes/s, sans débit enregistré (défaut 2).
+    SCRAPER_<SITE>_MIN_RATE, SCRAPER_<SITE>_MAX_RATE: Bornes du débit (défaut 0.2 et 10).
+    SCRAPER_<SITE>_RATE_STEP: Augmentation du débit après un succès (défaut 0.05).
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from data_extraction.Websites import (
+    SITE_HOSTS,
+    file_lock,
+    site_setting,
+    state_path,
+    write_json_atomic,
+)
+
+RATE_LIMITS_FILENAME = "rate_limits.json"
+DEFAULT_RATE = 2.0
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = 10.0
+DEFAULT_RATE_STEP = 0.05
+# Statuts HTTP qui signalent une surcharge du site
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def site_for_domain(domain):
+    """Source correspondant à un domaine, ou le domaine lui-même s'il est inconnu."""
+    for site, host in SITE_HOSTS.items():
+        if domain == host:
+            return site
+    return domain
+
+
+def site_for_url(url):
+    """Source d'une URL d'après son hôte (voir site_for_domain)."""
+    return site_for_domain(urlsplit(url or "").netloc.lower())
+
+
+def _float_setting(site, name, default):
+    try:
+        return float(site_setting(site, name, default))
+    except ValueError:
+        logging.warning(f"{name} invalide, utilisation de la valeur par défaut")
+        return default
+
+
+def load_rate_limits():
+    """Débits enregistrés : {domaine: {rate, throttled, updated}}."""
+    try:
+        with open(state_path(RATE_LIMITS_FILENAME), "r", encoding="utf-8") as js_file:
+            return json.load(js_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class RateLimiter:
+    """Seau à jetons d'un domaine dont le débit s'adapte aux réponses du site.
+
+    Args:
+        domain (str): Domaine limité (ex. www.bayt.com).
+        rate (float, optional): Débit initial, par défaut le débit enregistré ou
+            SCRAPER_<SITE>_RATE.
+    """
+
+    def __init__(self, domain, rate=None):
+        self.domain = domain
+        site = site_for_domain(domain)
+        self.min_rate = _float_setting(site, "MIN_RATE", DEFAULT_MIN_RATE)
+        self.max_rate = _float_setting(site, "MAX_RATE", DEFAULT_MAX_RATE)
+        self.step = _float_setting(site, "RATE_STEP", DEFAULT_RATE_STEP)
+        if rate is None:
+            saved = load_rate_limits().get(domain, {}).get("rate")
+            rate = saved or _float_setting(site, "RATE", DEFAULT_RATE)
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def burst(self):
+        """Jetons accumulables : une seconde de débit, au moins une requête."""
+        return max(1.0, self.rate)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Attend qu'un jeton soit disponible et le consomme."""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def success(self):
+        """Requête réussie : augmentation additive du débit."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def failure(self, retry_after=None):
+        """Surcharge (429, 5xx, timeout) : débit divisé par deux, pause si Retry-After.
+
+        Les échecs des requêtes parties en même temps ne divisent le débit qu'une fois
+        (au plus une diminution par seconde).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now - self._last_decrease >= 1:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._last_decrease = now
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.tokens = -retry_after * self.rate
+            self.throttled += 1
+        logging.warning(
+            f"Limitation de {self.domain} : débit réduit à {self.rate:.2f} req/s"
+        )
+
+    def observe(self, response):
+        """Adapte le débit selon la réponse HTTP reçue."""
+        if response.status_code in THROTTLE_STATUSES:
+            retry_after = response.headers.get("Retry-After", "")
+            self.failure(float(retry_after) if retry_after.isdigit() else None)
+        else:
+            self.success()
+
+
+class _Unlimited:
+    """Limiteur sans effet, pour les sites dont la limitation est désactivée."""
+
+    def acquire(self):
+        pass
+
+    def success(self):
+        pass
+
+    def failure(self, retry_after=None):
+        pass
+
+    def observe(self, response):
+        pass
+
+
+UNLIMITED = _Unlimited()
+
+
+def get_limiter(url):
+    """Limiteur du domaine d'une URL, partagé par tous les threads du processus."""
+    domain = urlsplit(url or "").netloc.lower()
+    if not domain:
+        return UNLIMITED
+    value = str(site_setting(site_for_domain(domain), "RATE_LIMIT", "1")).lower()
+    if value not in ("1", "true", "yes", "on"):
+        return UNLIMITED
+    with _limiters_lock:
+        if domain not in _limiters:
+            _limiters[domain] = RateLimiter(domain)
+        return _limiters[domain]
+
+
+@atexit.register
+def save_rate_limits():
+    """Enregistre le débit atteint par chaque domaine, pour l'exécution suivante."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    if not limiters:
+        return
+    path = state_path(RATE_LIMITS_FILENAME)
+    now = datetime.now().isoformat(timespec="seconds")
+    with file_lock(path):
+        rate_limits = load_rate_limits()
+        for limiter in limiters:
+            rate_limits[limiter.domain] = {
+                "rate": round(limiter.rate, 3),
+                "throttled": limiter.throttled,
+                "updated": now,
+            }
+        write_json_atomic(path, rate_limits, indent=4)
@@ -0,0 +1,203 @@
+"""Ré-analyse des pages de l'archive HTML avec les parseurs actuels des sites.
+
+Après la correction d'un sélecteur (parsers.py) ou d'un post-traitement (ex.
+bayt.text_segmentation), les champs des offres déjà collectées sont recalculés à
+partir des pages archivées (html_archive), sans navigateur ni requête vers les sites.
+Les pages sont réparties par lots entre plusieurs processus, chacun téléchargeant,
+décompressant et analysant ses pages.
+
+Chaque page est analysée comme une page de listing (parsers.LISTING_PARSERS), puis à
+défaut comme une page de détail (fonction HTML du scraper du site). Les offres des
+listings et les champs des pages de détail sont fusionnés par job_url, la page de
+détail d'une offre étant chargée depuis son job_url. Pour chaque URL, seule la
+dernière version archivée est analysée.
+
+Usage :
+    python -m data_extraction.Websites.reparse <site> [--since 2025-06-01]
+        [--workers N] [--output fichier.jsonl]
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from data_extraction.Websites import site_key
+from data_extraction.Websites.html_archive import archive_bucket, page_object
+from data_extraction.Websites.offer_store import OUTPUT_DIR, OUTPUT_FILES
+from data_extraction.Websites.parsers import LISTING_PARSERS, PageParseError
+from data_extraction.Websites.runner import SCRAPER_MODULES
+from data_extraction.Websites.url_index import canonicalize_url
+
+# Fonction du scraper de chaque site qui convertit le HTML d'une page de détail en champs
+DETAIL_FUNCTIONS = {
+    "Bayt": "job_details_from_html",
+    "Maroc_annonces": "offer_details_from_html",
+}
+CHUNK_SIZE = 50
+
+
+def load_index(client, site, since=None):
+    """Dernière version archivée de chaque URL d'un site.
+
+    Args:
+        client (Minio): Client MinIO.
+        site (str): Nom de la source.
+        since (str, optional): Date ISO ; les pages téléchargées avant sont ignorées.
+
+    Returns:
+        list: Entrées d'index ({"url", "sha256", "fetched_at", ...}).
+    """
+    bucket, latest = archive_bucket(), {}
+    for obj in client.list_objects(bucket, prefix=f"index/{site_key(site)}/"):
+        response = client.get_object(bucket, obj.object_name)
+        try:
+            lines = response.read().decode("utf-8").splitlines()
+        finally:
+            response.close()
+            response.release_conn()
+        for line in lines:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if since and entry["fetched_at"] < since:
+                continue
+            previous = latest.get(entry["url"])
+            if previous is None or entry["fetched_at"] >= previous["fetched_at"]:
+                latest[entry["url"]] = entry
+    return list(latest.values())
+
+
+def parse_page(site, url, page_html):
+    """Analyse une page archivée.
+
+    Returns:
+        tuple: ("listing", offres), ("detail", champs) ou ("error", message).
+    """
+    listing_parser = LISTING_PARSERS.get(site)
+    if listing_parser is not None:
+        try:
+            offers = listing_parser(page_html, base_url=url)
+            if offers:
+                return "listing", offers
+        except PageParseError:
+            pass
+    if site in DETAIL_FUNCTIONS:
+        scraper = importlib.import_module(SCRAPER_MODULES[site])
+        try:
+            details = getattr(scraper, DETAIL_FUNCTIONS[site])(page_html, url)
+            return "detail", details
+        except PageParseError as e:
+            return "error", str(e)
+    return "error", "Page ni de listing ni de détail"
+
+
+def parse_chunk(site, entries):
+    """Télécharge et analyse un lot de pages (exécuté dans un processus du pool)."""
+    import zstandard
+
+    from storage import get_client
+
+    client, bucket = get_client(), archive_bucket()
+    decompressor = zstandard.ZstdDecompressor()
+    results = []
+    for entry in entries:
+        try:
+            response = client.get_object(bucket, page_object(entry["sha256"]))
+            try:
+                content = decompressor.decompress(response.read())
+            finally:
+                response.close()
+                response.release_conn()
+            kind, result = parse_page(site, entry["url"], content.decode("utf-8"))
+        except Exception as e:
+            kind, result = "error", repr(e)
+        results.append((entry["url"], kind, result))
+    return results
+
+
+def merge_results(site, results):
+    """Fusionne offres des listings et champs des pages de détail par job_url."""
+    offers = {}
+    for url, kind, result in results:
+        if kind == "listing":
+            for offer in result:
+                key = canonicalize_url(offer.get("job_url")) or f"#{len(offers)}"
+                offers.setdefault(key, {"via": site}).update(offer)
+    # Les champs des pages de détail complètent ceux des listings
+    for url, kind, result in results:
+        if kind == "detail":
+            offer = offers.setdefault(canonicalize_url(url), {"via": site})
+            offer.setdefault("job_url", url)
+            offer.update(result)
+    return list(offers.values())
+
+
+def reparse(site, since=None, workers=None, output=None, logger=logging):
+    """Ré-analyse les pages archivées d'un site et écrit les offres obtenues.
+
+    Returns:
+        dict: pages, listing, detail, errors, offers, seconds et output.
+    """
+    from storage import get_client
+
+    start = time.perf_counter()
+    entries = load_index(get_client(), site, since)
+    chunks = [entries[i : i + CHUNK_SIZE] for i in range(0, len(entries), CHUNK_SIZE)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for chunk_results in executor.map(parse_chunk, [site] * len(chunks), chunks):
+            results.extend(chunk_results)
+    offers = merge_results(site, results)
+
+    output = output or os.path.join(OUTPUT_DIR, "reparsed", OUTPUT_FILES[site])
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as jsonl_file:
+        for offer in offers:
+            jsonl_file.write(json.dumps(offer, ensure_ascii=False) + "\n")
+
+    kinds = [kind for _, kind, _ in results]
+    for url, kind, result in results:
+        if kind == "error":
+            logger.warning(f"{url} : {result}")
+    report = {
+        "site": site,
+        "pages": len(results),
+        "listing": kinds.count("listing"),
+        "detail": kinds.count("detail"),
+        "errors": kinds.count("error"),
+        "offers": len(offers),
+        "seconds": round(time.perf_counter() - start, 2),
+        "output": output,
+    }
+    logger.info(
+        f"{site} : {report['pages']} pages ré-analysées en {report['seconds']}s "
+        f"({report['errors']} en échec), {report['offers']} offres dans {output}"
+    )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ré-analyse les pages de l'archive HTML avec les parseurs actuels"
+    )
+    parser.add_argument("site", choices=list(SCRAPER_MODULES))
+    parser.add_argument("--since", help="Date ISO des plus anciennes pages à analyser")
+    parser.add_argument(
+        "--workers", type=int, help="Processus (défaut : nombre de cœurs)"
+    )
+    parser.add_argument(
+        "--output",
+        help="Fichier JSON Lines de sortie (défaut scraping_output/reparsed/)",
+    )
+    args = parser.parse_args(argv)
+    report = reparse(args.site, args.since, args.workers, args.output)
+    print(json.dumps(report, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,180 @@
+"""Enregistrement des pages des sites et serveur HTTP local qui les rejoue.
+
+En mode enregistrement (SCRAPER_RECORD_DIR), chaque page de listing ou de détail
+chargée par les scrapers (http_fetch.fetch et PooledDriver.get) est sauvegardée dans
+<dossier>/<hôte>/, avec un index chemin?requête -> fichier. En mode rejeu
+(SCRAPER_REPLAY_URL), les URLs des sites sont réécrites vers le serveur local, qui
+sert les pages enregistrées d'un hôte : les scrapers s'exécutent sur un contenu
+déterministe, sans toucher aux sites réels. Les offres gardent leurs URLs d'origine,
+les parseurs recevant l'URL de la page avant réécriture.
+
+Variables d'environnement :
+    SCRAPER_RECORD_DIR: Dossier où enregistrer les pages (désactivé si vide).
+    SCRAPER_REPLAY_URL: URL du serveur de rejeu, ex. http://127.0.0.1:8765.
+
+Usage :
+    python -m data_extraction.Websites.replay <dossier>/<hôte> [--port 8765]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+INDEX_FILENAME = "index.jsonl"
+DEFAULT_PORT = 8765
+
+_record_lock = threading.Lock()
+
+
+def record_dir():
+    """Dossier d'enregistrement des pages, ou None hors mode enregistrement."""
+    return os.environ.get("SCRAPER_RECORD_DIR") or None
+
+
+def replay_base():
+    """URL du serveur de rejeu, ou None hors mode rejeu."""
+    return os.environ.get("SCRAPER_REPLAY_URL") or None
+
+
+def page_key(url):
+    """Clé d'une page dans un enregistrement : chemin et requête, sans l'hôte."""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def replay_url(url):
+    """Réécrit une URL de site vers le serveur de rejeu (inchangée hors mode rejeu)."""
+    base = replay_base()
+    if not base or not url or not url.startswith(("http://", "https://")):
+        return url
+    parts, target = urlsplit(url), urlsplit(base)
+    if parts.netloc == target.netloc:
+        return url
+    return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, ""))
+
+
+def record_page(url, page_html):
+    """Enregistre le HTML d'une page chargée (sans effet hors mode enregistrement)."""
+    directory = record_dir()
+    if not directory or not url or not page_html:
+        return
+    host = urlsplit(url).netloc
+    if not host or host == urlsplit(replay_base() or "").netloc:
+        return
+    key = page_key(url)
+    filename = hashlib.sha256(key.encode("utf-8")).hexdigest()[:20] + ".html"
+    host_dir = os.path.join(directory, host)
+    with _record_lock:
+        os.makedirs(host_dir, exist_ok=True)
+        with open(os.path.join(host_dir, filename), "w", encoding="utf-8") as f:
+            f.write(page_html)
+        with open(os.path.join(host_dir, INDEX_FILENAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "file": filename}) + "\n")
+
+
+def load_recording(host_dir):
+    """Index d'un enregistrement : {chemin?requête: fichier}, la dernière version gagne."""
+    pages = {}
+    with open(os.path.join(host_dir, INDEX_FILENAME), "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                pages[entry["key"]] = entry["file"]
+    return pages
+
+
+class ReplayServer:
+    """Serveur HTTP local qui rejoue les pages enregistrées d'un hôte.
+
+    Une page absente avec sa requête exacte est servie par la première page
+    enregistrée de même chemin (ex. la recherche Bayt soumise par formulaire) ;
+    sinon le serveur répond 404.
+
+    Args:
+        host_dir (str): Dossier de l'hôte dans l'enregistrement.
+        port (int, optional): Port d'écoute, 0 pour un port libre.
+    """
+
+    def __init__(self, host_dir, port=0):
+        self.host_dir = host_dir
+        self.pages = load_recording(host_dir)
+        self.by_path = {}
+        for key in sorted(self.pages):
+            self.by_path.setdefault(key.split("?", 1)[0], self.pages[key])
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def lookup(self, key):
+        """Fichier enregistré pour une clé de page, ou None."""
+        return self.pages.get(key) or self.by_path.get(key.split("?", 1)[0])
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                filename = server.lookup(page_key(self.path))
+                if filename is None:
+                    self.send_error(404)
+                    return
+                with open(os.path.join(server.host_dir, filename), "rb") as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(f"Rejeu : {format % args}")
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rejoue les pages enregistrées d'un hôte"
+    )
+    parser.add_argument("host_dir")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    server = ReplayServer(args.host_dir, args.port)
+    print(f"{len(server.pages)} pages rejouées sur {server.url}")
+    print(f"Exporter SCRAPER_REPLAY_URL={server.url} avant de lancer le scraper")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Exécution des scrapers : point d'entrée commun à Celery et à la ligne de commande.
+
+run_site importe le module d'un site et appelle son main() dans le processus courant
+(les tâches Celery, dont les workers ne peuvent pas créer de processus fils) ; le
+résultat est un dictionnaire (nouvelles offres, durée, erreur, manifeste du fichier
+de sortie) au lieu d'un nombre relu dans la sortie standard. run_sites lance
+plusieurs sites, chacun dans son propre processus, en plafonnant les ressources :
+nombre de processus, instances de Chrome et mémoire estimée. Les logs des scrapers
+sont écrits au fil de l'eau par chaque processus (console et fichier de log du
+site), rien n'est conservé en mémoire.
+
+Variables d'environnement :
+    SCRAPER_RUNNER_WORKERS: Sites exécutés simultanément (défaut 4).
+    SCRAPER_RUNNER_MAX_CHROME: Instances de Chrome simultanées (défaut 2).
+    SCRAPER_RUNNER_MEMORY_MB: Mémoire allouée aux scrapers simultanés (défaut : la
+        mémoire disponible, sinon 4096).
+"""
+
+import importlib
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from data_extraction.Websites.http_fetch import fetch_mode
+from data_extraction.Websites.offer_store import OUTPUT_FILES, file_manifest
+from data_extraction.Websites.sharding import page_shards
+from data_extraction.Websites.watermarks import full_requested
+from monitoring import OFFERS_EXTRACTED, push_metrics
+
+# Module du scraper de chaque source
+SCRAPER_MODULES = {
+    "Rekrute": "data_extraction.Websites.Rekrute",
+    "Bayt": "data_extraction.Websites.bayt",
+    "emploi.ma": "data_extraction.Websites.emploi",
+    "Maroc_annonces": "data_extraction.Websites.MarocAnn",
+}
+# Sources dont la pagination passe toujours par Selenium, quel que soit FETCH_MODE
+SELENIUM_SITES = {"Bayt"}
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_CHROME = 2
+DEFAULT_MEMORY_MB = 4096
+# Estimations de l'empreinte mémoire d'un scraper et de chaque Chrome qu'il ouvre
+BASE_MEMORY_MB = 150
+CHROME_MEMORY_MB = 600
+
+
+def chrome_instances(site, full=None):
+    """Nombre d'instances de Chrome ouvertes par un site (une par worker de pagination)."""
+    if site not in SELENIUM_SITES and fetch_mode(site) != "selenium":
+        return 0
+    return page_shards(site) if full_requested(site, full) else 1
+
+
+def memory_estimate(site, full=None):
+    """Mémoire estimée (Mo) d'une exécution d'un site."""
+    return BASE_MEMORY_MB + CHROME_MEMORY_MB * chrome_instances(site, full)
+
+
+def available_memory_mb():
+    """Mémoire disponible sur la machine (Mo), ou DEFAULT_MEMORY_MB si inconnue."""
+    try:
+        pages = os.sysconf("SC_AVPHYS_PAGES")
+        return pages * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return DEFAULT_MEMORY_MB
+
+
+def run_site(site, full=None):
+    """Exécute le scraper d'un site dans le processus courant.
+
+    Args:
+        site (str): Nom de la source (clé de SCRAPER_MODULES, ex. "Bayt").
+        full (bool, optional): Parcours complet (rattrapage).
+
+    Returns:
+        dict: site, status ("success" ou "failed"), seconds, et selon le cas
+        new_records et le manifeste du fichier de sortie (key, records, bytes,
+        sha256), ou error. Les métriques du processus sont envoyées à la
+        Pushgateway (monitoring.push_metrics) en fin d'exécution.
+    """
+    start = time.perf_counter()
+    try:
+        scraper = importlib.import_module(SCRAPER_MODULES[site])
+        offers = scraper.main(full=full)
+    except Exception as e:
+        logging.exception(f"Échec du scraper {site} : {e}")
+        push_metrics("scrapers")
+        return {
+            "site": site,
+            "status": "failed",
+            "error": str(e),
+            "seconds": round(time.perf_counter() - start, 2),
+        }
+    OFFERS_EXTRACTED.labels(site).inc(len(offers))
+    push_metrics("scrapers")
+    return {
+        "site": site,
+        "status": "success",
+        "new_records": len(offers),
+        "seconds": round(time.perf_counter() - start, 2),
+        **file_manifest(OUTPUT_FILES[site]),
+    }
+
+
+def run_sites(
+    sites=None, full=None, workers=None, max_chrome=None, memory_mb=None, logger=logging
+):
+    """Exécute plusieurs sites en parallèle, chacun dans son propre processus.
+
+    Un site n'est lancé que si le nombre de sites en cours, les instances de Chrome
+    et la mémoire estimée restent sous leurs plafonds ; un site qui dépasse seul un
+    plafond est lancé quand plus rien ne tourne. Chaque site a son processus : un
+    scraper tué (OOM) n'interrompt pas les autres.
+
+    Returns:
+        list: Résultats de run_site, dans l'ordre de fin d'exécution.
+    """
+    pending = list(sites or SCRAPER_MODULES)
+    workers = workers or int(os.environ.get("SCRAPER_RUNNER_WORKERS", DEFAULT_WORKERS))
+    max_chrome = max_chrome or int(
+        os.environ.get("SCRAPER_RUNNER_MAX_CHROME", DEFAULT_MAX_CHROME)
+    )
+    memory_mb = memory_mb or int(
+        os.environ.get("SCRAPER_RUNNER_MEMORY_MB") or available_memory_mb()
+    )
+    logger.info(
+        f"Exécution de {len(pending)} sites : {workers} à la fois, "
+        f"{max_chrome} Chrome, {memory_mb} Mo"
+    )
+    running, results = {}, []
+    used_chrome = used_memory = 0
+    while pending or running:
+        for site in list(pending):
+            chrome, memory = chrome_instances(site, full), memory_estimate(site, full)
+            fits = (
+                len(running) < workers
+                and used_chrome + chrome <= max_chrome
+                and used_memory + memory <= memory_mb
+            )
+            if not fits and running:
+                continue
+            executor = ProcessPoolExecutor(max_workers=1)
+            future = executor.submit(run_site, site, full)
+            running[future] = (site, chrome, memory, executor)
+            used_chrome += chrome
+            used_memory += memory
+            pending.remove(site)
+            logger.info(f"{site} lancé ({chrome} Chrome, ~{memory} Mo)")
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            site, chrome, memory, executor = running.pop(future)
+            used_chrome -= chrome
+            used_memory -= memory
+            executor.shutdown()
+            try:
+                result = future.result()
+            except Exception as e:  # Processus tué (BrokenProcessPool), OOM...
+                result = {"site": site, "status": "failed", "error": repr(e)}
+            results.append(result)
+            if result["status"] == "success":
+                logger.info(
+                    f"{site} terminé en {result['seconds']}s : "
+                    f"{result['new_records']} nouvelles offres, "
+                    f"{result['records']} dans {result['key']} ({result['bytes']} octets)"
+                )
+            else:
+                logger.error(f"{site} en échec : {result['error']}")
+    return results
@@ -0,0 +1,137 @@
+"""Pagination répartie : les pages de résultats d'un site sont partagées entre K workers.
+
+Quand la liste des pages est connue d'avance (Rekrute, Bayt, emploi.ma), chaque worker
+parcourt sa part des pages avec son propre WebDriver, emprunté à un pool dédié de K
+drivers ; les offres sont ensuite fusionnées dans l'ordre des pages et dédoublonnées
+par job_url. Selenium et les requêtes HTTP attendent surtout le navigateur et le
+réseau : les workers sont des threads, ce qui évite de sérialiser les offres entre
+processus. Le mode réparti ne sert que pour les parcours complets (rattrapage) ; le
+mode incrémental reste séquentiel pour pouvoir s'arrêter à la première page connue.
+
+Une page en échec n'interrompt pas les autres workers, mais le parcours lève
+ShardPagesError une fois toutes les pages traitées : le scraper ne sauvegarde alors ni
+l'état du parcours ni l'effacement du point de reprise, et la tentative suivante ne
+reprend que les pages en échec.
+
+Variables d'environnement :
+    SCRAPER_<SITE>_PAGE_SHARDS: Nombre de workers K (défaut 1 : pagination séquentielle).
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from data_extraction.Websites import site_setting
+from data_extraction.Websites.browser_profile import page_load_strategy
+from data_extraction.Websites.driver_pool import DriverPool
+from data_extraction.Websites.http_fetch import LazyDriver
+from data_extraction.Websites.stages import DEDUP, stage
+from data_extraction.Websites.url_index import canonicalize_url
+
+
+class ShardPagesError(Exception):
+    """Levée par crawl_shards lorsque des pages n'ont pas pu être parcourues.
+
+    Attributes:
+        pages (list): Pages en échec.
+        offers (list): Offres des autres pages, fusionnées et dédoublonnées.
+    """
+
+    def __init__(self, pages, offers):
+        super().__init__(f"{len(pages)} pages en échec : {pages}")
+        self.pages = pages
+        self.offers = offers
+
+
+def page_shards(site):
+    """Nombre de workers de la pagination répartie d'un site (SCRAPER_<SITE>_PAGE_SHARDS)."""
+    return max(1, int(site_setting(site, "PAGE_SHARDS", 1)))
+
+
+def split_pages(pages, shards):
+    """Répartit les pages en parts entrelacées : la part i reçoit les pages i, i+K, ...
+
+    L'entrelacement équilibre la charge quand les dernières pages sont plus courtes.
+
+    Returns:
+        list: Parts non vides de couples (position de la page, page).
+    """
+    positioned = list(enumerate(pages))
+    parts = [positioned[index::shards] for index in range(shards)]
+    return [part for part in parts if part]
+
+
+@stage(DEDUP)
+def merge_offers(page_offers):
+    """Fusionne les offres des pages dans l'ordre, sans doublon de job_url."""
+    merged, seen = [], set()
+    for offers in page_offers:
+        for offer in offers:
+            key = canonicalize_url(offer.get("job_url"))
+            if key in seen:
+                continue
+            if key:
+                seen.add(key)
+            merged.append(offer)
+    return merged
+
+
+def crawl_shards(
+    pages, scrape_page, site, logger=logging, shards=None, checkpoint=None
+):
+    """Parcourt les pages avec K workers ayant chacun leur WebDriver.
+
+    Args:
+        pages (list): Pages à parcourir (URLs ou numéros), dans l'ordre du site.
+        scrape_page (callable): scrape_page(lazy_driver, page) renvoie les nouvelles
+            offres d'une page ; le driver n'est emprunté qu'au premier lazy_driver.get().
+        site (str): Nom de la source, pour le profil de navigateur et la configuration.
+        logger (logging.Logger, optional): Logger du scraper.
+        shards (int, optional): Nombre de workers, par défaut page_shards(site).
+        checkpoint (checkpoints.Checkpoint, optional): Point de reprise ; les pages
+            déjà faites sont sautées et chaque page terminée y est enregistrée.
+
+    Returns:
+        list: Offres de toutes les pages, fusionnées et dédoublonnées.
+
+    Raises:
+        ShardPagesError: Si des pages ont échoué, après le parcours des autres pages.
+    """
+    parts = split_pages(pages, shards or page_shards(site))
+    if not parts:
+        return []
+    logger.info(f"Pagination répartie de {len(pages)} pages sur {len(parts)} workers")
+    results = [[] for _ in pages]
+    failed = []
+    pool = DriverPool(size=len(parts), page_load_strategy=page_load_strategy(site))
+
+    def run_shard(worker, part):
+        lazy_driver = LazyDriver(site, pool=pool, logger=logger)
+        try:
+            for position, page in part:
+                if checkpoint is not None and checkpoint.is_done(page):
+                    continue
+                try:
+                    offers = scrape_page(lazy_driver, page)
+                    results[position] = offers or []
+                    if checkpoint is not None and offers is not None:
+                        checkpoint.page_done(page, offers)
+                except Exception as e:
+                    logger.exception(f"[worker {worker}] Échec de la page {page} : {e}")
+                    failed.append((position, page))
+            logger.info(f"[worker {worker}] {len(part)} pages traitées")
+        finally:
+            lazy_driver.quit()
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+            list(executor.map(run_shard, range(len(parts)), parts))
+    finally:
+        pool.close()
+    merged = merge_offers(results)
+    logger.info(
+        f"{sum(len(offers) for offers in results)} offres extraites, "
+        f"{len(merged)} après dédoublonnage"
+    )
+    if failed:
+        raise ShardPagesError([page for _, page in sorted(failed)], merged)
+    return merged
@@ -0,0 +1,76 @@
+"""Temps passé par étape de scraping (navigation, analyse, validation, dédoublonnage, sauvegarde).
+
+Les étapes sont mesurées à l'endroit où elles sont faites (http_fetch.fetch,
+PooledDriver.get, parseurs lxml, validate_batch, index des URLs, offer_store) et
+cumulées dans STAGE_TIMES, sur le modèle de WAIT_STATS, et dans l'histogramme
+Prometheus scraper_stage_seconds (monitoring). Les pages de détail étant téléchargées
+par plusieurs threads, la somme des étapes peut dépasser la durée réelle.
+"""
+
+import functools
+import threading
+import time
+
+from monitoring import STAGE_SECONDS
+
+NAVIGATION = "navigation"
+PARSING = "parsing"
+VALIDATION = "validation"
+DEDUP = "dedup"
+SAVE = "save"
+STAGES = (NAVIGATION, PARSING, VALIDATION, DEDUP, SAVE)
+
+
+class StageTimes:
+    """Durée cumulée et nombre d'appels par étape, sûr entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            count, total = self._stats.get(stage, (0, 0.0))
+            self._stats[stage] = (count + 1, total + seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """Copie des statistiques : {étape: (appels, secondes)}."""
+        with self._lock:
+            return dict(self._stats)
+
+    def report(self, logger):
+        """Écrit dans le logger le temps passé dans chaque étape."""
+        stats = self.snapshot()
+        for stage in STAGES:
+            count, seconds = stats.get(stage, (0, 0.0))
+            logger.info(f"  {stage} : {seconds:.2f}s en {count} appels")
+
+
+STAGE_TIMES = StageTimes()
+
+
+class stage:
+    """Mesure un bloc (with stage(PARSING): ...) ou une fonction (@stage(PARSING))."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        STAGE_TIMES.record(self.name, seconds)
+        STAGE_SECONDS.labels(self.name).observe(seconds)
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(self.name):
+                return function(*args, **kwargs)
+
+        return wrapper
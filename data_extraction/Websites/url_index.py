@@ -0,0 +1,188 @@
+"""Index persistant des URLs d'offres déjà collectées, partagé par tous les scrapers.
+
+L'index associe chaque job_url canonisée à sa source et à ses dates de première et
+dernière observation. Il est chargé une seule fois par processus (voir get_url_index)
+et réécrit de façon atomique en fin d'exécution : un test de doublon est une
+recherche en temps constant, sans parcours de l'historique.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from data_extraction.Websites import file_lock, state_path, write_json_atomic
+from data_extraction.Websites.rate_limit import site_for_url
+from data_extraction.Websites.stages import DEDUP, SAVE, stage
+from monitoring import DUPLICATES
+
+INDEX_FILENAME = "url_index.json"
+# Paramètres de suivi ignorés lors de la canonisation
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def canonicalize_url(url):
+    """Normalise une URL d'offre pour qu'une même offre ait toujours la même clé.
+
+    Met le schéma et l'hôte en minuscules, retire le fragment, le port par défaut,
+    le "/" final et les paramètres de suivi, et trie les paramètres restants.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+class UrlIndex:
+    """Index job_url canonisée -> {source, first_seen, last_seen, publication_date}.
+
+    Les recherches sont en O(1). Les modifications restent en mémoire jusqu'à
+    l'appel de save(), qui fusionne avec la version sur disque (au cas où un autre
+    scraper l'aurait modifiée entre-temps) puis la remplace atomiquement.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._dates = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._entries = self._read()
+        for entry in self._entries.values():
+            self._index_date(entry)
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as js_file:
+                return json.load(js_file)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logging.warning(f"{self.path} contient un JSON invalide, index ignoré.")
+            return {}
+
+    def _index_date(self, entry):
+        if entry.get("publication_date"):
+            self._dates.setdefault(entry["source"], set()).add(
+                entry["publication_date"]
+            )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return canonicalize_url(url) in self._entries
+
+    def has_source(self, source):
+        """Indique si l'index contient déjà au moins une offre de cette source."""
+        return source in self._dates or any(
+            entry["source"] == source for entry in self._entries.values()
+        )
+
+    @stage(DEDUP)
+    def seen(self, url, touch=True):
+        """Vérifie si une offre est déjà connue et met à jour sa date de dernière observation."""
+        key = canonicalize_url(url)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if touch:
+            with self._lock:
+                entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+                self._dirty.add(key)
+        DUPLICATES.labels(site_for_url(url), "url").inc()
+        logging.debug(f"Duplicate found: {url}")
+        return True
+
+    @stage(DEDUP)
+    def has_publication_date(self, source, publication_date):
+        """Vérifie si une offre de la source a déjà été enregistrée à cette date."""
+        return publication_date in self._dates.get(source, ())
+
+    def add(self, url, source, publication_date=None):
+        """Ajoute (ou rafraîchit) une offre dans l'index."""
+        key = canonicalize_url(url)
+        if not key:
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            entry = self._entries.setdefault(
+                key, {"source": source, "first_seen": now, "last_seen": now}
+            )
+            entry["last_seen"] = now
+            if publication_date:
+                entry["publication_date"] = publication_date
+            self._index_date(entry)
+            self._dirty.add(key)
+
+    def update(self, source, offers):
+        """Ajoute une liste d'offres (dictionnaires avec job_url) à l'index."""
+        for offer in offers:
+            self.add(offer.get("job_url"), source, offer.get("publication_date"))
+
+    @stage(DEDUP)
+    def bootstrap(self, source, load_offers):
+        """Remplit l'index à partir de l'historique d'une source si elle n'y figure pas.
+
+        Args:
+            source (str): Nom de la source (valeur du champ "via").
+            load_offers (callable): Fonction renvoyant les offres déjà sauvegardées
+                (liste ou itérateur), appelée uniquement si la source est absente de
+                l'index.
+        """
+        if self.has_source(source):
+            return
+        before = len(self)
+        self.update(source, load_offers())
+        logging.info(
+            f"Index des URLs initialisé avec {len(self) - before} offres {source}"
+        )
+
+    @stage(SAVE)
+    def save(self):
+        """Fusionne les modifications avec l'index sur disque et le réécrit atomiquement."""
+        with self._lock:
+            if not self._dirty:
+                return
+            with file_lock(self.path):
+                on_disk = self._read()
+                for key in self._dirty:
+                    entry = self._entries[key]
+                    previous = on_disk.get(key)
+                    if previous:
+                        entry["first_seen"] = min(
+                            entry["first_seen"], previous["first_seen"]
+                        )
+                        entry["last_seen"] = max(
+                            entry["last_seen"], previous["last_seen"]
+                        )
+                    on_disk[key] = entry
+                write_json_atomic(self.path, on_disk)
+            self._entries = on_disk
+            for entry in on_disk.values():
+                self._index_date(entry)
+            self._dirty.clear()
+        logging.info(f"Index des URLs sauvegardé ({len(self._entries)} offres)")
+
+
+def get_url_index(path=None):
+    """Retourne l'index des URLs du processus, chargé depuis le disque au premier appel."""
+    path = os.path.abspath(path or state_path(INDEX_FILENAME))
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = UrlIndex(path)
+        return _indexes[path]
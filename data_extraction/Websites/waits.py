@@ -0,0 +1,112 @@
+"""Recherches d'éléments sans attente implicite et mesure du temps d'attente.
+
+Les drivers sont créés avec implicitly_wait(0) : un champ optionnel absent ne bloque
+plus pendant 10 secondes. Les attentes ne sont faites qu'explicitement, sur des
+conditions de page prête (wait_present, wait_all_present), et le temps passé dans
+chaque recherche est cumulé par sélecteur dans WAIT_STATS et dans l'histogramme
+Prometheus scraper_selector_lookup_seconds (monitoring).
+"""
+
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from monitoring import SELECTOR_SECONDS
+
+
+class WaitStats:
+    """Temps d'attente cumulé et nombre d'appels par sélecteur, sûr entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, selector, seconds):
+        with self._lock:
+            count, total = self._stats.get(selector, (0, 0.0))
+            self._stats[selector] = (count + 1, total + seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """Copie des statistiques : {sélecteur: (appels, secondes)}."""
+        with self._lock:
+            return dict(self._stats)
+
+    def report(self, logger, top=10):
+        """Écrit dans le logger les sélecteurs ayant coûté le plus de temps."""
+        stats = sorted(self.snapshot().items(), key=lambda item: -item[1][1])
+        total = sum(seconds for _, (_, seconds) in stats)
+        logger.info(f"Temps total passé à attendre des éléments : {total:.2f}s")
+        for selector, (count, seconds) in stats[:top]:
+            logger.info(f"  {selector} : {seconds:.2f}s en {count} appels")
+
+
+WAIT_STATS = WaitStats()
+
+
+class _timed:
+    def __init__(self, selector):
+        self.selector = selector
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        WAIT_STATS.record(self.selector, seconds)
+        SELECTOR_SECONDS.labels(self.selector).observe(seconds)
+
+
+def find_optional(parent, by, selector):
+    """Premier élément correspondant sous parent, ou None s'il est absent (jamais bloquant)."""
+    with _timed(selector):
+        elements = parent.find_elements(by, selector)
+    return elements[0] if elements else None
+
+
+def optional_text(parent, by, selector, default=""):
+    """Texte du premier élément correspondant, ou default s'il est absent."""
+    element = find_optional(parent, by, selector)
+    return element.text.strip() if element is not None else default
+
+
+def wait_present(driver, by, selector, timeout=15):
+    """Attend explicitement la présence d'un élément (condition de page prête).
+
+    Raises:
+        TimeoutException: Si l'élément n'apparaît pas avant timeout secondes.
+    """
+    with _timed(selector):
+        return WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((by, selector))
+        )
+
+
+def wait_all_present(driver, by, selector, timeout=15):
+    """Attend explicitement la présence d'au moins un élément et les renvoie tous.
+
+    Raises:
+        TimeoutException: Si aucun élément n'apparaît avant timeout secondes.
+    """
+    with _timed(selector):
+        return WebDriverWait(driver, timeout).until(
+            EC.presence_of_all_elements_located((by, selector))
+        )
+
+
+def wait_optional(driver, by, selector, timeout=3):
+    """Attend brièvement un élément qui peut ne jamais apparaître (popup, bannière).
+
+    Returns:
+        L'élément, ou None si le délai est dépassé.
+    """
+    try:
+        return wait_present(driver, by, selector, timeout)
+    except TimeoutException:
+        return None
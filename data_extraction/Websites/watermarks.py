@@ -0,0 +1,155 @@
+"""Scraping incrémental : arrêt anticipé de la pagination et repère (watermark) par site.
+
+Les résultats des sites sont triés du plus récent au plus ancien : dès qu'une page ne
+contient plus que des offres déjà connues (index des URLs), les pages suivantes n'en
+contiennent pas non plus et la pagination s'arrête. Le repère de chaque site (offre la
+plus récente vue, date de la dernière exécution et du dernier parcours complet) est
+enregistré dans le dossier d'état ; tant qu'aucun parcours n'a abouti pour un site, le
+parcours est complet.
+
+Variables d'environnement :
+    SCRAPER_FULL, SCRAPER_<SITE>_FULL: "1" force un parcours complet (rattrapage).
+    SCRAPER_<SITE>_STOP_AFTER_KNOWN_PAGES: Pages consécutives sans nouvelle offre
+        avant l'arrêt (défaut 1).
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime
+
+from data_extraction.Websites import (
+    file_lock,
+    site_setting,
+    state_path,
+    write_json_atomic,
+)
+
+WATERMARKS_FILENAME = "watermarks.json"
+DEFAULT_STOP_AFTER_KNOWN_PAGES = 1
+
+
+def full_requested(site, full=None):
+    """Indique si un parcours complet est demandé (argument, sinon SCRAPER_<SITE>_FULL)."""
+    if full is not None:
+        return bool(full)
+    value = str(site_setting(site, "FULL", "0")).lower()
+    return value in ("1", "true", "yes", "on")
+
+
+def load_watermarks():
+    """Repères de tous les sites : {site: {job_url, publication_date, last_run, ...}}."""
+    try:
+        with open(state_path(WATERMARKS_FILENAME), "r", encoding="utf-8") as js_file:
+            return json.load(js_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class IncrementalCrawl:
+    """Suivi de la pagination d'une exécution et décision d'arrêt anticipé.
+
+    Args:
+        site (str): Nom de la source (valeur du champ "via").
+        full (bool, optional): Force (True) ou interdit (False) le parcours complet ;
+            par défaut SCRAPER_<SITE>_FULL.
+        logger (logging.Logger, optional): Logger du scraper.
+    """
+
+    def __init__(self, site, full=None, logger=logging):
+        self.site = site
+        self.logger = logger
+        self.watermark = load_watermarks().get(site)
+        self.full = full_requested(site, full)
+        self.incremental = not self.full and self.watermark is not None
+        self.stop_after = int(
+            site_setting(site, "STOP_AFTER_KNOWN_PAGES", DEFAULT_STOP_AFTER_KNOWN_PAGES)
+        )
+        self.pages = 0
+        self.known_pages = 0
+        self.newest = None
+        self.stopped_early = False
+        if self.full:
+            logger.info(f"Parcours complet de {site} (rattrapage demandé)")
+        elif not self.incremental:
+            logger.info(f"Aucun repère pour {site} : premier parcours complet")
+        else:
+            logger.info(
+                f"Mode incrémental pour {site}, dernière offre connue : "
+                f"{self.watermark.get('job_url')} ({self.watermark.get('last_run')})"
+            )
+
+    def page_done(self, new_offers, pages=1):
+        """Enregistre les nouvelles offres d'une page (ou de pages parcourues ensemble).
+
+        Returns:
+            bool: True s'il faut charger la page suivante, False si la pagination
+            peut s'arrêter (mode incrémental, pages sans nouvelle offre).
+        """
+        self.pages += pages
+        if new_offers:
+            self.known_pages = 0
+            if self.newest is None:
+                self.newest = new_offers[0]
+        else:
+            self.known_pages += 1
+        if self.incremental and self.known_pages >= self.stop_after:
+            self.stopped_early = True
+            self.logger.info(
+                f"Page {self.pages} sans nouvelle offre : arrêt de la pagination"
+            )
+            return False
+        return True
+
+    def state(self):
+        """État du parcours, enregistré dans les points de reprise (checkpoints)."""
+        newest = None
+        if self.newest is not None:
+            newest = {
+                "job_url": self.newest.get("job_url"),
+                "publication_date": self.newest.get("publication_date"),
+            }
+        return {"pages": self.pages, "known_pages": self.known_pages, "newest": newest}
+
+    def restore(self, state):
+        """Reprend l'état d'un parcours interrompu (voir state)."""
+        self.pages = state.get("pages", 0)
+        self.known_pages = state.get("known_pages", 0)
+        self.newest = state.get("newest")
+
+    def save(self):
+        """Met à jour le repère du site ; à appeler quand la pagination a abouti."""
+        now = datetime.now().isoformat(timespec="seconds")
+        path = state_path(WATERMARKS_FILENAME)
+        with file_lock(path):
+            watermarks = load_watermarks()
+            watermark = watermarks.setdefault(self.site, {})
+            if self.newest is not None:
+                watermark["job_url"] = self.newest.get("job_url")
+                watermark["publication_date"] = self.newest.get("publication_date")
+            watermark["last_run"] = now
+            watermark["pages_loaded"] = self.pages
+            watermark["stopped_early"] = self.stopped_early
+            if not self.incremental:
+                watermark["last_full_run"] = now
+            write_json_atomic(path, watermarks, indent=4)
+        self.logger.info(
+            f"{self.pages} pages chargées pour {self.site}"
+            + (" (arrêt anticipé)" if self.stopped_early else "")
+        )
+
+
+def parse_full_flag(argv=None):
+    """Lit l'option --full de la ligne de commande d'un scraper.
+
+    Returns:
+        bool | None: True si --full est passé, None sinon (SCRAPER_<SITE>_FULL décide).
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Parcourt toutes les pages (rattrapage) au lieu du mode incrémental",
+    )
+    args, _ = parser.parse_known_args(argv)
+    return True if args.full else None
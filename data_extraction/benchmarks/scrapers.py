@@ -0,0 +1,111 @@
+"""Mesure le débit des scrapers sur des pages enregistrées, sans toucher aux sites réels.
+
+Usage :
+    python -m data_extraction.benchmarks.scrapers record [--dir D] [--sites S ...]
+    python -m data_extraction.benchmarks.scrapers run [--dir D] [--sites S ...]
+
+"record" exécute un parcours complet de chaque site en ligne et enregistre les pages
+chargées (replay.record_page) ; "run" rejoue ces pages depuis un serveur local et
+affiche, par site, pages/s, offres/s et le temps passé dans chaque étape (navigation,
+analyse, validation, dédoublonnage, sauvegarde), sans limiteur de débit sauf si
+SCRAPER_RATE_LIMIT est défini. Dans les deux cas, l'index des URLs,
+les repères et les fichiers de sortie sont écrits dans un dossier temporaire : les
+fichiers de scraping_output ne sont jamais modifiés.
+"""
+
+import argparse
+import importlib
+import os
+import tempfile
+import time
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+# Module du scraper de chaque source (comme data_extraction.Websites.runner, que ce
+# module n'importe pas avant d'avoir défini SCRAPER_OUTPUT_DIR)
+SCRAPERS = {
+    "Rekrute": "data_extraction.Websites.Rekrute",
+    "Bayt": "data_extraction.Websites.bayt",
+    "emploi.ma": "data_extraction.Websites.emploi",
+    "Maroc_annonces": "data_extraction.Websites.MarocAnn",
+}
+
+
+def isolate(workdir, site):
+    """Dossiers d'état et de sortie propres à l'exécution d'un site."""
+    os.environ["SCRAPER_STATE_DIR"] = os.path.join(workdir, "state", site)
+    os.environ["SCRAPER_OUTPUT_DIR"] = os.path.join(workdir, "output")
+
+
+def run_site(site):
+    """Parcours complet d'un site ; renvoie (offres, durée, temps par étape)."""
+    from data_extraction.Websites.stages import STAGE_TIMES
+
+    scraper = importlib.import_module(SCRAPERS[site])
+    STAGE_TIMES.reset()
+    start = time.perf_counter()
+    offers = scraper.main(full=True)
+    return offers, time.perf_counter() - start, STAGE_TIMES.snapshot()
+
+
+def print_report(site, offers, seconds, stages):
+    from data_extraction.Websites.stages import NAVIGATION, STAGES
+
+    pages = stages.get(NAVIGATION, (0, 0.0))[0]
+    print(f"\n{site} : {pages} pages, {len(offers)} offres en {seconds:.2f}s")
+    print(
+        f"  {pages / seconds:.1f} pages/s, {len(offers) / seconds:.1f} offres/s"
+        if seconds
+        else "  durée nulle"
+    )
+    for stage in STAGES:
+        count, total = stages.get(stage, (0, 0.0))
+        print(f"  {stage:<11} {total:8.3f}s  {count:6d} appels")
+
+
+def record(args, workdir):
+    os.environ["SCRAPER_RECORD_DIR"] = args.dir
+    for site in args.sites:
+        isolate(workdir, site)
+        offers, seconds, _ = run_site(site)
+        print(f"{site} : {len(offers)} offres enregistrées en {seconds:.1f}s")
+    print(f"Pages enregistrées dans {args.dir}")
+
+
+def replay(args, workdir):
+    from data_extraction.Websites import SITE_HOSTS
+    from data_extraction.Websites.replay import ReplayServer
+
+    # Le serveur local n'a pas besoin d'être ménagé : on mesure les scrapers seuls
+    os.environ.setdefault("SCRAPER_RATE_LIMIT", "0")
+    for site in args.sites:
+        host_dir = os.path.join(args.dir, SITE_HOSTS[site])
+        if not os.path.isdir(host_dir):
+            print(f"\n{site} : aucun enregistrement dans {host_dir}, ignoré")
+            continue
+        isolate(workdir, site)
+        with ReplayServer(host_dir) as server:
+            os.environ["SCRAPER_REPLAY_URL"] = server.url
+            print_report(site, *run_site(site))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["record", "run"])
+    parser.add_argument("--dir", default=DEFAULT_DIR)
+    parser.add_argument("--sites", nargs="+", choices=list(SCRAPERS), default=None)
+    args = parser.parse_args()
+    args.dir = os.path.abspath(args.dir)
+    args.sites = args.sites or list(SCRAPERS)
+
+    with tempfile.TemporaryDirectory(prefix="scrapers_bench_") as workdir:
+        # Avant l'import des scrapers : offer_store lit SCRAPER_OUTPUT_DIR à l'import
+        isolate(workdir, args.sites[0])
+        if args.command == "record":
+            record(args, workdir)
+        else:
+            replay(args, workdir)
+
+
+if __name__ == "__main__":
+    main()
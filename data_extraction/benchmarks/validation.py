@@ -0,0 +1,84 @@
+"""Compare la validation offre par offre (ancien chemin) à la validation compilée en lot.
+
+Usage :
+    python -m data_extraction.benchmarks.validation [fichier .json ou .jsonl] [--repeat N]
+
+Par défaut, les offres de Rekrute (offres_emploi_rekrute.jsonl, ou l'ancien .json)
+sont validées. Le fichier n'est jamais migré ni modifié.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from jsonschema import ValidationError, validate
+
+from data_extraction.Websites import SCHEMA_PATH, get_validator, validate_batch
+from data_extraction.Websites.offer_store import (
+    OUTPUT_FILES,
+    iter_jsonl,
+    legacy_path,
+    output_path,
+)
+
+
+def load_records(path):
+    """Charge les offres d'un fichier .json (tableau) ou .jsonl."""
+    if path.endswith(".jsonl"):
+        return list(iter_jsonl(path))
+    with open(path, "r", encoding="utf-8") as js_file:
+        return json.load(js_file)
+
+
+def default_path():
+    """Fichier de sortie de Rekrute, au format JSON Lines ou à l'ancien format."""
+    path = output_path(OUTPUT_FILES["Rekrute"])
+    return path if os.path.exists(path) else legacy_path(OUTPUT_FILES["Rekrute"])
+
+
+def per_offer(records):
+    """Ancien chemin : lecture du schéma et nouveau validateur pour chaque offre."""
+    errors = []
+    for index, record in enumerate(records):
+        with open(SCHEMA_PATH) as f:
+            schema = json.load(f)
+        try:
+            validate(record, schema)
+        except ValidationError as e:
+            errors.append((index, e.message))
+    return errors
+
+
+def timed(function, records, repeat):
+    """Meilleure durée (en secondes) sur repeat exécutions, et le dernier résultat."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(records)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = args.path or default_path()
+    records = load_records(path)
+    backend = get_validator().backend
+    print(f"{len(records)} offres depuis {path} (validateur compilé : {backend})")
+
+    old_time, old_errors = timed(per_offer, records, args.repeat)
+    new_time, new_errors = timed(validate_batch, records, args.repeat)
+    print(f"Par offre : {old_time * 1000:.1f} ms, {len(old_errors)} offres invalides")
+    print(f"En lot    : {new_time * 1000:.1f} ms, {len(new_errors)} offres invalides")
+    print(f"Accélération : x{old_time / new_time:.1f}")
+    if [index for index, _ in old_errors] != [index for index, _ in new_errors]:
+        print("Attention : les offres invalides diffèrent entre les deux chemins")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 from celery_app.tasks import scraping_workflow
+from data_extraction.Websites.watermarks import parse_full_flag
 
 if __name__ == "__main__":
-    scraping_workflow.delay()
+    # --full : parcours complet de toutes les pages (rattrapage)
+    scraping_workflow.delay(full=parse_full_flag())
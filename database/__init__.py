@@ -1,52 +1,31 @@
 import os
 
-from minio import Minio, S3Error
+from minio import S3Error
 
+from monitoring import MINIO_BYTES
+from storage import bulk_upload, get_client, make_buckets
+from storage.codec import upload_file
 
-def start_client(
-    MINIO_URL=os.environ.get("MINIO_API"),
-    ACCESS_KEY=os.environ.get("MINIO_ROOT_USER"),
-    SECRET_KEY=os.environ.get("MINIO_ROOT_PASSWORD"),
-) -> Minio:
-    """This function simply connects to the minio server and returns a client instance.
 
-    It is supposed to be used in other modules to create and maintain connections to the Object sotrage server
-    """
-
-    # --- Connexion à MinIO ---
-    client = Minio(
-        MINIO_URL, access_key=ACCESS_KEY, secret_key=SECRET_KEY, secure=False
-    )
-    return client
-
-
-def make_buckets(bucket_list: list = ["webscraping", "traitement"]):
-    client = start_client()
-    for bucket_name in bucket_list:
-        if not client.bucket_exists(bucket_name):
-            client.make_bucket(bucket_name)
-            print(f"Bucket '{bucket_name}' créé.")
-        else:
-            print(f"Bucket '{bucket_name}' déjà existant.")
-
-
-def save_to_minio(
-    file_path,
-    bucket_name="webscraping",
-    content_type="application/json",
-):
+def save_to_minio(file_path, bucket_name="webscraping", codec=None):
+    """Uploads a file compressed with codec (STORAGE_CODEC by default, see storage.codec)."""
     try:
-        client = start_client()
+        client = get_client()
         object_name = os.path.basename(file_path)
-        client.fput_object(bucket_name, object_name, file_path, content_type)
+        object_name, size = upload_file(
+            client, bucket_name, object_name, file_path, codec=codec
+        )
+        MINIO_BYTES.labels(bucket_name, "out").inc(size)
         print(f" Uploaded the file : {object_name}")
+        return True
     except S3Error as err:
         print(f" Erreur : {object_name} → {err}")
+        return False
 
 
 def read_from_minio(file_path, object_name, bucket_name="webscraping"):
     try:
-        client = start_client()
+        client = get_client()
         json_file = client.fget_object(bucket_name, object_name, file_path)
         return json_file
     except Exception as e:
@@ -59,7 +38,7 @@ def read_all_from_bucket(
     bucket_name="webscraping",
 ) -> None:
     try:
-        client = start_client()
+        client = get_client()
     except Exception as e:
         print(f"Couldn't start client connection to Minio: {e}")
     try:
@@ -73,17 +52,52 @@ def read_all_from_bucket(
         print("Couldn't list the objects in Minio")
 
 
-def scraping_upload(scraping_dir="/app/data_extraction/scraping_output"):
+def scraping_upload(
+    scraping_dir="/app/data_extraction/scraping_output",
+    source=None,
+    keys=None,
+    force=False,
+):
+    """Uploads the scraping output files to the webscraping bucket.
+
+    If source is given (output file name without extension, e.g. "offres_emploi_bayt"),
+    only that source's file is uploaded, for the per-source pipelines. If keys is
+    given (object keys listed in the scrapers' manifests), only those files are.
+    Files are uploaded concurrently and unchanged files (same SHA-256 as the stored
+    object) are skipped, unless force is set (see storage.bulk_upload).
+
+    Returns:
+        list: Names of the files now up to date in the bucket (uploaded or unchanged).
+    """
+    bucket_name = "webscraping"
     try:
         make_buckets()
     except Exception:
         print("Couldn't setup the initial buckets")
+    files = {}
     try:
-        scraping_files = os.listdir(scraping_dir)
-
-        for file in scraping_files:
+        for file in os.listdir(scraping_dir):
             file_path = os.path.join(scraping_dir, file)
-            save_to_minio(file_path=file_path)
-
+            # Fichiers temporaires (compactage en cours) ignorés
+            if not os.path.isfile(file_path) or file.endswith((".tmp", ".lock")):
+                continue
+            if source and os.path.splitext(file)[0] != source:
+                continue
+            if keys is not None and file not in keys:
+                continue
+            files[file] = file_path
     except Exception as e:
         print(f"Couldn't list the files in the scraping folder:{e}")
+        return []
+    try:
+        report = bulk_upload(files, bucket_name, force=force)
+    except Exception as e:
+        print(f"Couldn't upload the scraping files: {e}")
+        return []
+    MINIO_BYTES.labels(bucket_name, "out").inc(report["bytes"])
+    print(
+        f" Uploaded {len(report['uploaded'])} files ({report['bytes']} bytes), "
+        f"skipped {len(report['skipped'])} unchanged, {len(report['failed'])} failed "
+        f"in {report['seconds']}s"
+    )
+    return report["uploaded"] + report["skipped"]
@@ -7,6 +7,8 @@ from datetime import datetime
 from dotenv import load_dotenv
 from groq import Groq
 
+from monitoring import LLM_CALL_SECONDS, LLM_TOKENS
+
 load_dotenv()
 
 # Configuration du logger
@@ -93,6 +95,7 @@ COMPÉTENCES ACTUELLES:
     try:
         logger.debug("🧠 Appel Groq avec streaming...")
         
+        start = time.perf_counter()
         completion = client.chat.completions.create(
             model=GROQ_MODEL,
             messages=[{
@@ -108,9 +111,20 @@ COMPÉTENCES ACTUELLES:
         
         # Reconstituer la réponse complète depuis le stream
         full_response = ""
+        usage = None
         for chunk in completion:
             content = chunk.choices[0].delta.content or ""
             full_response += content
+            # Le dernier chunk du stream porte la consommation de jetons (x_groq.usage)
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None):
+                usage = x_groq.usage
+
+        # 📈 Métriques de l'appel (durée et jetons)
+        LLM_CALL_SECONDS.labels(GROQ_MODEL).observe(time.perf_counter() - start)
+        if usage is not None:
+            LLM_TOKENS.labels(GROQ_MODEL, "prompt").inc(usage.prompt_tokens)
+            LLM_TOKENS.labels(GROQ_MODEL, "completion").inc(usage.completion_tokens)
         
         logger.debug(f"📝 Réponse complète reçue ({len(full_response)} chars)")
         return full_response.strip()
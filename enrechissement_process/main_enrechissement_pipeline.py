@@ -5,6 +5,7 @@ from datetime import datetime
 
 from utils__init__ import read_and_normalize_all_offers, save_to_minio
 from init_groq import process_all_offers
+from monitoring import push_metrics
 
 # 📌 Configuration du logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -14,7 +15,7 @@ BUCKET_INPUT = "webscraping"
 BUCKET_OUTPUT = "traitement"
 BATCH_SIZE = 10  # Ajustable selon capacité Groq
 DATE_SUFFIX = datetime.now().strftime('%Y%m%d_%H%M%S')
-FILENAME_OUTPUT = f"profils_data_enrichis_groq_{DATE_SUFFIX}.json"
+FILENAME_OUTPUT = f"profils_data_enrichis_groq_{DATE_SUFFIX}.jsonl"
 
 def main():
     logging.info("🚀 Lancement du pipeline de traitement via Groq")
@@ -35,8 +36,10 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
     local_path = os.path.join(output_dir, FILENAME_OUTPUT)
 
+    # JSON Lines compact, compressé à l'envoi (storage.codec)
     with open(local_path, "w", encoding="utf-8") as f:
-        json.dump(enriched_profiles, f, indent=2, ensure_ascii=False)
+        for profile in enriched_profiles:
+            f.write(json.dumps(profile, ensure_ascii=False) + "\n")
     logging.info(f"💾 Fichier local enregistré : {local_path}")
 
     # 4. Envoi vers MinIO
@@ -47,5 +50,8 @@ def main():
 
     logging.info(f"☁️ Envoi vers MinIO bucket '{BUCKET_OUTPUT}' terminé")
 
+    # 5. Métriques (appels LLM, octets MinIO) envoyées à la Pushgateway
+    push_metrics("enrichment")
+
 if __name__ == "__main__":
     main()
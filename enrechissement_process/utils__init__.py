@@ -2,54 +2,29 @@ import json
 import logging
 import os
 from datetime import datetime
-from minio import Minio, S3Error
+from minio import S3Error
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-def start_client(MINIO_URL=None, ACCESS_KEY=None, SECRET_KEY=None) -> Minio:
-    """
-    Initialise une instance de client MinIO avec les paramètres fournis ou les variables d'environnement.
-    
-    Returns:
-        Minio: Instance de client MinIO connectée.
-    """
-    MINIO_URL = MINIO_URL or os.environ.get("MINIO_API", "localhost:9000")
-    ACCESS_KEY = ACCESS_KEY or os.environ.get("MINIO_ROOT_USER", "minioadmin")
-    SECRET_KEY = SECRET_KEY or os.environ.get("MINIO_ROOT_PASSWORD", "minioadmin")
-
-    if not MINIO_URL or not ACCESS_KEY or not SECRET_KEY:
-        raise ValueError("Les variables d'environnement MINIO_API, MINIO_ROOT_USER et MINIO_ROOT_PASSWORD doivent être définies")
+from monitoring import MINIO_BYTES
+from storage import get_client, make_buckets
+from storage.codec import base_key, loads_records, read_object, upload_file
 
-    return Minio(MINIO_URL, access_key=ACCESS_KEY, secret_key=SECRET_KEY, secure=False)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def make_buckets(bucket_list: list = ["webscraping", "traitement"]):
-    """
-    Crée les buckets MinIO s'ils n'existent pas déjà.
-    
-    Args:
-        bucket_list (list): Liste des noms de buckets à créer.
+def save_to_minio(file_path, bucket_name="webscraping", codec=None):
     """
-    client = start_client()
-    for bucket_name in bucket_list:
-        if not client.bucket_exists(bucket_name):
-            client.make_bucket(bucket_name)
-            logging.info(f"Bucket '{bucket_name}' créé.")
-        else:
-            logging.info(f"Bucket '{bucket_name}' déjà existant.")
-
-def save_to_minio(file_path, bucket_name="webscraping", content_type="application/json"):
-    """
-    Sauvegarde un fichier local dans un bucket MinIO.
+    Sauvegarde un fichier local dans un bucket MinIO, compressé.
 
     Args:
         file_path (str): Chemin du fichier local.
         bucket_name (str): Nom du bucket cible.
-        content_type (str): Type MIME du fichier.
+        codec (str, optional): Encodage de l'objet (zstd, gzip), par défaut
+            STORAGE_CODEC (voir storage.codec).
     """
     try:
-        client = start_client()
+        client = get_client()
         object_name = os.path.basename(file_path)
-        client.fput_object(bucket_name, object_name, file_path, content_type)
+        object_name, size = upload_file(client, bucket_name, object_name, file_path, codec=codec)
+        MINIO_BYTES.labels(bucket_name, "out").inc(size)
         logging.info(f"✅ Uploaded the file : {object_name}")
     except S3Error as err:
         logging.error(f"❌ Erreur : {object_name} → {err}")
@@ -62,7 +37,7 @@ def read_from_minio(file_path, object_name, bucket_name="webscraping"):
         str: Chemin du fichier local téléchargé.
     """
     try:
-        client = start_client()
+        client = get_client()
         client.fget_object(bucket_name, object_name, file_path)
         return file_path
     except Exception as e:
@@ -77,7 +52,7 @@ def read_all_from_bucket(bucket_name="traitement"):
         list: Toutes les données JSON combinées.
     """
     try:
-        client = start_client()
+        client = get_client()
         all_data = []
         objects = client.list_objects(bucket_name, recursive=True)
 
@@ -87,21 +62,14 @@ def read_all_from_bucket(bucket_name="traitement"):
                 logging.warning("Objet sans nom détecté, ignoré.")
                 continue
 
-            response = client.get_object(bucket_name, object_name)
-            data_bytes = response.read()
-            response.close()
-            response.release_conn()
+            data_bytes, encoding = read_object(client, bucket_name, object_name)
 
             if not data_bytes:
                 logging.warning(f"Objet {object_name} vide, ignoré.")
                 continue
 
             try:
-                data = json.loads(data_bytes.decode("utf-8"))
-                if isinstance(data, list):
-                    all_data.extend(data)
-                else:
-                    all_data.append(data)
+                all_data.extend(loads_records(data_bytes, object_name, encoding))
             except json.JSONDecodeError as jde:
                 logging.warning(f"Erreur JSON dans {object_name}: {jde}")
 
@@ -130,8 +98,9 @@ def scraping_upload(scraping_dir="/app/data_extraction/scraping_output"):
 
 def read_all_from_bucket_memory(bucket_name: str = "webscraping") -> list:
     """
-    Récupère tous les fichiers JSON du bucket MinIO en mémoire,
-    parse leur contenu et retourne une liste contenant toutes les offres.
+    Récupère tous les fichiers JSON et JSON Lines (.jsonl, une offre par ligne)
+    du bucket MinIO en mémoire, parse leur contenu et retourne une liste
+    contenant toutes les offres.
 
     Args:
         bucket_name (str): Nom du bucket MinIO à lire.
@@ -140,7 +109,7 @@ def read_all_from_bucket_memory(bucket_name: str = "webscraping") -> list:
         list: Liste des objets JSON extraits de tous les fichiers du bucket.
     """
     try:
-        client = start_client()
+        client = get_client()
     except Exception as e:
         logging.error(f"❌ Échec de la connexion MinIO : {e}")
         return []
@@ -157,24 +126,19 @@ def read_all_from_bucket_memory(bucket_name: str = "webscraping") -> list:
                 logging.warning("⚠️ Objet sans nom détecté, ignoré.")
                 continue
 
-            if not object_name.endswith(".json"):
+            if not base_key(object_name).endswith((".json", ".jsonl")):
                 logging.info(f"📦 Fichier ignoré (non JSON) : {object_name}")
                 continue
 
             found = True
             try:
-                response = client.get_object(bucket_name, object_name)
-                content = response.read()
-                response.close()
-                response.release_conn()
-
-                data = json.loads(content.decode("utf-8"))
-                if isinstance(data, list):
-                    all_data.extend(data)
-                    logging.info(f"✅ {len(data)} offres extraites de {object_name}")
-                else:
-                    all_data.append(data)
-                    logging.info(f"✅ 1 offre extraite de {object_name}")
+                content, encoding = read_object(client, bucket_name, object_name)
+                MINIO_BYTES.labels(bucket_name, "in").inc(len(content))
+
+                # JSON ou JSON Lines, décompressé selon l'encodage de l'objet (.zst, .gz)
+                data = loads_records(content, object_name, encoding)
+                all_data.extend(data)
+                logging.info(f"✅ {len(data)} offres extraites de {object_name}")
 
             except json.JSONDecodeError:
                 logging.error(f"❌ Fichier {object_name} n'est pas un JSON valide.")
@@ -234,6 +198,11 @@ def read_and_normalize_all_offers(bucket_name="webscraping") -> list:
         list: Liste des offres normalisées.
     """
     raw_offers = read_all_from_bucket_memory(bucket_name)
+    # Doublons d'une offre publiée sur un autre site : seule la copie canonique est enrichie
+    raw_offers = [
+        offer for offer in raw_offers
+        if offer.get("canonical_id") in (None, offer.get("job_url"))
+    ]
     normalized_offers = [normalize_offer(offer) for offer in raw_offers]
     logging.info(f"✅ Normalisé {len(normalized_offers)} offres.")
     return normalized_offers
@@ -0,0 +1,172 @@
+"""Métriques Prometheus des scrapers et des étapes du pipeline.
+
+Les compteurs et histogrammes sont enregistrés dans un registre propre au processus
+(REGISTRY). Le worker Celery et les conteneurs éphémères (scrapers, NER skillner,
+Spark, enrichissement)
+ne vivent pas assez longtemps pour être interrogés par Prometheus : ils envoient leurs
+métriques à la Pushgateway (push_metrics), que Prometheus interroge (prometheus.yml).
+Chaque processus pousse sous sa propre instance (hôte-pid) : les processus parallèles
+du runner ne s'écrasent pas.
+
+Comparer scraper_stage_seconds et pipeline_task_seconds d'une exécution à l'autre
+indique l'étape la plus lente.
+
+Variables d'environnement :
+    PUSHGATEWAY_URL: Adresse de la Pushgateway (ex. pushgateway:9091) ; sans elle,
+        les métriques ne sont pas envoyées.
+"""
+
+import logging
+import os
+import socket
+
+try:
+    from prometheus_client import (
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        push_to_gateway,
+    )
+except ImportError:  # Dépendance optionnelle : métriques sans effet
+    CollectorRegistry = None
+
+# Bornes des histogrammes de durées courtes (sélecteurs, analyse) et longues (pages, LLM)
+FAST_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TASK_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+class _NoopMetric:
+    """Métrique sans effet, quand prometheus_client n'est pas installé."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+    def set(self, value):
+        pass
+
+
+if CollectorRegistry is not None:
+    REGISTRY = CollectorRegistry()
+
+    def _counter(name, documentation, labels):
+        return Counter(name, documentation, labels, registry=REGISTRY)
+
+    def _histogram(name, documentation, labels, buckets):
+        return Histogram(
+            name, documentation, labels, buckets=buckets, registry=REGISTRY
+        )
+
+    def _gauge(name, documentation, labels):
+        return Gauge(name, documentation, labels, registry=REGISTRY)
+
+else:
+    REGISTRY = None
+
+    def _counter(name, documentation, labels):
+        return _NoopMetric()
+
+    def _histogram(name, documentation, labels, buckets):
+        return _NoopMetric()
+
+    def _gauge(name, documentation, labels):
+        return _NoopMetric()
+
+
+# --- Scrapers ---
+PAGES_FETCHED = _counter(
+    "scraper_pages_fetched_total", "Pages chargées par les scrapers", ["site", "mode"]
+)
+PAGE_LOAD_SECONDS = _histogram(
+    "scraper_page_load_seconds",
+    "Durée de chargement d'une page (HTTP ou Selenium)",
+    ["site", "mode"],
+    SLOW_BUCKETS,
+)
+OFFERS_EXTRACTED = _counter(
+    "scraper_offers_extracted_total", "Nouvelles offres extraites", ["site"]
+)
+DUPLICATES = _counter(
+    "scraper_duplicates_total",
+    "Offres déjà connues (url : ignorées, near : copies d'une offre d'un autre site)",
+    ["site", "kind"],
+)
+VALIDATION_FAILURES = _counter(
+    "scraper_validation_failures_total",
+    "Offres non conformes au schéma Job_schema.json",
+    ["site"],
+)
+SELECTOR_SECONDS = _histogram(
+    "scraper_selector_lookup_seconds",
+    "Durée de recherche d'un sélecteur Selenium",
+    ["selector"],
+    FAST_BUCKETS,
+)
+STAGE_SECONDS = _histogram(
+    "scraper_stage_seconds",
+    "Durée des étapes de scraping (navigation, parsing, validation, dedup, save)",
+    ["stage"],
+    FAST_BUCKETS + (10, 30),
+)
+
+# --- Pipeline ---
+PIPELINE_TASK_SECONDS = _histogram(
+    "pipeline_task_seconds",
+    "Durée des tâches Celery du pipeline",
+    ["task"],
+    TASK_BUCKETS,
+)
+MINIO_BYTES = _counter(
+    "minio_bytes_total",
+    "Octets échangés avec MinIO (in : téléchargés, out : envoyés)",
+    ["bucket", "direction"],
+)
+LLM_CALL_SECONDS = _histogram(
+    "llm_call_seconds", "Durée des appels au LLM", ["model"], SLOW_BUCKETS
+)
+LLM_TOKENS = _counter(
+    "llm_tokens_total", "Jetons consommés par le LLM", ["model", "kind"]
+)
+POSTGRES_ROWS = _counter(
+    "postgres_rows_total", "Offres chargées dans PostgreSQL", ["status"]
+)
+POSTGRES_ROWS_PER_SECOND = _gauge(
+    "postgres_rows_per_second", "Débit du dernier chargement PostgreSQL", ["loader"]
+)
+
+
+def instance_name():
+    """Instance sous laquelle le processus pousse ses métriques (hôte-pid)."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def push_metrics(job, logger=logging):
+    """Envoie toutes les métriques du processus à la Pushgateway.
+
+    Sans PUSHGATEWAY_URL ou sans prometheus_client, rien n'est envoyé. Une
+    Pushgateway injoignable est signalée sans interrompre l'appelant.
+
+    Args:
+        job (str): Nom du job Prometheus (ex. "scrapers", "celery").
+    """
+    gateway = os.environ.get("PUSHGATEWAY_URL")
+    if not gateway or REGISTRY is None:
+        return False
+    try:
+        push_to_gateway(
+            gateway,
+            job=job,
+            registry=REGISTRY,
+            grouping_key={"instance": instance_name()},
+        )
+        return True
+    except Exception as e:
+        logger.warning(f"Envoi des métriques à {gateway} impossible : {e}")
+        return False
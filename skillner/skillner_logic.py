@@ -3,7 +3,9 @@ import os
 
 import spacy
 from spacy.matcher import PhraseMatcher
-from utils import make_buckets, read_all_from_bucket, save_to_minio
+from utils import load_job_offers, make_buckets, read_all_from_bucket, save_to_minio
+
+from monitoring import push_metrics
 
 # load default skills data base
 from skillNer.general_params import SKILL_DB
@@ -20,7 +22,7 @@ def annotate_text(filename) -> list:
     Parameters
     ----------
     filename:
-      the name of the json file to extract text from and then annotate
+      the name of the json or jsonl file to extract text from and then annotate
     """
     # init params of skill extractor
     nlp = spacy.load("en_core_web_lg")
@@ -28,13 +30,7 @@ def annotate_text(filename) -> list:
     # init skill extractor
     skill_extractor = SkillExtractor(nlp, SKILL_DB, PhraseMatcher)
 
-    job_offers = json.load(
-        open(
-            file_path,
-            "r",
-            encoding="utf-8",
-        )
-    )
+    job_offers = load_job_offers(file_path)
 
     annotations = []
 
@@ -86,11 +82,10 @@ def extract_skills(filename) -> list:
     Parameters
     ---------
     filename:
-        The name of the json file
+        The name of the json or jsonl file
     """
     #  Reading the initial file
-    with open(filename, "r", encoding="utf-8") as f:
-        original_data = json.load(f)
+    original_data = load_job_offers(filename)
 
     # annotate the text
     annotations = annotate_text(filename=filename)
@@ -115,25 +110,35 @@ def extract_skills(filename) -> list:
         merged_data.append(original_entry)
 
     # Save the merged output to a file
-    ner_filename = os.path.join("data", ("NER_" + os.path.basename(filename)))
+    # The NER output is always compact JSON Lines, whatever the input format, and
+    # gzip-compressed: Spark reads the ner bucket through s3a, which only decodes gzip
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    ner_filename = os.path.join("data", "NER_" + base_name + ".jsonl")
     with open(ner_filename, "w", encoding="utf-8") as js_file:
-        json.dump(merged_data, js_file, ensure_ascii=False, indent=4)
+        for offer in merged_data:
+            js_file.write(json.dumps(offer, ensure_ascii=False) + "\n")
 
-    save_to_minio(file_path=ner_filename, bucket_name="ner")
+    save_to_minio(file_path=ner_filename, bucket_name="ner", codec="gzip")
     os.remove(ner_filename)
 
     return merged_data
 
 
-def skillner_extract_and_upload(json_folder="data"):
+def skillner_extract_and_upload(json_folder="data", source=None, keys=None):
     json_path = os.path.join(os.getcwd(), json_folder)
     filenames = os.listdir(json_path)
+    # Per-source pipeline: only the files of this source are processed
+    if source:
+        filenames = [filename for filename in filenames if source in filename]
+    # Upload manifest: only the objects uploaded by this run are processed
+    if keys is not None:
+        filenames = [filename for filename in filenames if filename in keys]
     print(f"Preparing current files for skill extraction: {filenames}")
     try:
         for filename in filenames:
-            # Checking if the file has the json extension
+            # Checking if the file has the json or jsonl extension
             ext = os.path.splitext(filename)[-1]
-            if ext == ".json":
+            if ext in (".json", ".jsonl"):
                 print(f"Extracting skills from: {filename}")
                 extract_skills(os.path.join(json_path, filename))
             else:
@@ -143,6 +148,11 @@ def skillner_extract_and_upload(json_folder="data"):
 
 
 def main():
+    # Set by the per-source pipelines (e.g. "offres_emploi_bayt"), empty for all files
+    source = os.getenv("SOURCE") or None
+    # Object keys from the upload manifest, empty for every object of the bucket
+    object_keys = os.getenv("OBJECT_KEYS")
+    keys = object_keys.split(",") if object_keys else None
     try:
         print("-------------Starting the Ner with skillner-------------")
         # getting a list of all directories to check existence of data folder
@@ -167,19 +177,22 @@ def main():
         # Reading the data from the bucket
         try:
             print("Reading the json files present in the ner bucket")
-            read_all_from_bucket(dest_dir="data")
+            read_all_from_bucket(dest_dir="data", source=source, keys=keys)
             print("Success reading the json files")
         except Exception as e:
             print(f"Exception during json files reading :{e}")
         # Using skillner for ner to extract skills from the json files
         try:
             print("Extracting the skills from the json files")
-            skillner_extract_and_upload(json_folder="data")
+            skillner_extract_and_upload(json_folder="data", source=source, keys=keys)
         except Exception as e:
             print(f"Exception during extraction of skills :{e}")
         print("-------------All steps were succesfull. End of program-------------")
     except Exception as e:
         print(f"Error during program: {e}")
+    finally:
+        # Short-lived container: metrics are pushed to the Pushgateway before exiting
+        push_metrics("skillner")
 
 
 if __name__ == "__main__":
@@ -1,45 +1,23 @@
+import json
 import os
 
-from minio import Minio, S3Error
+from minio import S3Error
 from minio.datatypes import Object
 
+from monitoring import MINIO_BYTES
+from storage import get_client, make_buckets
+from storage.codec import base_key, download_file, upload_file
 
-def start_client(
-    MINIO_URL=os.environ.get("MINIO_API"),
-    ACCESS_KEY=os.environ.get("MINIO_ROOT_USER"),
-    SECRET_KEY=os.environ.get("MINIO_ROOT_PASSWORD"),
-) -> Minio:
-    """This function simply connects to the minio server and returns a client instance.
 
-    It is supposed to be used in other modules to create and maintain connections to the Object sotrage server
-    """
-
-    # --- Connexion à MinIO ---
-    client = Minio(
-        MINIO_URL, access_key=ACCESS_KEY, secret_key=SECRET_KEY, secure=False
-    )
-    return client
-
-
-def make_buckets(bucket_list: list = ["webscraping", "traitement"]):
-    client = start_client()
-    for bucket_name in bucket_list:
-        if not client.bucket_exists(bucket_name):
-            client.make_bucket(bucket_name)
-            print(f"Bucket '{bucket_name}' créé.")
-        else:
-            print(f"Bucket '{bucket_name}' déjà existant.")
-
-
-def save_to_minio(
-    file_path,
-    bucket_name="webscraping",
-    content_type="application/json",
-):
+def save_to_minio(file_path, bucket_name="webscraping", codec=None):
+    """Uploads a file compressed with codec (STORAGE_CODEC by default, see storage.codec)."""
     try:
-        client = start_client()
+        client = get_client()
         object_name = os.path.basename(file_path)
-        client.fput_object(bucket_name, object_name, file_path, content_type)
+        object_name, size = upload_file(
+            client, bucket_name, object_name, file_path, codec=codec
+        )
+        MINIO_BYTES.labels(bucket_name, "out").inc(size)
         print(f" Uploaded the file : {object_name}")
     except S3Error as err:
         print(f" Erreur : {object_name} → {err}")
@@ -47,8 +25,9 @@ def save_to_minio(
 
 def read_from_minio(file_path, object_name, bucket_name="webscraping"):
     try:
-        client = start_client()
+        client = get_client()
         json_file = client.fget_object(bucket_name, object_name, file_path)
+        MINIO_BYTES.labels(bucket_name, "in").inc(os.path.getsize(file_path))
         return json_file
     except Exception as e:
         print(f"Can't download object from object storage: {e}")
@@ -57,18 +36,31 @@ def read_from_minio(file_path, object_name, bucket_name="webscraping"):
 def read_all_from_bucket(
     dest_dir="data_extraction/scraping_output",
     bucket_name="webscraping",
+    source=None,
+    keys=None,
 ) -> list[Object]:
-    """Downloads all the objects found in the specified bucket to the destination folder for this function"""
+    """Downloads all the objects found in the specified bucket to the destination folder for this function
+
+    If source is given, only the objects whose name contains it are downloaded.
+    If keys is given (upload manifest), only these objects are downloaded. Compressed
+    objects are decompressed and saved without their encoding extension
+    (offres.jsonl.zst -> offres.jsonl).
+    """
     try:
-        client = start_client()
+        client = get_client()
     except Exception as e:
         print(f"Couldn't start client connection to Minio: {e}")
     try:
         file_names = client.list_objects(bucket_name=bucket_name)
         for file_name in file_names:
-            file_path = os.path.join(dest_dir, file_name.object_name)
-
-            client.fget_object(bucket_name, file_name.object_name, file_path)
+            if source and source not in file_name.object_name:
+                continue
+            if keys is not None and base_key(file_name.object_name) not in keys:
+                continue
+            file_path = download_file(
+                client, bucket_name, file_name.object_name, dest_dir
+            )
+            MINIO_BYTES.labels(bucket_name, "in").inc(file_name.size or 0)
             print(f"----Saved file: {file_name.object_name} to path: {file_path}----")
         return file_names
     except Exception as e:
@@ -85,6 +77,10 @@ def scraping_upload(scraping_dir="/app/data_extraction/scraping_output"):
 
         for file in scraping_files:
             file_path = os.path.join(scraping_dir, file)
+            # Fichiers temporaires (compactage en cours) ignorés
+            if not os.path.isfile(file_path) or file.endswith((".tmp", ".lock")):
+                continue
+            # Type MIME déduit de l'extension par storage.codec.content_type_for
             save_to_minio(file_path=file_path)
 
     except Exception as e:
@@ -94,23 +90,49 @@ def scraping_upload(scraping_dir="/app/data_extraction/scraping_output"):
 def list_valid_json_objects(bucket_name):
     """
     Retourne les chemins valides des objets JSON présents dans le bucket MinIO 'webscraping'.
-    Seuls les fichiers .json dont la taille > 10 octets sont conservés.
+    Seuls les fichiers .json et .jsonl dont la taille > 10 octets sont conservés.
     """
-    client = Minio(
-        os.getenv("MINIO_API"),
-        access_key=os.getenv("MINIO_ROOT_USER"),
-        secret_key=os.getenv("MINIO_ROOT_PASSWORD"),
-        secure=False,
-    )
+    client = get_client()
     objects = client.list_objects(bucket_name, recursive=True)
     valid_paths = [
         f"s3a://webscraping/{obj.object_name}"
         for obj in objects
-        if obj.object_name.endswith(".json") and obj.size > 10
+        if obj.object_name.endswith((".json", ".jsonl")) and obj.size > 10
     ]
     return valid_paths
 
 
+def is_canonical(offer) -> bool:
+    """Checks if an offer is the canonical copy of its near-duplicate cluster.
+
+    Offers without canonical_id (collected before near-duplicate detection) are canonical.
+    """
+    return offer.get("canonical_id") in (None, offer.get("job_url"))
+
+
+def load_job_offers(file_path) -> list:
+    """Loads the canonical job offers of a .json file (array) or a .jsonl file (one offer per line).
+
+    JSON Lines files are read line by line, invalid lines are skipped. Near-duplicates
+    of an offer from another source or URL (canonical_id set to another job_url) are
+    skipped, so only the canonical copy is annotated.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        if not file_path.endswith(".jsonl"):
+            job_offers = json.load(f)
+        else:
+            job_offers = []
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    job_offers.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"Skipping invalid JSON line in {file_path}")
+    return [offer for offer in job_offers if is_canonical(offer)]
+
+
 def read_all_json_from_minio():
     """
     Lit et fusionne tous les fichiers JSON valides depuis MinIO dans un DataFrame PySpark.
@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import os
-import json
 from io import BytesIO
 from datetime import datetime, timedelta
 from minio import Minio
 import pg8000
 
+from storage.codec import ENCODING_METADATA, loads_records
+
 DEFAULT_DATE = datetime(2000, 1, 1).date()
 
 DB_CONFIG = {
@@ -134,12 +135,10 @@ def populate_calendar(cur, offers):
         )
 
 
-def read_json(obj):
-    content = obj.read().decode("utf-8")
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        return json.loads("[" + content.strip().replace("}\n{", "},\n{") + "]")
+def read_json(obj, object_name=""):
+    # Tableau JSON ou JSON Lines, compressé ou non (storage.codec)
+    encoding = obj.headers.get(f"x-amz-meta-{ENCODING_METADATA}")
+    return loads_records(obj.read(), object_name, encoding)
 
 
 def insert_data():
@@ -150,7 +149,7 @@ def insert_data():
     for obj in MINIO_CLIENT.list_objects(bucket, recursive=True):
         print(f"📂 Traitement du fichier : {obj.object_name}")
         data = MINIO_CLIENT.get_object(bucket, obj.object_name)
-        offers = read_json(data)
+        offers = read_json(data, obj.object_name)
         if not isinstance(offers, list):
             continue
 
@@ -3,11 +3,14 @@ import os
 import uuid
 from datetime import datetime
 
-from minio import Minio
 from pyspark.sql import DataFrame, Row, SparkSession
 from pyspark.sql.functions import col, split, trim, udf
 from pyspark.sql.types import ArrayType, StringType, StructField, StructType
 
+from monitoring import MINIO_BYTES, push_metrics
+from storage import get_client
+from storage.codec import upload_file
+
 # -----------------------------------------------------------------------------------
 # INITIALISATION
 # -----------------------------------------------------------------------------------
@@ -24,6 +27,7 @@ global_schema = StructType(
         StructField("secteur", StringType(), True),
         StructField("niveau_etudes", StringType(), True),
         StructField("niveau_experience", StringType(), True),
+        StructField("canonical_id", StringType(), True),
         StructField(
             "skills",
             StructType(
@@ -72,32 +76,35 @@ def configure_minio(spark: SparkSession):
 # -----------------------------------------------------------------------------------
 
 
-def list_valid_json_objects():
+def list_valid_json_objects(source=None):
     """
     Retourne les chemins valides des objets JSON présents dans le bucket MinIO 'ner'.
-    Seuls les fichiers .json dont la taille > 10 octets sont conservés.
+    Seuls les fichiers .json (tableau) et .jsonl.gz (JSON Lines compressé en gzip,
+    décompressé par s3a) dont la taille > 10 octets sont conservés, et si source
+    est donnée, seuls ceux dont le nom la contient (pipeline par source).
     """
-    client = Minio(
-        os.getenv("MINIO_API"),
-        access_key=os.getenv("MINIO_ROOT_USER"),
-        secret_key=os.getenv("MINIO_ROOT_PASSWORD"),
-        secure=False,
-    )
+    client = get_client()
     objects = client.list_objects("ner", recursive=True)
-    valid_paths = [
-        f"s3a://ner/{obj.object_name}"
+    valid_objects = [
+        obj
         for obj in objects
-        if obj.object_name.endswith(".json") and obj.size > 10
+        if obj.object_name.endswith((".json", ".jsonl", ".jsonl.gz"))
+        and obj.size > 10
+        and (not source or source in obj.object_name)
     ]
-    return valid_paths
+    # Octets lus ensuite par Spark via s3a
+    MINIO_BYTES.labels("ner", "in").inc(sum(obj.size for obj in valid_objects))
+    return [f"s3a://ner/{obj.object_name}" for obj in valid_objects]
 
 
-def read_all_json_from_minio(spark: SparkSession, schema: StructType = global_schema):
+def read_all_json_from_minio(
+    spark: SparkSession, schema: StructType = global_schema, source=None
+):
     """
     Lit et fusionne tous les fichiers JSON valides depuis MinIO dans un DataFrame PySpark.
     """
     print("📥 Lecture filtrée des fichiers JSON valides depuis MinIO...")
-    valid_files = list_valid_json_objects()
+    valid_files = list_valid_json_objects(source)
 
     if not valid_files:
         print("⚠️ Aucun fichier JSON valide trouvé dans le bucket.")
@@ -107,7 +114,15 @@ def read_all_json_from_minio(spark: SparkSession, schema: StructType = global_sc
     for path in valid_files:
         print(f"   → {path}")
 
-    df = spark.read.schema(global_schema).option("multiLine", True).json(valid_files)
+    # Tableaux JSON (anciennes sorties) sur plusieurs lignes, JSON Lines ligne par ligne
+    array_files = [path for path in valid_files if path.endswith(".json")]
+    line_files = [path for path in valid_files if not path.endswith(".json")]
+    df = None
+    if array_files:
+        df = spark.read.schema(schema).option("multiLine", True).json(array_files)
+    if line_files:
+        df_lines = spark.read.schema(schema).json(line_files)
+        df = df_lines if df is None else df.unionByName(df_lines)
 
     return df
 
@@ -186,6 +201,7 @@ def clean_data(df: DataFrame):
     - Applique le split sur les champs multiples (compétences, secteurs, etc.)
     - Nettoie les types (dates, string)
     - Supprime les doublons selon `job_url`
+    - Ne garde que la copie canonique des offres quasi identiques (`canonical_id`)
     """
     print("🧼 Nettoyage des données...")
     print(f"Les colonnes detectées sont: {df.columns}")
@@ -194,6 +210,11 @@ def clean_data(df: DataFrame):
     for field in required:
         df = df.filter(col(field).isNotNull() & (col(field) != ""))
 
+    # Copies d'une même offre publiée sur plusieurs sites : seule la canonique est gardée
+    df = df.filter(
+        col("canonical_id").isNull() | (col("canonical_id") == col("job_url"))
+    ).drop("canonical_id")
+
     # Renommage et nettoyage
     df = (
         df.dropDuplicates(["job_url"])
@@ -238,20 +259,23 @@ def clean_data(df: DataFrame):
 # -----------------------------------------------------------------------------------
 
 
-def generate_output_filename():
+def generate_output_filename(source=None):
     """
     Génère un nom de fichier unique basé sur la date et un UUID.
-    Exemple : processed_jobs_20250619_ab12cd34.json
+    Exemple : processed_jobs_20250619_ab12cd34.jsonl
+    Avec une source : processed_jobs_offres_emploi_bayt_20250619_ab12cd34.jsonl
     """
     file_id = str(uuid.uuid4())[:8]
     today = datetime.now().strftime("%d_%m_%Y")
+    prefix = f"processed_jobs_{source}" if source else "processed_jobs"
 
-    return f"processed_jobs_{today}_{file_id}.json"
+    return f"{prefix}_{today}_{file_id}.jsonl"
 
 
 def save_locally(df: DataFrame, path="/tmp"):
     """
-    Sauvegarde le DataFrame nettoyé localement dans un fichier JSON unique (liste d'objets).
+    Sauvegarde le DataFrame nettoyé localement dans un fichier JSON Lines unique
+    (une offre par ligne, compact).
     """
     print(f"💾 Sauvegarde locale dans {path}")
 
@@ -262,9 +286,10 @@ def save_locally(df: DataFrame, path="/tmp"):
 
     # S'assurer que le dossier parent existe
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    # Sauvegarde dans un fichier JSON unique
-    with open(os.path.join(path, "cleaned_output.json"), "w", encoding="utf-8") as f:
-        json.dump(parsed_data, f, ensure_ascii=False, indent=2)
+    # Sauvegarde dans un fichier JSON Lines unique
+    with open(os.path.join(path, "cleaned_output.jsonl"), "w", encoding="utf-8") as f:
+        for row in parsed_data:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
 
     return path
 
@@ -280,15 +305,15 @@ def save_locally_2(df: DataFrame, path="/tmp/cleaned_output"):
 
 def find_json_in_folder(folder):
     """
-    Cherche le premier fichier .json dans un dossier donné.
-    Retourne None si le chemin n'est pas un dossier ou si aucun fichier .json n'est trouvé.
+    Cherche le premier fichier .json ou .jsonl dans un dossier donné.
+    Retourne None si le chemin n'est pas un dossier ou si aucun fichier JSON n'est trouvé.
     """
     if not os.path.isdir(folder):
         print(f"❌ Le chemin fourni n'est pas un dossier valide : {folder}")
         return None
 
     for f in os.listdir(folder):
-        if f.endswith(".json"):
+        if f.endswith((".json", ".jsonl")):
             return os.path.join(folder, f)
 
     print(f"⚠️ Aucun fichier JSON trouvé dans : {folder}")
@@ -297,19 +322,16 @@ def find_json_in_folder(folder):
 
 def upload_to_minio(local_path, filename, bucket="traitement"):
     """
-    Upload le fichier JSON local vers le bucket MinIO spécifié.
+    Upload le fichier JSON local vers le bucket MinIO spécifié, compressé
+    (STORAGE_CODEC, voir storage.codec).
     """
     print("📤 Upload vers MinIO...")
-    client = Minio(
-        os.getenv("MINIO_API"),
-        access_key=os.getenv("MINIO_ROOT_USER"),
-        secret_key=os.getenv("MINIO_ROOT_PASSWORD"),
-        secure=False,
-    )
+    client = get_client()
     json_file = find_json_in_folder(local_path)
     if json_file:
-        client.fput_object(bucket, filename, json_file, content_type="application/json")
-        print(f"🚀 Upload terminé : {bucket}/{filename}")
+        object_name, size = upload_file(client, bucket, filename, json_file)
+        MINIO_BYTES.labels(bucket, "out").inc(size)
+        print(f"🚀 Upload terminé : {bucket}/{object_name} ({size} octets)")
     else:
         print("❌ Aucun fichier JSON à uploader.")
 
@@ -329,17 +351,19 @@ def main():
     5. Upload vers MinIO
     """
     print("🚀 DÉMARRAGE DU SCRIPT SPARK")
+    # Pipeline par source : seuls les fichiers de cette source sont traités
+    source = os.getenv("SOURCE") or None
     try:
         spark = create_spark_session()
         configure_minio(spark)
 
-        df_raw = read_all_json_from_minio(spark)
+        df_raw = read_all_json_from_minio(spark, source=source)
         if df_raw is None or df_raw.count() == 0:
             print("🛑 Fin du script : aucun fichier JSON à traiter.")
             return
 
         df_cleaned = clean_data(df_raw)
-        filename = generate_output_filename()
+        filename = generate_output_filename(source)
         local_path = "/tmp"
 
         save_locally(df_cleaned, local_path)
@@ -351,6 +375,8 @@ def main():
     finally:
         if spark:
             spark.stop()
+        # Conteneur éphémère : les métriques sont poussées à la Pushgateway avant de quitter
+        push_metrics("spark")
 
 
 if __name__ == "__main__":
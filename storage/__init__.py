@@ -0,0 +1,229 @@
+"""Client MinIO partagé par tous les modules du projet.
+
+Un seul client par processus (get_client), adossé à un pool de connexions urllib3 :
+les envois et lectures successifs réutilisent les connexions ouvertes au lieu d'en
+créer un nouveau pool à chaque appel. Le pool borne le nombre de connexions
+simultanées, garde les connexions actives (keep-alive TCP) et rejoue les requêtes
+en échec réseau ou en erreur 5xx. Après un fork (runner, ProcessPoolExecutor), le
+processus enfant crée son propre client : les sockets du parent ne sont pas partagés.
+
+make_buckets ne vérifie chaque bucket qu'une fois par processus. bulk_upload envoie
+un lot de fichiers en parallèle en sautant ceux dont le contenu est déjà dans le bucket.
+Les objets sont compressés (zstd ou gzip) par la couche codec (storage.codec).
+
+Variables d'environnement :
+    MINIO_API: Adresse du serveur (défaut localhost:9000).
+    MINIO_ROOT_USER / MINIO_ROOT_PASSWORD: Identifiants (défaut minioadmin).
+    MINIO_MAX_CONNECTIONS: Connexions simultanées par processus (défaut 16).
+    MINIO_RETRIES: Nouvelles tentatives d'une requête en échec (défaut 5).
+    MINIO_TIMEOUT: Délai de lecture d'une réponse en secondes (défaut 300).
+    MINIO_UPLOAD_THREADS: Envois simultanés de bulk_upload (défaut 8).
+    MINIO_PART_SIZE: Taille des parties en Mo ; un fichier plus gros est envoyé en
+        plusieurs parties, en parallèle (défaut 8, minimum 5).
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+from minio import Minio, S3Error
+
+from storage.codec import default_codec, encoded_key, upload_file
+
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_RETRIES = 5
+DEFAULT_TIMEOUT = 300
+CONNECT_TIMEOUT = 10
+DEFAULT_BUCKETS = ("webscraping", "traitement")
+DEFAULT_UPLOAD_THREADS = 8
+DEFAULT_PART_SIZE_MB = 8
+MIN_PART_SIZE_MB = 5
+PART_UPLOAD_THREADS = 3
+CHUNK_SIZE = 1024 * 1024
+# Empreinte du contenu, enregistrée dans les métadonnées de l'objet
+SHA256_METADATA = "sha256"
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+# Buckets dont l'existence a été vérifiée par ce processus
+_buckets = set()
+
+
+def http_client():
+    """Pool de connexions urllib3 réglé pour MinIO."""
+    max_connections = int(
+        os.environ.get("MINIO_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+    )
+    retries = urllib3.Retry(
+        total=int(os.environ.get("MINIO_RETRIES", DEFAULT_RETRIES)),
+        backoff_factor=0.2,
+        status_forcelist=(500, 502, 503, 504),
+    )
+    timeout = urllib3.Timeout(
+        connect=CONNECT_TIMEOUT,
+        read=float(os.environ.get("MINIO_TIMEOUT", DEFAULT_TIMEOUT)),
+    )
+    socket_options = urllib3.connection.HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    ]
+    # block=True : au-delà de max_connections, les threads attendent une connexion
+    # libre au lieu d'en ouvrir de nouvelles aussitôt refermées
+    return urllib3.PoolManager(
+        maxsize=max_connections,
+        block=True,
+        retries=retries,
+        timeout=timeout,
+        socket_options=socket_options,
+    )
+
+
+def get_client() -> Minio:
+    """Retourne le client MinIO du processus, créé au premier appel."""
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = Minio(
+                os.environ.get("MINIO_API", "localhost:9000"),
+                access_key=os.environ.get("MINIO_ROOT_USER", "minioadmin"),
+                secret_key=os.environ.get("MINIO_ROOT_PASSWORD", "minioadmin"),
+                secure=False,
+                http_client=http_client(),
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def make_buckets(bucket_list=DEFAULT_BUCKETS):
+    """Crée les buckets absents ; chaque bucket n'est vérifié qu'une fois par processus.
+
+    Args:
+        bucket_list (iterable): Noms des buckets.
+    """
+    client = get_client()
+    for bucket_name in bucket_list:
+        if bucket_name in _buckets:
+            continue
+        if client.bucket_exists(bucket_name):
+            logging.info(f"Bucket '{bucket_name}' déjà existant.")
+        else:
+            try:
+                client.make_bucket(bucket_name)
+                logging.info(f"Bucket '{bucket_name}' créé.")
+            except S3Error as e:
+                # Créé entre-temps par un autre processus
+                if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                    raise
+        with _lock:
+            _buckets.add(bucket_name)
+
+
+def file_digests(path):
+    """Empreintes SHA-256 et MD5 d'un fichier, lues en une passe."""
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256.hexdigest(), md5.hexdigest()
+
+
+def object_is_current(client, bucket, key, sha256, md5):
+    """Indique si l'objet du bucket a déjà le contenu d'un fichier local.
+
+    L'empreinte SHA-256 des métadonnées (objets envoyés par bulk_upload) est comparée
+    en priorité ; à défaut, l'ETag d'un objet envoyé en une partie (son MD5).
+    """
+    try:
+        stat = client.stat_object(bucket, key)
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return False
+        raise
+    stored = (stat.metadata or {}).get(f"x-amz-meta-{SHA256_METADATA}")
+    if stored:
+        return stored == sha256
+    etag = (stat.etag or "").strip('"')
+    return "-" not in etag and etag == md5
+
+
+def _upload_file(client, bucket, key, path, codec, part_size, force):
+    """Envoie un fichier s'il a changé ; renvoie (statut, octets envoyés)."""
+    sha256, md5 = file_digests(path)
+    object_name = encoded_key(key, codec)
+    if not force and object_is_current(client, bucket, object_name, sha256, md5):
+        return "skipped", 0
+    _, size = upload_file(
+        client,
+        bucket,
+        key,
+        path,
+        codec,
+        metadata={SHA256_METADATA: sha256},
+        part_size=part_size,
+        num_parallel_uploads=PART_UPLOAD_THREADS,
+    )
+    return "uploaded", size
+
+
+def bulk_upload(files, bucket, workers=None, force=False, codec=None, logger=logging):
+    """Envoie un lot de fichiers dans un bucket, compressés et en parallèle.
+
+    Chaque fichier est haché puis comparé à l'objet existant (empreinte du contenu
+    non compressé) : un fichier inchangé n'est pas renvoyé. Les fichiers compressés
+    plus gros que MINIO_PART_SIZE sont envoyés en plusieurs parties.
+
+    Args:
+        files (dict): Chemin local de chaque objet ({clé: chemin}).
+        bucket (str): Bucket cible, créé au besoin.
+        workers (int, optional): Envois simultanés (défaut MINIO_UPLOAD_THREADS).
+        force (bool): Renvoie tous les fichiers, même inchangés.
+        codec (str, optional): Encodage des objets, par défaut STORAGE_CODEC ; la
+            clé de chaque objet reçoit l'extension de l'encodage (ex. .jsonl.zst).
+
+    Returns:
+        dict: Clés envoyées (uploaded), inchangées (skipped) et en échec (failed),
+        octets envoyés (bytes, après compression) et durée (seconds).
+    """
+    start = time.perf_counter()
+    report = {"uploaded": [], "skipped": [], "failed": [], "bytes": 0}
+    if files:
+        client = get_client()
+        make_buckets([bucket])
+        codec = codec or default_codec()
+        workers = workers or int(
+            os.environ.get("MINIO_UPLOAD_THREADS", DEFAULT_UPLOAD_THREADS)
+        )
+        part_size_mb = max(
+            MIN_PART_SIZE_MB,
+            int(os.environ.get("MINIO_PART_SIZE", DEFAULT_PART_SIZE_MB)),
+        )
+        part_size = part_size_mb * 1024 * 1024
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                key: executor.submit(
+                    _upload_file, client, bucket, key, path, codec, part_size, force
+                )
+                for key, path in files.items()
+            }
+            for key, future in futures.items():
+                try:
+                    status, size = future.result()
+                except Exception as e:
+                    logger.error(f"Envoi de {key} dans {bucket} impossible : {e}")
+                    report["failed"].append(key)
+                    continue
+                report[status].append(key)
+                report["bytes"] += size
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    logger.info(
+        f"{bucket} : {len(report['uploaded'])} fichiers envoyés "
+        f"({report['bytes']} octets), {len(report['skipped'])} inchangés, "
+        f"{len(report['failed'])} en échec en {report['seconds']}s"
+    )
+    return report
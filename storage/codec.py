@@ -0,0 +1,300 @@
+"""Format compressé des objets des buckets du pipeline (webscraping, ner, traitement).
+
+Les étapes écrivent leurs sorties en JSON Lines compact (une offre par ligne, sans
+indentation), compressé en zstd ou en gzip. L'encodage est indiqué par l'extension
+de l'objet (.jsonl.zst, .jsonl.gz) et par la métadonnée utilisateur codec
+(x-amz-meta-codec) ; les lecteurs décompressent d'après l'une ou l'autre et lisent
+toujours les objets non compressés (JSON indenté ou JSON Lines) écrits avant ce format.
+
+L'en-tête HTTP Content-Encoding n'est jamais utilisé : urllib3 décompresserait le corps
+des réponses avant la couche codec. Les objets déjà envoyés avec cet en-tête restent
+lisibles : un contenu sans la signature de son encodage est lu tel quel.
+
+Spark lit le bucket ner via s3a, qui ne décompresse que le gzip (d'après l'extension) :
+les sorties de skillner sont écrites en gzip quel que soit STORAGE_CODEC.
+
+Variables d'environnement :
+    STORAGE_CODEC: "zstd" (défaut), "gzip" ou "none" (objets non compressés).
+    STORAGE_ZSTD_LEVEL: Niveau de compression zstd (défaut 10).
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+try:
+    import zstandard
+except ImportError:  # Dépendance optionnelle : gzip à la place de zstd
+    zstandard = None
+
+# Extension ajoutée à la clé de l'objet pour chaque encodage
+CODECS = {"zstd": ".zst", "gzip": ".gz"}
+DEFAULT_CODEC = "zstd"
+DEFAULT_ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+# Métadonnée utilisateur de l'encodage (en-tête x-amz-meta-codec)
+ENCODING_METADATA = "codec"
+# Signature en tête d'un contenu compressé
+MAGIC = {"zstd": b"\x28\xb5\x2f\xfd", "gzip": b"\x1f\x8b"}
+
+_warned = False
+
+
+def default_codec():
+    """Encodage des objets écrits (STORAGE_CODEC), ou None sans compression."""
+    global _warned
+    codec = (os.environ.get("STORAGE_CODEC") or DEFAULT_CODEC).lower()
+    if codec in ("none", "identity"):
+        return None
+    if codec not in CODECS:
+        raise ValueError(f"STORAGE_CODEC inconnu : {codec} (zstd, gzip ou none)")
+    if codec == "zstd" and zstandard is None:
+        if not _warned:
+            logging.warning("zstandard n'est pas installé, objets compressés en gzip")
+            _warned = True
+        return "gzip"
+    return codec
+
+
+def key_codec(key):
+    """Encodage d'un objet d'après l'extension de sa clé, ou None."""
+    for codec, suffix in CODECS.items():
+        if key.endswith(suffix):
+            return codec
+    return None
+
+
+def base_key(key):
+    """Clé d'un objet sans l'extension de son encodage (ex. offres.jsonl)."""
+    codec = key_codec(key)
+    return key[: -len(CODECS[codec])] if codec else key
+
+
+def encoded_key(key, codec):
+    """Clé de l'objet qui contient le fichier key avec l'encodage codec."""
+    key = base_key(key)
+    return key + CODECS[codec] if codec else key
+
+
+def content_type_for(name):
+    """Type MIME d'un fichier d'après son extension (hors encodage)."""
+    name = base_key(name)
+    if name.endswith(".jsonl"):
+        return "application/x-ndjson"
+    if name.endswith(".json"):
+        return "application/json"
+    return "application/octet-stream"
+
+
+def _zstd_level():
+    return int(os.environ.get("STORAGE_ZSTD_LEVEL", DEFAULT_ZSTD_LEVEL))
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("zstandard est nécessaire pour lire un objet zstd")
+
+
+def compress(data, codec):
+    """Compresse des octets avec l'encodage codec (None : inchangés)."""
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=_zstd_level()).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    return data
+
+
+def decompress(data, key="", encoding=None):
+    """Décompresse le contenu d'un objet d'après sa métadonnée ou l'extension de sa clé."""
+    codec = encoding or key_codec(key)
+    if codec and not data.startswith(MAGIC[codec]):
+        return data  # Déjà décompressé par urllib3 (ancien en-tête Content-Encoding)
+    if codec == "zstd":
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+def _copy(source_path, dest_path, reader=None, writer=None):
+    with open(source_path, "rb") as source, open(dest_path, "wb") as dest:
+        source = reader(source) if reader else source
+        dest = writer(dest) if writer else dest
+        with source, dest:
+            shutil.copyfileobj(source, dest)
+
+
+def compress_file(source_path, dest_path, codec):
+    """Compresse un fichier local par blocs, sans le charger en mémoire."""
+    if codec == "zstd":
+        compressor = zstandard.ZstdCompressor(level=_zstd_level())
+        _copy(source_path, dest_path, writer=compressor.stream_writer)
+    elif codec == "gzip":
+        _copy(
+            source_path,
+            dest_path,
+            writer=lambda f: gzip.GzipFile(
+                fileobj=f, mode="wb", compresslevel=GZIP_LEVEL
+            ),
+        )
+    else:
+        shutil.copyfile(source_path, dest_path)
+
+
+def decompress_file(source_path, dest_path, codec):
+    """Décompresse un fichier local par blocs."""
+    if codec:
+        with open(source_path, "rb") as f:
+            if not f.read(len(MAGIC[codec])).startswith(MAGIC[codec]):
+                codec = None  # Déjà décompressé par urllib3 (ancien en-tête)
+    if codec == "zstd":
+        _require_zstandard()
+        _copy(source_path, dest_path, reader=zstandard.ZstdDecompressor().stream_reader)
+    elif codec == "gzip":
+        _copy(source_path, dest_path, reader=lambda f: gzip.GzipFile(fileobj=f))
+    else:
+        shutil.copyfile(source_path, dest_path)
+
+
+def dumps_jsonl(records):
+    """Offres en JSON Lines compact (une par ligne), encodé en UTF-8."""
+    return "".join(
+        json.dumps(record, ensure_ascii=False) + "\n" for record in records
+    ).encode("utf-8")
+
+
+def loads_records(data, key="", encoding=None):
+    """Offres d'un objet : tableau JSON, objet JSON ou JSON Lines, compressé ou non.
+
+    Les lignes JSON Lines invalides sont ignorées.
+
+    Returns:
+        list: Offres de l'objet.
+    """
+    text = decompress(data, key, encoding).decode("utf-8")
+    if not base_key(key).endswith(".jsonl"):
+        try:
+            value = json.loads(text)
+            return value if isinstance(value, list) else [value]
+        except json.JSONDecodeError:
+            pass  # Fichier .json écrit une offre par ligne
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            logging.warning(f"Ligne JSON invalide ignorée dans {key}")
+    return records
+
+
+def _remove_variants(client, bucket, key, object_name):
+    """Supprime les copies du même fichier sous un autre encodage (format précédent)."""
+    for codec in (None, *CODECS):
+        other = encoded_key(key, codec)
+        if other != object_name:
+            client.remove_object(bucket, other)
+
+
+def upload_file(client, bucket, key, path, codec=None, metadata=None, **kwargs):
+    """Compresse un fichier local et l'envoie dans un bucket.
+
+    Args:
+        key (str): Clé du fichier sans encodage ; l'extension de l'encodage y est ajoutée.
+        codec (str, optional): Encodage, par défaut celui de STORAGE_CODEC.
+        metadata (dict, optional): Métadonnées ajoutées à l'objet.
+        **kwargs: Options de fput_object (part_size, num_parallel_uploads).
+
+    Returns:
+        tuple: Nom de l'objet et nombre d'octets envoyés.
+    """
+    codec = codec or default_codec()
+    object_name = encoded_key(key, codec)
+    metadata = dict(metadata or {})
+    upload_path = path
+    if codec:
+        metadata[ENCODING_METADATA] = codec
+        with tempfile.NamedTemporaryFile(suffix=CODECS[codec], delete=False) as tmp:
+            upload_path = tmp.name
+        compress_file(path, upload_path, codec)
+    try:
+        client.fput_object(
+            bucket,
+            object_name,
+            upload_path,
+            content_type=content_type_for(key),
+            metadata=metadata,
+            **kwargs,
+        )
+        size = os.path.getsize(upload_path)
+    finally:
+        if upload_path != path:
+            os.remove(upload_path)
+    _remove_variants(client, bucket, key, object_name)
+    return object_name, size
+
+
+def put_records(client, bucket, key, records, codec=None):
+    """Écrit des offres dans un objet en JSON Lines compact et compressé.
+
+    Returns:
+        tuple: Nom de l'objet et nombre d'octets envoyés.
+    """
+    codec = codec or default_codec()
+    object_name = encoded_key(key, codec)
+    data = compress(dumps_jsonl(records), codec)
+    client.put_object(
+        bucket,
+        object_name,
+        io.BytesIO(data),
+        len(data),
+        content_type=content_type_for(key),
+        metadata={ENCODING_METADATA: codec} if codec else None,
+    )
+    _remove_variants(client, bucket, key, object_name)
+    return object_name, len(data)
+
+
+def read_object(client, bucket, object_name):
+    """Contenu brut d'un objet et son encodage (métadonnée ou extension)."""
+    response = client.get_object(bucket, object_name)
+    try:
+        data = response.read()
+        encoding = response.headers.get(f"x-amz-meta-{ENCODING_METADATA}")
+    finally:
+        response.close()
+        response.release_conn()
+    return data, encoding or key_codec(object_name)
+
+
+def get_records(client, bucket, object_name):
+    """Offres d'un objet, décompressées."""
+    data, encoding = read_object(client, bucket, object_name)
+    return loads_records(data, object_name, encoding)
+
+
+def download_file(client, bucket, object_name, dest_dir):
+    """Télécharge un objet et l'écrit décompressé dans dest_dir, sous sa clé sans encodage.
+
+    Returns:
+        str: Chemin du fichier écrit.
+    """
+    path = os.path.join(dest_dir, base_key(object_name))
+    codec = key_codec(object_name)
+    if codec is None:
+        client.fget_object(bucket, object_name, path)
+        return path
+    with tempfile.NamedTemporaryFile(suffix=CODECS[codec], delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        client.fget_object(bucket, object_name, tmp_path)
+        decompress_file(tmp_path, path, codec)
+    finally:
+        os.remove(tmp_path)
+    return path
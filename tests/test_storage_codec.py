@@ -0,0 +1,159 @@
+"""Aller-retour des objets compressés (storage.codec) contre un serveur S3 simulé."""
+
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("minio")
+
+from storage import codec  # noqa: E402
+
+LOCATION = (
+    b'<?xml version="1.0"?><LocationConstraint '
+    b'xmlns="http://s3.amazonaws.com/doc/2006-03-01/">us-east-1</LocationConstraint>'
+)
+# En-têtes renvoyés tels qu'envoyés, comme MinIO
+STORED_HEADERS = ("content-type", "content-encoding")
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    objects = {}
+
+    def _reply(self, code, body=b"", headers=()):
+        self.send_response(code)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _key(self):
+        return self.path.split("?")[0].strip("/")
+
+    def _object_headers(self, key):
+        body, headers = self.objects[key]
+        etag = hashlib.md5(body).hexdigest()
+        return [
+            ("ETag", f'"{etag}"'),
+            ("Last-Modified", "Wed, 01 Jan 2025 00:00:00 GMT"),
+            *headers.items(),
+        ]
+
+    def do_GET(self):
+        if "location" in self.path:
+            return self._reply(200, LOCATION)
+        key = self._key()
+        if key not in self.objects:
+            return self._reply(404)
+        self._reply(200, self.objects[key][0], self._object_headers(key))
+
+    def do_HEAD(self):
+        key = self._key()
+        if "/" not in key:
+            return self._reply(200)
+        if key not in self.objects:
+            return self._reply(404)
+        self._reply(200, headers=self._object_headers(key))
+
+    def do_PUT(self):
+        key = self._key()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "/" in key:
+            headers = {
+                name: value
+                for name, value in self.headers.items()
+                if name.lower().startswith("x-amz-meta-")
+                or name.lower() in STORED_HEADERS
+            }
+            self.objects[key] = (body, headers)
+        self._reply(200, headers=[("ETag", f'"{hashlib.md5(body).hexdigest()}"')])
+
+    def do_DELETE(self):
+        self.objects.pop(self._key(), None)
+        self._reply(204)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import storage
+
+    FakeS3Handler.objects = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeS3Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("MINIO_API", f"127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(storage, "_client", None)
+    yield storage.get_client()
+    server.shutdown()
+
+
+OFFERS = [
+    {"titre": "Data Engineer", "via": "Bayt", "job_url": "https://www.bayt.com/1"},
+    {"titre": "Développeur Python", "via": "Rekrute", "job_url": "https://x.ma/2"},
+]
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_put_records_round_trip(client, encoding):
+    if encoding == "zstd" and codec.zstandard is None:
+        pytest.skip("zstandard n'est pas installé")
+    object_name, _ = codec.put_records(
+        client, "ner", "NER_x.jsonl", OFFERS, codec=encoding
+    )
+
+    assert object_name == f"NER_x.jsonl{codec.CODECS[encoding]}"
+    _, headers = FakeS3Handler.objects[f"ner/{object_name}"]
+    assert "Content-Encoding" not in headers
+    assert headers["X-Amz-Meta-codec"] == encoding
+    assert codec.get_records(client, "ner", object_name) == OFFERS
+
+
+def test_upload_file_download_file_round_trip(client, tmp_path):
+    source = tmp_path / "offres.jsonl"
+    source.write_bytes(codec.dumps_jsonl(OFFERS))
+    dest_dir = tmp_path / "data"
+    dest_dir.mkdir()
+
+    object_name, _ = codec.upload_file(
+        client, "webscraping", "offres.jsonl", str(source), codec="gzip"
+    )
+    path = codec.download_file(client, "webscraping", object_name, str(dest_dir))
+
+    assert path == str(dest_dir / "offres.jsonl")
+    assert (dest_dir / "offres.jsonl").read_bytes() == source.read_bytes()
+
+
+def test_upload_replaces_other_encodings(client, tmp_path):
+    source = tmp_path / "offres.jsonl"
+    source.write_bytes(codec.dumps_jsonl(OFFERS))
+    FakeS3Handler.objects["webscraping/offres.jsonl"] = (b"[]", {})
+
+    codec.upload_file(client, "webscraping", "offres.jsonl", str(source), "gzip")
+
+    assert list(FakeS3Handler.objects) == ["webscraping/offres.jsonl.gz"]
+
+
+def test_reads_object_stored_with_content_encoding(client):
+    # Objet envoyé avec l'en-tête Content-Encoding : urllib3 le décompresse déjà
+    data = codec.compress(codec.dumps_jsonl(OFFERS), "gzip")
+    FakeS3Handler.objects["traitement/old.jsonl.gz"] = (
+        data,
+        {"Content-Encoding": "gzip"},
+    )
+
+    assert codec.get_records(client, "traitement", "old.jsonl.gz") == OFFERS
+
+
+def test_loads_records_legacy_formats():
+    array = json.dumps(OFFERS, indent=4).encode()
+
+    assert codec.loads_records(array, "offres.json") == OFFERS
+    assert codec.loads_records(codec.dumps_jsonl(OFFERS), "offres.json") == OFFERS
+    assert codec.loads_records(b'{"a": 1}\nbad\n', "offres.jsonl") == [{"a": 1}]